@@ -1,24 +1,63 @@
 from __future__ import annotations
 
-import os
+import json
 import random
+import sys
 import time
+from collections import deque
 from threading import Lock
-from typing import Optional
+from typing import Literal, Optional, Union
 
-from flask import Flask, jsonify, request
+from flask import Flask, Response, jsonify, request, stream_with_context
 from flask_cors import CORS
-from flask_socketio import SocketIO
+from flask_socketio import SocketIO, join_room, leave_room
 from pydantic import BaseModel, ValidationError
 from loguru import logger
 
-from ctp_mdapi import CTPMarketDataAPI, CTPConfig
+from bar_engine import BarEngine
+from client_registry import ClientRegistry, DEFAULT_ENCODING, MODE_BATCH, MODE_DELTA, MODE_TICK
+from delta_encoder import DeltaEncoder
+from feed_state import CONNECTED_STATES, STATE_STREAMING
+from instrument_index import InstrumentIndex
+from log_sampler import LogSampler
+from log_setup import setup_logging
+from metrics import metrics
+from front_manager import FrontManager
+from ingest import create_feed
 from mock_ctp import MockCTPAPI
+from quote import Quote, normalize_groups
+from quote_board import QuoteBoard
+from quote_bridge import QuoteBridge
+from quote_conflator import QuoteConflator
+from remote_feed import RemoteFeedAPI
+from replay_feed import ReplayCTPAPI
+from shm_board import SharedQuoteBoard
+from subscription_manager import PINNED_HOLDER, SubscriptionManager
+from tick_journal import TickJournal, query_ticks
+from wire_codec import encode_entries, encode_quote, encode_quotes, negotiate_encoding
 from config import Config
 
 
 class SubscribePayload(BaseModel):
+    instrumentId: str = ''
+    instrumentIds: list[str] = []
+
+    def get_instrument_ids(self) -> list[str]:
+        """合并单个和批量合约，去空白、去重并保持顺序"""
+        ids = [self.instrumentId, *self.instrumentIds]
+        return list(dict.fromkeys(i.strip() for i in ids if i and i.strip()))
+
+
+class BarSubscribePayload(BaseModel):
     instrumentId: str
+    interval: Literal['1s', '1m', '5m', '15m'] = '1m'
+
+
+class ConfigurePayload(BaseModel):
+    mode: Optional[Literal['tick', 'batch', 'delta']] = None
+    batch: Optional[bool] = None
+    encoding: Optional[Literal['json', 'msgpack']] = None
+    fields: Optional[list[Literal['top', 'depth', 'stats', 'limits']]] = None
 
 
 def create_app() -> Flask:
@@ -33,22 +72,88 @@ socketio = SocketIO(
     app, 
     cors_allowed_origins="*", 
     async_mode="eventlet",
-    logger=True,
-    engineio_logger=True
+    logger=Config.SOCKETIO_LOGGER,
+    engineio_logger=Config.SOCKETIO_LOGGER,
+    transports=Config.SOCKETIO_TRANSPORTS
 )
 
 # 全局变量
 _subscribed_instruments: set[str] = set()
 _lock = Lock()
-_ctp_api: Optional[CTPMarketDataAPI] = None
-_mock_api: Optional[MockCTPAPI] = None
+_ctp_api: Optional[FrontManager] = None
+# 模拟、回放或接入进程数据源
+_mock_api: Optional[Union[MockCTPAPI, ReplayCTPAPI, RemoteFeedAPI]] = None
 _is_ctp_connected = False
 _is_mock_mode = False
+_client_registry = ClientRegistry()
+_quote_bridge = QuoteBridge(capacity=Config.QUOTE_BRIDGE_CAPACITY)
+_quote_board = QuoteBoard()
+_bar_engine = BarEngine(history=Config.BAR_HISTORY_SIZE)
+# K线房间登记，键为 "合约:周期"
+_bar_registry = ClientRegistry()
+# 逐笔行情日志（未启用时为None；拆分部署时由接入进程记录）
+_tick_journal: Optional[TickJournal] = TickJournal(
+    directory=Config.TICK_JOURNAL_DIR,
+    segment_bytes=Config.TICK_JOURNAL_SEGMENT_MB * 1024 * 1024,
+    flush_interval_ms=Config.TICK_JOURNAL_FLUSH_MS
+) if Config.TICK_JOURNAL_ENABLED and not Config.INGEST_SOCKET else None
+# 共享内存行情表（未启用时为None；拆分部署时由接入进程写入）
+_shm_board: Optional[SharedQuoteBoard] = SharedQuoteBoard(
+    Config.SHM_BOARD_NAME,
+    capacity=Config.SHM_BOARD_CAPACITY
+) if Config.SHM_BOARD_NAME and not Config.INGEST_SOCKET else None
+# 增量推送客户端的编码器
+_delta_encoders: dict[str, DeltaEncoder] = {}
+_quote_conflator = QuoteConflator(
+    interval_ms=Config.QUOTE_FLUSH_INTERVAL_MS,
+    adaptive=Config.QUOTE_FLUSH_ADAPTIVE,
+    min_interval_ms=Config.QUOTE_FLUSH_MIN_MS,
+    max_interval_ms=Config.QUOTE_FLUSH_MAX_MS
+)
+# 合约索引，启动时加载一次，为空时不校验合约
+_instrument_index = InstrumentIndex.load(Config.INSTRUMENT_FILE)
+# 订阅引用计数：最后一个持有者释放后经过宽限期才取消上游订阅
+_subscription_manager = SubscriptionManager(grace_seconds=Config.SUBSCRIPTION_GRACE_SECONDS)
+# 行情源当前解析的扩展字段组（全部客户端所需字段组的并集）
+_parse_groups: tuple = ()
+# 连接快照缓存：编码 -> 已编码的全部订阅合约最新行情，行情推送或订阅变化时失效
+_snapshot_cache: dict[str, object] = {}
+# 行情路径的调试日志按合约限速，只在DEBUG级别输出；推送错误日志按类别限速
+_tick_log = LogSampler(interval=Config.LOG_TICK_SAMPLE_SECONDS,
+                       enabled=Config.LOG_LEVEL.upper() in ('TRACE', 'DEBUG'))
+_error_log = LogSampler(interval=Config.LOG_TICK_SAMPLE_SECONDS)
+# 行情源连接状态变化（管理线程写入，主循环取出后推送 ctp_status），以及最近一次状态
+_feed_events: deque = deque(maxlen=100)
+_feed_state: dict = {}
+# 拆分部署时集群固定订阅有变化（接收线程写入，主循环取出后同步到本进程的引用计数）
+_pinned_updates: deque = deque(maxlen=1)
+# 等待接入进程回复固定订阅请求的最长时间（秒）
+REMOTE_REPLY_TIMEOUT = 2.0
+
+
+def _quote_room(instrument_id: str, encoding: str = DEFAULT_ENCODING, groups: tuple = ()) -> str:
+    """合约行情房间名，只有逐笔推送的客户端加入，按推送编码和扩展字段组区分"""
+    room = f"quote:{instrument_id}"
+    if encoding != DEFAULT_ENCODING:
+        room += f"@{encoding}"
+    if groups:
+        room += "#" + "+".join(groups)
+    return room
+
+
+def _bar_room(instrument_id: str, interval: str) -> str:
+    """K线房间名"""
+    return f"bar:{instrument_id}:{interval}"
 
 
 def init_ctp_api():
-    """初始化CTP API"""
-    global _ctp_api, _mock_api, _is_ctp_connected, _is_mock_mode
+    """初始化行情源（接入进程、回放、模拟或CTP），行情源的选择与接入进程共用 create_feed"""
+    global _ctp_api, _is_mock_mode
+    
+    # 拆分部署：行情来自接入进程
+    if Config.INGEST_SOCKET:
+        logger.info(f"Using ingest process feed: {Config.INGEST_SOCKET}")
+        return init_mock_api(RemoteFeedAPI(Config.INGEST_SOCKET))
     
     # 验证配置
     is_valid, error_msg = Config.validate_ctp_config()
@@ -56,30 +161,20 @@ def init_ctp_api():
         logger.error(f"CTP config validation failed: {error_msg}")
         return False
     
-    # 检查是否使用模拟模式
-    if Config.CTP_USE_MOCK:
-        logger.info("Using mock CTP mode")
-        return init_mock_api()
-    
     try:
-        # 获取CTP配置
-        ctp_config = CTPConfig.get_config(Config.CTP_IS_SIM)
+        feed = create_feed(_instrument_index)
+        if not isinstance(feed, FrontManager):
+            logger.info(f"Using {_feed_mode(feed)} CTP mode")
+            return init_mock_api(feed)
         
-        # 创建CTP API实例
-        _ctp_api = CTPMarketDataAPI(
-            front_address=ctp_config['front_address'],
-            broker_id=ctp_config['broker_id'],
-            user_id=Config.CTP_USER_ID,
-            password=Config.CTP_PASSWORD
-        )
-        
-        # 添加行情回调
-        _ctp_api.add_quote_callback(_on_ctp_quote)
+        # 多前置管理，每个前置一个CTP API实例
+        _ctp_api = feed
+        _ctp_api.add_status_listener(_on_feed_state)
+        _add_feed_callbacks(_ctp_api)
         
-        # 连接CTP服务器
+        # 连接CTP服务器（连接状态由状态回调更新）
         if _ctp_api.connect():
             logger.info("CTP API initialized successfully")
-            _is_ctp_connected = True
             _is_mock_mode = False
             return True
         else:
@@ -91,16 +186,17 @@ def init_ctp_api():
         return False
 
 
-def init_mock_api():
-    """初始化模拟CTP API"""
+def init_mock_api(api: Union[MockCTPAPI, ReplayCTPAPI, RemoteFeedAPI]):
+    """初始化模拟、回放或接入进程数据源"""
     global _mock_api, _is_ctp_connected, _is_mock_mode
     
     try:
-        # 创建模拟API实例
-        _mock_api = MockCTPAPI()
-        
-        # 添加行情回调
-        _mock_api.add_quote_callback(_on_ctp_quote)
+        _mock_api = api
+        _add_feed_callbacks(_mock_api)
+        if isinstance(_mock_api, RemoteFeedAPI):
+            # 接入进程转发上游的连接状态变化和集群固定订阅
+            _mock_api.add_status_listener(_on_feed_state)
+            _mock_api.add_pinned_listener(_pinned_updates.append)
         
         # 连接模拟服务器
         if _mock_api.connect() and _mock_api.login():
@@ -117,14 +213,244 @@ def init_mock_api():
         return False
 
 
-def _on_ctp_quote(quote: dict):
-    """CTP行情回调函数"""
-    try:
-        # 通过WebSocket发送行情数据
-        socketio.emit('quote', quote)
-        logger.debug(f"Sent quote: {quote['instrumentId']} = {quote['lastPrice']}")
-    except Exception as e:
-        logger.error(f"Error sending quote: {e}")
+def _add_feed_callbacks(api):
+    """添加行情回调（行情日志在最前，记录每一笔）并设置需要解析的字段组"""
+    if _tick_journal:
+        api.add_quote_callback(_tick_journal.append)
+    if _shm_board:
+        api.add_quote_callback(_shm_board.update)
+    api.add_quote_callback(_on_ctp_quote)
+    api.set_parse_groups(_parse_groups)
+
+
+def _on_ctp_quote(quote: Quote):
+    """CTP行情回调函数（运行在行情线程上）"""
+    # 只写入线程桥，不在行情线程上做任何推送
+    _quote_bridge.put(quote)
+
+
+def _on_feed_state(event: dict):
+    """行情源连接状态变化回调（运行在管理或行情线程上）"""
+    _feed_events.append(event)
+
+
+def _get_feed_state() -> str:
+    """当前行情源连接状态；模拟和回放数据源没有状态机，按是否已连接给出"""
+    return _feed_state.get("state") or ("streaming" if _is_ctp_connected else "disconnected")
+
+
+def _emit_feed_events():
+    """推送行情源状态变化；断线恢复后收到第一笔行情时给全部客户端重新同步"""
+    global _is_ctp_connected, _feed_state
+    while _feed_events:
+        event = _feed_events.popleft()
+        _feed_state = event
+        _is_ctp_connected = event["state"] in CONNECTED_STATES
+        socketio.emit('ctp_status', event)
+        if event["state"] == STATE_STREAMING and event.get("recovery_ms") is not None:
+            _snapshot_cache.clear()
+            sids = _client_registry.get_clients()
+            count = sum(_resync_client(sid) for sid in sids)
+            logger.info(f"Feed recovered in {event['recovery_ms']} ms, resynced {len(sids)} clients ({count} quotes)")
+
+
+def _quote_bridge_loop():
+    """在主循环中取出线程桥里的行情，放入合并缓冲"""
+    poll_seconds = Config.QUOTE_BRIDGE_POLL_MS / 1000.0
+    while True:
+        for quote in _quote_bridge.drain():
+            start_ns = time.perf_counter_ns()
+            if quote.recv_ns:
+                metrics.record('queue', start_ns - quote.recv_ns)
+            _dispatch_quote(quote)
+            metrics.record('cache', time.perf_counter_ns() - start_ns)
+        socketio.sleep(poll_seconds)
+
+
+def _dispatch_quote(quote: Quote):
+    """在主循环中处理一笔行情：更新看板和K线，并放入合并缓冲"""
+    _quote_board.update(quote)
+    _bar_engine.update(quote)
+    _quote_conflator.offer(quote)
+    metrics.count_tick(quote.instrument_id)
+
+
+def _emit_quotes(quotes: list[Quote]):
+    """通过WebSocket发送一批行情数据"""
+    batches: dict[str, list[Quote]] = {}
+    deltas: dict[str, list[dict]] = {}
+    for quote in quotes:
+        try:
+            # 只推送给关注该合约的客户端
+            tick_profiles, batch_sids, delta_sids = _client_registry.get_fanout(quote.instrument_id)
+            if not tick_profiles and not batch_sids and not delta_sids:
+                continue
+            # 只在发送时转换为字典，每种字段组合只转换一次
+            payloads: dict[tuple, dict] = {}
+            for encoding, groups in tick_profiles:
+                payload = None
+                if encoding == DEFAULT_ENCODING:
+                    payload = payloads.get(groups) or payloads.setdefault(groups, quote.to_dict(groups))
+                socketio.emit('quote', encode_quote(quote, encoding, payload, groups),
+                              to=_quote_room(quote.instrument_id, encoding, groups))
+            if tick_profiles and _tick_log.allow(quote.instrument_id):
+                logger.debug("Sent quote: {} = {}", quote.instrument_id, quote.last_price)
+            for sid in batch_sids:
+                batches.setdefault(sid, []).append(quote)
+            if delta_sids:
+                key = _quote_board.get_ordinal(quote.instrument_id)
+                for sid in delta_sids:
+                    groups = _client_registry.get_fields(sid)
+                    payload = payloads.get(groups) or payloads.setdefault(groups, quote.to_dict(groups))
+                    entry = _get_delta_encoder(sid).encode(key, payload)
+                    if entry:
+                        deltas.setdefault(sid, []).append(entry)
+        except Exception as e:
+            metrics.count_error('emit')
+            if _error_log.allow('emit'):
+                logger.error(f"Error sending quote: {e}")
+
+    # 批量和增量客户端每个推送间隔只收到一帧
+    for sid, batch in batches.items():
+        try:
+            socketio.emit('quotes', encode_quotes(batch, _client_registry.get_encoding(sid),
+                                                  _client_registry.get_fields(sid)), to=sid)
+        except Exception as e:
+            metrics.count_error('emit')
+            if _error_log.allow('emit'):
+                logger.error(f"Error sending quotes batch to {sid}: {e}")
+    for sid, entries in deltas.items():
+        try:
+            socketio.emit('quote_delta', encode_entries(entries, _client_registry.get_encoding(sid)), to=sid)
+        except Exception as e:
+            metrics.count_error('emit')
+            if _error_log.allow('emit'):
+                logger.error(f"Error sending quote delta to {sid}: {e}")
+
+    # 各笔行情从收到到推送完成的时间
+    emitted_ns = time.perf_counter_ns()
+    for quote in quotes:
+        if quote.recv_ns:
+            metrics.record('emit', emitted_ns - quote.recv_ns)
+
+
+def _get_delta_encoder(sid: str) -> DeltaEncoder:
+    """获取客户端的增量编码器"""
+    encoder = _delta_encoders.get(sid)
+    if encoder is None:
+        encoder = _delta_encoders[sid] = DeltaEncoder()
+    return encoder
+
+
+def _get_last_quote(instrument_id: str) -> Optional[Quote]:
+    """从当前行情源获取合约的最新行情"""
+    if _is_mock_mode and _mock_api:
+        return _mock_api.get_last_quote(instrument_id)
+    elif _ctp_api:
+        return _ctp_api.get_last_quote(instrument_id)
+    return None
+
+
+def _send_quotes_to(sid: str, quotes: list[Quote]):
+    """按客户端的推送方式直接发送行情（不经过合并缓冲）"""
+    if not quotes:
+        return
+    mode = _client_registry.get_mode(sid)
+    encoding = _client_registry.get_encoding(sid)
+    groups = _client_registry.get_fields(sid)
+    if mode == MODE_DELTA:
+        encoder = _get_delta_encoder(sid)
+        entries = []
+        for quote in quotes:
+            encoder.forget(quote.instrument_id)
+            entries.append(encoder.encode(_quote_board.get_ordinal(quote.instrument_id), quote.to_dict(groups)))
+        socketio.emit('quote_delta', encode_entries(entries, encoding), to=sid)
+    elif mode == MODE_BATCH:
+        socketio.emit('quotes', encode_quotes(quotes, encoding, groups), to=sid)
+    else:
+        for quote in quotes:
+            socketio.emit('quote', encode_quote(quote, encoding, groups=groups), to=sid)
+
+
+def _move_client_rooms(sid: str, old_mode: str, old_encoding: str, old_groups: tuple):
+    """推送方式、编码或字段组变化后，调整客户端所在的合约房间"""
+    new_mode = _client_registry.get_mode(sid)
+    new_encoding = _client_registry.get_encoding(sid)
+    new_groups = _client_registry.get_fields(sid)
+    if ((old_mode == MODE_TICK) == (new_mode == MODE_TICK)
+            and old_encoding == new_encoding and old_groups == new_groups):
+        return
+    for instrument_id in _client_registry.get_client_instruments(sid):
+        if old_mode == MODE_TICK:
+            leave_room(_quote_room(instrument_id, old_encoding, old_groups), sid=sid)
+        if new_mode == MODE_TICK:
+            join_room(_quote_room(instrument_id, new_encoding, new_groups), sid=sid)
+
+
+def _update_parse_groups():
+    """按全部客户端所需字段组的并集，设置行情源需要解析的扩展字段"""
+    global _parse_groups
+    groups = normalize_groups(_client_registry.get_field_union())
+    if groups == _parse_groups:
+        return
+    _parse_groups = groups
+    for api in (_mock_api, _ctp_api):
+        if api:
+            api.set_parse_groups(groups)
+
+
+def _get_snapshot(encoding: str):
+    """获取按编码缓存的连接快照，同一推送间隔内连接的客户端共用一份"""
+    snapshot = _snapshot_cache.get(encoding)
+    if snapshot is None:
+        with _lock:
+            instruments = sorted(_subscribed_instruments)
+        quotes = [quote for quote in map(_get_last_quote, instruments) if quote]
+        snapshot = _snapshot_cache[encoding] = encode_quotes(quotes, encoding)
+    return snapshot
+
+
+def _quote_flush_loop():
+    """按合并间隔推送各合约的最新行情"""
+    while True:
+        socketio.sleep(_quote_conflator.next_interval())
+        quotes = _quote_conflator.drain()
+        if quotes:
+            _snapshot_cache.clear()
+            start_ns = time.perf_counter_ns()
+            _emit_quotes(quotes)
+            metrics.record('flush', time.perf_counter_ns() - start_ns)
+        _emit_bars()
+        _emit_feed_events()
+        if _pinned_updates:
+            _pinned_updates.clear()
+            _sync_pinned(_mock_api.get_pinned())
+        metrics.update_rate()
+
+
+def _subscription_reaper_loop():
+    """取消宽限期已到、没有持有者的合约的上游订阅"""
+    while True:
+        socketio.sleep(1)
+        expired = _subscription_manager.reap()
+        if expired:
+            removed = _unsubscribe_upstream(expired)
+            logger.info(f"Released {len(removed)} instruments without holders: {removed}")
+
+
+def _emit_bars():
+    """推送新完成的K线和本推送间隔内有更新的K线"""
+    _bar_engine.close_expired(int(time.time() * 1000))
+    closed, updated = _bar_engine.drain()
+    for bars, is_closed in ((closed, True), (updated, False)):
+        for bar in bars:
+            if not _bar_registry.has_members(f"{bar.instrument_id}:{bar.interval}"):
+                continue
+            try:
+                socketio.emit('bar', bar.to_dict(closed=is_closed), to=_bar_room(bar.instrument_id, bar.interval))
+            except Exception as e:
+                metrics.count_error('emit')
+                logger.error(f"Error sending bar: {e}")
 
 
 @app.route('/api/health', methods=['GET'])
@@ -134,26 +460,65 @@ def health():
     return jsonify({
         "status": "ok",
         "ctp_status": ctp_status,
-        "subscribed_count": len(_subscribed_instruments)
+        "ctp_state": _get_feed_state(),
+        "subscribed_count": len(_subscribed_instruments),
+        "client_count": _client_registry.get_client_count(),
+        "rooms": _client_registry.get_room_counts(),
+        "bridge": _quote_bridge.get_stats(),
+        "conflation": _quote_conflator.get_stats(),
+        "subscriptions": _subscription_manager.get_stats(),
+        "journal": _tick_journal.get_stats() if _tick_journal else None,
+        "shm_board": _shm_board.get_stats() if _shm_board else None,
+        "metrics": metrics.get_stats()
     })
 
 
+@app.route('/metrics', methods=['GET'])
+def prometheus_metrics():
+    """Prometheus指标接口（文本格式）"""
+    bridge = _quote_bridge.get_stats()
+    conflation = _quote_conflator.get_stats()
+    gauges = {
+        "ctp_connected": (int(_is_ctp_connected), "Whether the market data feed is connected"),
+        "ctp_subscribed_instruments": (len(_subscribed_instruments), "Instruments subscribed upstream"),
+        "ctp_ws_clients": (_client_registry.get_client_count(), "Connected WebSocket clients"),
+        "ctp_bridge_depth": (bridge["depth"], "Quotes waiting in the thread bridge"),
+    }
+    counters = {
+        "ctp_bridge_overflow_dropped_total": (bridge["overflow_dropped"], "Quotes dropped by the full thread bridge"),
+        "ctp_conflated_quotes_total": (conflation["conflated"], "Quotes replaced by a newer quote before emit"),
+    }
+    return Response(metrics.render(gauges, counters), mimetype='text/plain; version=0.0.4')
+
+
+def _feed_mode(api) -> str:
+    """非CTP数据源的模式名称"""
+    if isinstance(api, RemoteFeedAPI):
+        return "remote"
+    return "replay" if isinstance(api, ReplayCTPAPI) else "mock"
+
+
 @app.route('/api/ctp/status', methods=['GET'])
 def ctp_status():
     """CTP连接状态接口"""
     if _is_mock_mode and _mock_api:
         return jsonify({
             "connected": _is_ctp_connected,
+            "state": _get_feed_state(),
             "logged_in": _mock_api.is_logged_in,
             "subscribed_instruments": list(_mock_api.get_subscribed_instruments()),
-            "mode": "mock"
+            "mode": _feed_mode(_mock_api),
+            "stats": _mock_api.get_stats()
         })
     elif _ctp_api:
         return jsonify({
             "connected": _is_ctp_connected,
+            "state": _get_feed_state(),
+            "last_event": _feed_state or None,
             "logged_in": _ctp_api.is_logged_in,
             "subscribed_instruments": list(_ctp_api.get_subscribed_instruments()),
-            "mode": "real"
+            "mode": "real",
+            "fronts": _ctp_api.get_stats()
         })
     else:
         return jsonify({"connected": False, "message": "CTP API not initialized"})
@@ -166,6 +531,9 @@ def ctp_connect():
     
     if _is_ctp_connected:
         return jsonify({"success": True, "message": "Already connected"})
+    if _ctp_api:
+        # 断线期间由多前置管理自动重连
+        return jsonify({"success": True, "message": f"Reconnecting automatically ({_get_feed_state()})"})
     
     success = init_ctp_api()
     if success:
@@ -194,105 +562,494 @@ def ctp_disconnect():
     return jsonify({"success": True, "message": "Disconnected from CTP server"})
 
 
+def _get_feed_api():
+    """当前行情源（模拟/回放或CTP），未初始化时返回 None；断线期间的订阅由行情源登记，恢复后统一补订"""
+    if _is_mock_mode and _mock_api:
+        return _mock_api
+    return _ctp_api
+
+
+def _subscribe_upstream(instrument_ids: list[str]) -> list[str]:
+    """登记订阅并向行情源批量订阅，返回此前未订阅的合约"""
+    with _lock:
+        added = [i for i in instrument_ids if i not in _subscribed_instruments]
+        _subscribed_instruments.update(added)
+    if not added:
+        return added
+    _snapshot_cache.clear()
+
+    # 如果行情源已初始化，订阅行情（由行情源按批次拆分请求；断线期间由行情源登记，恢复后补订）
+    api = _get_feed_api()
+    if api:
+        try:
+            if not api.subscribe_market_data(added):
+                logger.warning(f"Failed to subscribe market data for {len(added)} instruments")
+        except Exception as e:
+            logger.error(f"Error subscribing market data: {e}")
+    return added
+
+
+def _unsubscribe_upstream(instrument_ids: list[str]) -> list[str]:
+    """移除订阅并向行情源批量取消订阅，返回实际移除的合约"""
+    with _lock:
+        removed = [i for i in instrument_ids if i in _subscribed_instruments]
+        _subscribed_instruments.difference_update(removed)
+    if not removed:
+        return removed
+    _snapshot_cache.clear()
+    for instrument_id in removed:
+        _quote_board.clear(instrument_id)
+        _bar_engine.clear(instrument_id)
+
+    # 如果行情源已初始化，取消订阅行情
+    api = _get_feed_api()
+    if api:
+        try:
+            if not api.unsubscribe_market_data(removed):
+                logger.warning(f"Failed to unsubscribe market data for {len(removed)} instruments")
+        except Exception as e:
+            logger.error(f"Error unsubscribing market data: {e}")
+    return removed
+
+
+def _get_remote_feed() -> Optional[RemoteFeedAPI]:
+    """拆分部署的工作进程返回接入进程数据源，否则返回 None"""
+    return _mock_api if isinstance(_mock_api, RemoteFeedAPI) else None
+
+
+def _sync_pinned(pinned: set[str]) -> list[str]:
+    """使本进程的REST固定订阅与集群固定订阅一致，返回本进程此前未订阅的合约"""
+    held = set(_subscription_manager.get_held(PINNED_HOLDER))
+    acquired = sorted(pinned - held)
+    released = sorted(held - pinned)
+    if released:
+        _subscription_manager.release(PINNED_HOLDER, released)
+    if not acquired:
+        return []
+    _subscription_manager.acquire(PINNED_HOLDER, acquired)
+    return _subscribe_upstream(acquired)
+
+
+def _wait_remote_reply(remote: RemoteFeedAPI, request_id: Optional[int]) -> Optional[list[str]]:
+    """等待接入进程回复固定订阅请求，超时或未连接时返回 None"""
+    if request_id is None:
+        return None
+    deadline = time.monotonic() + REMOTE_REPLY_TIMEOUT
+    while True:
+        reply = remote.get_reply(request_id)
+        if reply is not None or time.monotonic() >= deadline:
+            return reply
+        socketio.sleep(0.005)
+
+
+def _split_known(instrument_ids: list[str]) -> tuple[list[str], list[str]]:
+    """按合约索引拆分为已知合约和未知合约，索引为空或全部合约已到期时全部视为已知"""
+    if not _instrument_index.validates():
+        return instrument_ids, []
+    known = [i for i in instrument_ids if i in _instrument_index]
+    unknown = [i for i in instrument_ids if i not in _instrument_index]
+    return known, unknown
+
+
+def _get_subscription_results(instrument_ids: list[str], added: list[str],
+                              unknown: list[str] = ()) -> dict[str, dict]:
+    """
+    获取各合约的订阅结果
+
+    CTP的订阅结果由 OnRspSubMarketData 异步回报，最多等待 CTP_SUBSCRIBE_TIMEOUT_MS，
+    超时仍未回报的合约状态为 pending；不在合约索引中的合约状态为 unknown
+    """
+    api = _get_feed_api()
+    if api is None:
+        # 行情源未连接，只完成了登记
+        results = {i: {"status": 'pending'} for i in instrument_ids}
+    else:
+        deadline = time.monotonic() + Config.CTP_SUBSCRIBE_TIMEOUT_MS / 1000.0
+        while True:
+            results = api.get_subscription_status(instrument_ids)
+            if time.monotonic() >= deadline or all(r["status"] != 'pending' for r in results.values()):
+                break
+            socketio.sleep(0.05)
+    added_set = set(added)
+    for instrument_id, result in results.items():
+        result["added"] = instrument_id in added_set
+    for instrument_id in unknown:
+        results[instrument_id] = {"status": 'unknown', "added": False}
+    return results
+
+
+def _is_subscribe_ok(results: dict[str, dict]) -> bool:
+    """订阅结果中没有失败和未知合约"""
+    return all(r["status"] not in ('failed', 'unknown') for r in results.values())
+
+
 @app.route('/api/subscriptions', methods=['GET'])
 def subscriptions():
+    remote = _get_remote_feed()
+    if remote:
+        # 拆分部署时返回全部工作进程和固定订阅的合约
+        return jsonify(sorted(remote.get_cluster_instruments()))
     with _lock:
         return jsonify(sorted(list(_subscribed_instruments)))
 
 
 @app.route('/api/subscribe', methods=['POST'])
 def subscribe():
+    """订阅合约行情，参数 instrumentId 或 instrumentIds（列表）"""
     try:
         data = SubscribePayload.model_validate(request.json or {})
     except ValidationError as e:
         return jsonify({"error": e.errors()}), 400
 
-    instrument_id = data.instrumentId.strip()
-    if not instrument_id:
-        return jsonify({"error": "instrumentId is required"}), 400
+    instrument_ids = data.get_instrument_ids()
+    if not instrument_ids:
+        return jsonify({"error": "instrumentId or instrumentIds is required"}), 400
 
-    with _lock:
-        _subscribed_instruments.add(instrument_id)
+    requested = instrument_ids
+    instrument_ids, unknown = _split_known(requested)
 
-    # 如果CTP已连接，订阅CTP行情
-    if _is_mock_mode and _mock_api and _is_ctp_connected:
-        try:
-            success = _mock_api.subscribe_market_data([instrument_id])
-            if not success:
-                logger.warning(f"Failed to subscribe mock CTP market data for {instrument_id}")
-        except Exception as e:
-            logger.error(f"Error subscribing mock CTP market data: {e}")
-    elif _ctp_api and _is_ctp_connected:
-        try:
-            success = _ctp_api.subscribe_market_data([instrument_id])
-            if not success:
-                logger.warning(f"Failed to subscribe CTP market data for {instrument_id}")
-        except Exception as e:
-            logger.error(f"Error subscribing CTP market data: {e}")
+    # REST订阅固定持有，直到通过 /api/unsubscribe 释放
+    remote = _get_remote_feed()
+    if remote and instrument_ids:
+        # 拆分部署时固定订阅登记在接入进程，对全部工作进程生效
+        if _wait_remote_reply(remote, remote.pin(instrument_ids)) is None:
+            return jsonify({"error": "ingest process did not respond"}), 503
+        added = _sync_pinned(remote.get_pinned())
+    else:
+        _subscription_manager.acquire(PINNED_HOLDER, [
+            i for i in instrument_ids if not _subscription_manager.is_held(PINNED_HOLDER, i)
+        ])
+        added = []
+    added += _subscribe_upstream(instrument_ids)
+    results = _get_subscription_results(instrument_ids, added, unknown)
 
-    return jsonify({"ok": True, "instrumentId": instrument_id})
+    response = {"ok": _is_subscribe_ok(results), "results": results}
+    if len(requested) == 1:
+        response["instrumentId"] = requested[0]
+    return jsonify(response)
 
 
 @app.route('/api/unsubscribe', methods=['POST'])
 def unsubscribe():
-    instrument_id = (request.json or {}).get('instrumentId', '').strip()
+    """取消订阅合约行情，参数 instrumentId 或 instrumentIds（列表）"""
+    try:
+        data = SubscribePayload.model_validate(request.json or {})
+    except ValidationError as e:
+        return jsonify({"error": e.errors()}), 400
+
+    instrument_ids = data.get_instrument_ids()
+    if not instrument_ids:
+        return jsonify({"error": "instrumentId or instrumentIds is required"}), 400
+
+    # 释放REST固定订阅，合约没有其他持有者时经过宽限期后取消上游订阅
+    remote = _get_remote_feed()
+    if remote:
+        released = _wait_remote_reply(remote, remote.unpin(instrument_ids))
+        if released is None:
+            return jsonify({"error": "ingest process did not respond"}), 503
+        _sync_pinned(remote.get_pinned())
+        pinned = [i for i in instrument_ids if i in released]
+    else:
+        pinned = [i for i in instrument_ids if _subscription_manager.is_held(PINNED_HOLDER, i)]
+        _subscription_manager.release(PINNED_HOLDER, pinned)
+    results = {
+        i: {"status": 'released', "holders": _subscription_manager.get_ref_count(i)}
+        if i in pinned else {"status": 'not_subscribed'}
+        for i in instrument_ids
+    }
+
+    response = {"ok": True, "results": results}
+    if len(instrument_ids) == 1:
+        response["instrumentId"] = instrument_ids[0]
+    return jsonify(response)
+
+
+@app.route('/api/quotes', methods=['GET'])
+def quotes():
+    """行情看板查询接口
+
+    参数：instruments（逗号分隔，默认全部）、sort（lastPrice/change/changePercent/volume/ts）、
+    order（asc/desc，默认desc）、limit
+    """
+    instruments = request.args.get('instruments', '').strip()
+    instrument_ids = [i.strip() for i in instruments.split(',') if i.strip()] if instruments else None
+    sort_by = request.args.get('sort') or None
+    descending = request.args.get('order', 'desc').lower() != 'asc'
+    try:
+        limit = int(request.args['limit']) if request.args.get('limit') else None
+        rows = _quote_board.query(instrument_ids, sort_by=sort_by, descending=descending, limit=limit)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    return jsonify(rows)
+
+
+@app.route('/api/bars', methods=['GET'])
+def bars():
+    """K线查询接口，参数：instrumentId、interval（1s/1m/5m/15m，默认1m）、limit（默认100）"""
+    instrument_id = request.args.get('instrumentId', '').strip()
+    if not instrument_id:
+        return jsonify({"error": "instrumentId is required"}), 400
+    interval = request.args.get('interval', '1m')
+    try:
+        limit = int(request.args.get('limit', '100'))
+        return jsonify(_bar_engine.get_bars(instrument_id, interval, limit))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+
+@app.route('/api/ticks', methods=['GET'])
+def ticks():
+    """
+    历史逐笔行情查询接口，参数：instrumentId、from、to（毫秒时间戳，含两端）
+
+    从逐笔行情日志中查询，结果以NDJSON（每行一笔）流式返回
+    """
+    instrument_id = request.args.get('instrumentId', '').strip()
     if not instrument_id:
         return jsonify({"error": "instrumentId is required"}), 400
+    try:
+        from_ts = int(request.args['from'])
+        to_ts = int(request.args['to'])
+    except (KeyError, ValueError):
+        return jsonify({"error": "from and to are required millisecond timestamps"}), 400
+    if from_ts > to_ts:
+        return jsonify({"error": "from must not be later than to"}), 400
 
-    with _lock:
-        _subscribed_instruments.discard(instrument_id)
+    def generate():
+        lines = []
+        for quote in query_ticks(Config.TICK_JOURNAL_DIR, instrument_id, from_ts, to_ts):
+            lines.append(json.dumps(quote.to_dict()))
+            if len(lines) >= 500:
+                yield '\n'.join(lines) + '\n'
+                lines = []
+        if lines:
+            yield '\n'.join(lines) + '\n'
 
-    # 如果CTP已连接，取消订阅CTP行情
-    if _is_mock_mode and _mock_api and _is_ctp_connected:
-        try:
-            success = _mock_api.unsubscribe_market_data([instrument_id])
-            if not success:
-                logger.warning(f"Failed to unsubscribe mock CTP market data for {instrument_id}")
-        except Exception as e:
-            logger.error(f"Error unsubscribing mock CTP market data: {e}")
-    elif _ctp_api and _is_ctp_connected:
-        try:
-            success = _ctp_api.unsubscribe_market_data([instrument_id])
-            if not success:
-                logger.warning(f"Failed to unsubscribe CTP market data for {instrument_id}")
-        except Exception as e:
-            logger.error(f"Error unsubscribing CTP market data: {e}")
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
 
-    return jsonify({"ok": True, "instrumentId": instrument_id})
+
+@app.route('/api/instruments/search', methods=['GET'])
+def search_instruments():
+    """合约查找接口，参数：q（合约代码前缀）、product（品种）、exchange（交易所）、limit（默认50）"""
+    try:
+        limit = int(request.args.get('limit', '50'))
+    except ValueError:
+        return jsonify({"error": "limit must be an integer"}), 400
+    instruments = _instrument_index.search(
+        prefix=request.args.get('q', '').strip(),
+        product=request.args.get('product', '').strip(),
+        exchange=request.args.get('exchange', '').strip(),
+        limit=max(0, min(limit, 1000))
+    )
+    return jsonify([instrument.to_dict() for instrument in instruments])
 
 
 # WebSocket 事件处理
 @socketio.on('connect')
-def handle_connect():
-    """客户端连接事件"""
-    logger.info(f"Client connected: {request.sid}")
-    # 发送欢迎消息
+def handle_connect(auth=None):
+    """客户端连接事件
+
+    客户端可在连接参数 auth 或查询串中指定 encoding=msgpack 以使用二进制推送
+    """
+    requested = (auth or {}).get('encoding') if isinstance(auth, dict) else None
+    encoding = negotiate_encoding(requested or request.args.get('encoding'))
+    _client_registry.set_encoding(request.sid, encoding)
+    logger.info(f"Client connected: {request.sid}, encoding: {encoding}")
+    # 欢迎消息和当前行情快照只发给新连接的客户端
     socketio.emit('server_info', {
         "message": "connected",
         "timestamp": int(time.time() * 1000),
-        "subscribed_count": len(_subscribed_instruments)
-    })
-    
-    # 如果有订阅的合约，发送当前行情
-    if _subscribed_instruments:
-        with _lock:
-            instruments = list(_subscribed_instruments)
-        for instrument in instruments:
-            if _is_mock_mode and _mock_api:
-                quote = _mock_api.get_last_quote(instrument)
-            elif _ctp_api:
-                quote = _ctp_api.get_last_quote(instrument)
-            else:
-                continue
-                
-            if quote:
-                socketio.emit('quote', quote)
+        "encoding": encoding,
+        "subscribed_count": len(_subscribed_instruments),
+        "ctp_state": _get_feed_state()
+    }, to=request.sid)
+    socketio.emit('snapshot', _get_snapshot(encoding), to=request.sid)
 
 
 @socketio.on('disconnect')
 def handle_disconnect():
     """客户端断开连接事件"""
-    logger.info(f"Client disconnected: {request.sid}")
+    had_fields = bool(_client_registry.get_fields(request.sid))
+    instruments = _client_registry.drop_client(request.sid)
+    _bar_registry.drop_client(request.sid)
+    if had_fields:
+        _update_parse_groups()
+    _delta_encoders.pop(request.sid, None)
+    expiring = _subscription_manager.release_all(request.sid)
+    logger.info(f"Client disconnected: {request.sid}, released {len(instruments)} rooms, "
+                f"{len(expiring)} instruments without holders")
+
+
+@socketio.on('subscribe')
+def handle_subscribe(data):
+    """客户端订阅合约行情（instrumentId 或 instrumentIds 列表），加入合约房间"""
+    try:
+        payload = SubscribePayload.model_validate(data or {})
+    except ValidationError as e:
+        return {"ok": False, "error": e.errors()}
+
+    instrument_ids = payload.get_instrument_ids()
+    if not instrument_ids:
+        return {"ok": False, "error": "instrumentId or instrumentIds is required"}
+    requested = instrument_ids
+    instrument_ids, unknown = _split_known(requested)
+
+    is_tick = _client_registry.get_mode(request.sid) == MODE_TICK
+    encoding = _client_registry.get_encoding(request.sid)
+    groups = _client_registry.get_fields(request.sid)
+    joined = []
+    for instrument_id in instrument_ids:
+        if _client_registry.join(request.sid, instrument_id):
+            joined.append(instrument_id)
+        if is_tick:
+            join_room(_quote_room(instrument_id, encoding, groups))
+
+    _subscription_manager.acquire(request.sid, joined)
+    added = _subscribe_upstream(instrument_ids)
+
+    # 发送当前行情给该客户端
+    _send_quotes_to(request.sid, [q for q in map(_get_last_quote, instrument_ids) if q])
+
+    results = _get_subscription_results(instrument_ids, added, unknown)
+    response = {"ok": _is_subscribe_ok(results), "results": results}
+    if len(requested) == 1:
+        response["instrumentId"] = requested[0]
+    return response
+
+
+@socketio.on('unsubscribe')
+def handle_unsubscribe(data):
+    """客户端取消订阅合约行情（instrumentId 或 instrumentIds 列表），离开合约房间"""
+    try:
+        payload = SubscribePayload.model_validate(data or {})
+    except ValidationError as e:
+        return {"ok": False, "error": e.errors()}
+
+    instrument_ids = payload.get_instrument_ids()
+    if not instrument_ids:
+        return {"ok": False, "error": "instrumentId or instrumentIds is required"}
+
+    is_tick = _client_registry.get_mode(request.sid) == MODE_TICK
+    encoding = _client_registry.get_encoding(request.sid)
+    groups = _client_registry.get_fields(request.sid)
+    encoder = _delta_encoders.get(request.sid)
+    left = []
+    for instrument_id in instrument_ids:
+        if _client_registry.leave(request.sid, instrument_id):
+            left.append(instrument_id)
+            if is_tick:
+                leave_room(_quote_room(instrument_id, encoding, groups))
+        if encoder:
+            encoder.forget(instrument_id)
+    _subscription_manager.release(request.sid, left)
+
+    response = {"ok": True, "instrumentIds": instrument_ids}
+    if len(instrument_ids) == 1:
+        response["instrumentId"] = instrument_ids[0]
+    return response
+
+
+@socketio.on('subscribe_bars')
+def handle_subscribe_bars(data):
+    """客户端订阅K线推送，加入K线房间"""
+    try:
+        payload = BarSubscribePayload.model_validate(data or {})
+    except ValidationError as e:
+        return {"ok": False, "error": e.errors()}
+
+    instrument_id = payload.instrumentId.strip()
+    if not instrument_id:
+        return {"ok": False, "error": "instrumentId is required"}
+    if not _split_known([instrument_id])[0]:
+        return {"ok": False, "error": f"Unknown instrument: {instrument_id}"}
+
+    join_room(_bar_room(instrument_id, payload.interval))
+    if _bar_registry.join(request.sid, f"{instrument_id}:{payload.interval}"):
+        _subscription_manager.acquire(request.sid, [instrument_id])
+    _subscribe_upstream([instrument_id])
+
+    return {"ok": True, "instrumentId": instrument_id, "interval": payload.interval}
+
+
+@socketio.on('unsubscribe_bars')
+def handle_unsubscribe_bars(data):
+    """客户端取消订阅K线推送，离开K线房间"""
+    try:
+        payload = BarSubscribePayload.model_validate(data or {})
+    except ValidationError as e:
+        return {"ok": False, "error": e.errors()}
+
+    instrument_id = payload.instrumentId.strip()
+    if not instrument_id:
+        return {"ok": False, "error": "instrumentId is required"}
+
+    leave_room(_bar_room(instrument_id, payload.interval))
+    if _bar_registry.leave(request.sid, f"{instrument_id}:{payload.interval}"):
+        _subscription_manager.release(request.sid, [instrument_id])
+
+    return {"ok": True, "instrumentId": instrument_id, "interval": payload.interval}
+
+
+@socketio.on('configure')
+def handle_configure(data):
+    """客户端设置推送方式"""
+    try:
+        payload = ConfigurePayload.model_validate(data or {})
+    except ValidationError as e:
+        return {"ok": False, "error": e.errors()}
+
+    if payload.mode is not None:
+        mode = payload.mode
+    elif payload.batch is not None:
+        mode = MODE_BATCH if payload.batch else MODE_TICK
+    else:
+        mode = None
+
+    old_mode = _client_registry.get_mode(request.sid)
+    old_encoding = _client_registry.get_encoding(request.sid)
+    old_groups = _client_registry.get_fields(request.sid)
+    if mode is not None and mode != old_mode:
+        _client_registry.set_mode(request.sid, mode)
+        # 切换为增量推送时从全量开始
+        _delta_encoders.pop(request.sid, None)
+    if payload.encoding is not None:
+        _client_registry.set_encoding(request.sid, negotiate_encoding(payload.encoding))
+    if payload.fields is not None:
+        groups = normalize_groups(payload.fields)
+        if groups != old_groups:
+            _client_registry.set_fields(request.sid, groups)
+            _delta_encoders.pop(request.sid, None)
+            _update_parse_groups()
+    _move_client_rooms(request.sid, old_mode, old_encoding, old_groups)
+
+    mode = _client_registry.get_mode(request.sid)
+    return {
+        "ok": True,
+        "mode": mode,
+        "batch": mode == MODE_BATCH,
+        "encoding": _client_registry.get_encoding(request.sid),
+        "fields": list(_client_registry.get_fields(request.sid))
+    }
+
+
+@socketio.on('resync')
+def handle_resync():
+    """客户端请求全量重新同步，重新发送其关注合约的最新行情"""
+    return {"ok": True, "count": _resync_client(request.sid)}
+
+
+def _resync_client(sid: str) -> int:
+    """重置客户端的增量编码并重新发送其关注合约的最新行情，返回发送的合约数"""
+    encoder = _delta_encoders.get(sid)
+    if encoder:
+        encoder.reset()
+    quotes = []
+    for instrument_id in sorted(_client_registry.get_client_instruments(sid)):
+        quote = _get_last_quote(instrument_id)
+        if quote:
+            quotes.append(quote)
+    _send_quotes_to(sid, quotes)
+    return len(quotes)
 
 
 @socketio.on('ping')
@@ -322,32 +1079,40 @@ def _mock_quote_stream():
 
             last_price_map[instrument] = price
 
-            socketio.emit('quote', {
-                'instrumentId': instrument,
-                'lastPrice': price,
-                'change': change,
-                'changePercent': change_percent,
-                'ts': int(time.time() * 1000)
-            })
+            _dispatch_quote(Quote(
+                instrument,
+                price,
+                change,
+                change_percent,
+                ts=int(time.time() * 1000)
+            ))
 
         socketio.sleep(sleep_seconds)
 
 
-def setup_logging():
-    """设置日志配置"""
-    logger.remove()  # 移除默认处理器
-    logger.add(
-        "logs/ctp_quote_{time}.log",
-        rotation="1 day",
-        retention="7 days",
-        level=Config.LOG_LEVEL,
-        format="{time:YYYY-MM-DD HH:mm:ss} | {level} | {name}:{function}:{line} - {message}"
-    )
-    logger.add(
-        lambda msg: print(msg, end=""),
-        level=Config.LOG_LEVEL,
-        format="<green>{time:HH:mm:ss}</green> | <level>{level}</level> | {message}"
-    )
+def _log_summary_loop():
+    """定期输出一行运行汇总，代替逐笔日志"""
+    interval = Config.LOG_SUMMARY_SECONDS
+    emit_histogram = metrics.histograms['emit']
+    last_ticks = metrics.tick_total
+    last_emit_counts = list(emit_histogram.counts)
+    last_errors = sum(metrics.error_counts.values())
+    while True:
+        socketio.sleep(interval)
+        ticks = metrics.tick_total - last_ticks
+        emit_counts = list(emit_histogram.counts)
+        interval_counts = [now - before for now, before in zip(emit_counts, last_emit_counts)]
+        errors = sum(metrics.error_counts.values())
+        bridge = _quote_bridge.get_stats()
+        logger.info(
+            f"Summary: {ticks} ticks ({ticks / interval:.0f}/s), "
+            f"{_client_registry.get_client_count()} clients, {len(_subscribed_instruments)} instruments, "
+            f"emit p50/p99 {emit_histogram.percentile(50, interval_counts) / 1e6:.1f}/"
+            f"{emit_histogram.percentile(99, interval_counts) / 1e6:.1f} ms, "
+            f"bridge dropped {bridge['overflow_dropped']}, errors {errors - last_errors}, "
+            f"suppressed log lines {_tick_log.drain_suppressed() + _error_log.drain_suppressed()}"
+        )
+        last_ticks, last_emit_counts, last_errors = metrics.tick_total, emit_counts, errors
 
 
 def start_mock_quote_stream():
@@ -360,10 +1125,7 @@ def start_mock_quote_stream():
 def main():
     """主函数"""
     # 设置日志
-    setup_logging()
-    
-    # 创建日志目录
-    os.makedirs("logs", exist_ok=True)
+    setup_logging('ctp_quote')
     
     logger.info("=" * 50)
     logger.info("CTP Quote App Server Starting...")
@@ -371,20 +1133,35 @@ def main():
     logger.info(f"CTP Simulation Mode: {Config.CTP_IS_SIM}")
     logger.info(f"CTP User ID: {Config.CTP_USER_ID}")
     logger.info(f"Server Port: {Config.PORT}")
+    logger.info(f"Log mode: {Config.LOG_MODE}, level: {Config.LOG_LEVEL}")
     
-    # 检查CTP配置
-    is_valid, error_msg = Config.validate_ctp_config()
+    # 检查CTP配置（拆分部署时由接入进程负责）
+    if Config.INGEST_SOCKET:
+        is_valid, error_msg = True, ""
+        logger.info(f"Worker mode, ingest socket: {Config.INGEST_SOCKET}")
+    else:
+        is_valid, error_msg = Config.validate_ctp_config()
     if not is_valid:
         logger.warning(f"CTP config invalid: {error_msg}")
         logger.warning("Will use mock data instead")
     else:
         logger.info("CTP config is valid")
     
+    # 启动逐笔行情日志
+    if _tick_journal:
+        _tick_journal.start()
+    if _shm_board:
+        _shm_board.start()
+    
     # 尝试连接CTP
     if is_valid:
         logger.info("Attempting to connect to CTP server...")
         if init_ctp_api():
             logger.success("✅ CTP API connected successfully")
+        elif Config.INGEST_SOCKET:
+            # 工作进程不回退到模拟数据，退出后由 cluster.py 重启
+            logger.error("❌ Failed to connect to ingest process")
+            sys.exit(1)
         else:
             logger.warning("❌ Failed to connect to CTP server, using mock data")
             start_mock_quote_stream()
@@ -392,6 +1169,13 @@ def main():
         logger.warning("❌ CTP credentials not provided, using mock data")
         start_mock_quote_stream()
     
+    # 启动行情线程桥和合并推送任务
+    socketio.start_background_task(_quote_bridge_loop)
+    socketio.start_background_task(_quote_flush_loop)
+    socketio.start_background_task(_subscription_reaper_loop)
+    if Config.LOG_SUMMARY_SECONDS > 0:
+        socketio.start_background_task(_log_summary_loop)
+    
     # 启动服务器
     logger.info(f"🚀 Starting Flask server on port {Config.PORT}")
     logger.info("=" * 50)
@@ -403,6 +1187,13 @@ def main():
     except Exception as e:
         logger.error(f"Server error: {e}")
         sys.exit(1)
+    finally:
+        if _tick_journal:
+            _tick_journal.close()
+        if _shm_board:
+            _shm_board.close()
+        # 等待队列中的日志写完
+        logger.complete()
 
 
 if __name__ == '__main__':
@@ -0,0 +1,164 @@
+"""
+K线聚合引擎
+在行情回调链上按合约维护1秒/1分/5分/15分的OHLCV K线，每笔行情的更新为常数时间。
+成交量取CTP累计成交量 Volume 的增量。
+"""
+
+from collections import deque
+from typing import Deque, Dict, Optional, Tuple
+
+from quote import Quote
+
+# 周期名 -> 毫秒
+INTERVALS = {
+    '1s': 1000,
+    '1m': 60 * 1000,
+    '5m': 5 * 60 * 1000,
+    '15m': 15 * 60 * 1000,
+}
+
+
+class Bar:
+    """单根K线"""
+
+    __slots__ = ('instrument_id', 'interval', 'start', 'open', 'high', 'low', 'close', 'volume', 'tick_count')
+
+    def __init__(self, instrument_id: str, interval: str, start: int, price: float):
+        self.instrument_id = instrument_id
+        self.interval = interval
+        self.start = start
+        self.open = price
+        self.high = price
+        self.low = price
+        self.close = price
+        self.volume = 0
+        self.tick_count = 0
+
+    def to_dict(self, closed: bool = False) -> dict:
+        """转换为推送格式"""
+        return {
+            'instrumentId': self.instrument_id,
+            'interval': self.interval,
+            'start': self.start,
+            'open': self.open,
+            'high': self.high,
+            'low': self.low,
+            'close': self.close,
+            'volume': self.volume,
+            'ticks': self.tick_count,
+            'closed': closed,
+        }
+
+
+class BarEngine:
+    """K线聚合引擎类"""
+
+    def __init__(self, intervals: Optional[Dict[str, int]] = None, history: int = 500):
+        """
+        初始化K线引擎
+
+        Args:
+            intervals: 周期名 -> 周期毫秒数，默认 INTERVALS
+            history: 每个合约每个周期保留的已完成K线数量
+        """
+        self.intervals = intervals or INTERVALS
+        self.history_size = history
+
+        # (合约, 周期) -> 当前K线 / 已完成K线
+        self.current: Dict[Tuple[str, str], Bar] = {}
+        self.history: Dict[Tuple[str, str], Deque[Bar]] = {}
+        # 合约 -> 上一笔累计成交量
+        self.last_volumes: Dict[str, int] = {}
+
+        # 上次取出后有更新的K线和新完成的K线
+        self.updated: Dict[Tuple[str, str], Bar] = {}
+        self.closed: list[Bar] = []
+
+    def update(self, quote: Quote):
+        """用一笔行情更新该合约各周期的K线"""
+        instrument_id = quote.instrument_id
+        price = quote.last_price
+        if price <= 0:
+            return
+
+        # 累计成交量的增量，累计量变小视为新交易日重新计数
+        last_volume = self.last_volumes.get(instrument_id)
+        volume = quote.volume
+        if last_volume is None:
+            delta = 0
+        elif volume >= last_volume:
+            delta = volume - last_volume
+        else:
+            delta = volume
+        self.last_volumes[instrument_id] = volume
+
+        ts = quote.ts
+        for interval, interval_ms in self.intervals.items():
+            key = (instrument_id, interval)
+            start = ts - ts % interval_ms
+            bar = self.current.get(key)
+            if bar is None or start > bar.start:
+                if bar is not None:
+                    self._close(key, bar)
+                bar = self.current[key] = Bar(instrument_id, interval, start, price)
+            elif start < bar.start:
+                # 乱序的旧行情不再修改已开始的新K线
+                continue
+            else:
+                if price > bar.high:
+                    bar.high = price
+                elif price < bar.low:
+                    bar.low = price
+                bar.close = price
+            bar.volume += delta
+            bar.tick_count += 1
+            self.updated[key] = bar
+
+    def close_expired(self, now_ms: int):
+        """收盘已到期但之后没有新行情的K线"""
+        for key, bar in list(self.current.items()):
+            if bar.start + self.intervals[bar.interval] <= now_ms:
+                del self.current[key]
+                self._close(key, bar)
+
+    def drain(self) -> Tuple[list[Bar], list[Bar]]:
+        """
+        取出上次调用以来的变化
+
+        Returns:
+            (新完成的K线, 仍在进行中且有更新的K线)
+        """
+        closed = self.closed
+        updated = [bar for key, bar in self.updated.items() if self.current.get(key) is bar]
+        self.closed = []
+        self.updated = {}
+        return closed, updated
+
+    def get_bars(self, instrument_id: str, interval: str, limit: Optional[int] = None) -> list[dict]:
+        """获取最近的K线（时间升序，最后一根可能未完成）"""
+        if interval not in self.intervals:
+            raise ValueError(f"Unsupported interval: {interval}")
+        key = (instrument_id, interval)
+        bars = [bar.to_dict(closed=True) for bar in self.history.get(key, ())]
+        current = self.current.get(key)
+        if current is not None:
+            bars.append(current.to_dict())
+        if limit is not None:
+            bars = bars[-limit:] if limit > 0 else []
+        return bars
+
+    def clear(self, instrument_id: str):
+        """清除合约的全部K线"""
+        for interval in self.intervals:
+            key = (instrument_id, interval)
+            self.current.pop(key, None)
+            self.history.pop(key, None)
+            self.updated.pop(key, None)
+        self.last_volumes.pop(instrument_id, None)
+
+    def _close(self, key: Tuple[str, str], bar: Bar):
+        history = self.history.get(key)
+        if history is None:
+            history = self.history[key] = deque(maxlen=self.history_size)
+        history.append(bar)
+        self.closed.append(bar)
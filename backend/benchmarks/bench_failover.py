@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+多前置切换测试
+用模拟前置（tests/fake_front.py，可设定连接耗时、首笔行情耗时，可主动断开或停止推送）驱动 FrontManager：
+检查按首笔行情耗时选出的工作前置，断开工作前置和行情停滞两种情况下的切换耗时、
+客户端可见的行情停顿以及切换期间最新行情缓存是否保持；最后让全部前置同时不可用一段时间，
+检查按指数退避重连、连接状态变化和断线到恢复后第一笔行情的时间
+
+用法：python benchmarks/bench_failover.py [合约数]
+"""
+
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from loguru import logger
+
+from front_manager import FrontManager
+from metrics import metrics
+from quote import Quote
+from tests.fake_front import FakeFrontSession, wait_for
+
+# 前置地址 -> (连接登录耗时, 订阅后首笔行情耗时)（秒）
+FRONTS = {
+    'tcp://fake-a:10131': (0.20, 0.02),
+    'tcp://fake-b:10131': (0.05, 0.30),
+    'tcp://fake-c:10131': (0.10, 0.05),
+}
+TICK_SECONDS = 0.02
+# 不可用的前置（连接不上）
+DOWN: set[str] = set()
+OUTAGE_SECONDS = 2.0
+
+
+class Recorder:
+    """记录客户端收到行情的时刻，计算最长停顿"""
+
+    def __init__(self):
+        self.count = 0
+        self.last = 0.0
+        self.max_gap = 0.0
+
+    def on_quote(self, quote: Quote):
+        now = time.monotonic()
+        if self.last:
+            self.max_gap = max(self.max_gap, now - self.last)
+        self.last = now
+        self.count += 1
+
+    def reset_gap(self):
+        self.max_gap = 0.0
+
+
+def main():
+    """主函数"""
+    logger.remove()
+    logger.add(lambda msg: print(msg, end=""), level="INFO", format="{message}",
+               filter=lambda record: record["extra"].get("bench"))
+    report = logger.bind(bench=True)
+
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    sessions: dict[str, list[FakeFrontSession]] = {address: [] for address in FRONTS}
+
+    def factory(address: str) -> FakeFrontSession:
+        session = FakeFrontSession(address, *FRONTS[address], down=DOWN, tick_seconds=TICK_SECONDS)
+        sessions[address].append(session)
+        return session
+
+    recorder = Recorder()
+    manager = FrontManager(list(FRONTS), factory, probe_instruments=['probe'], probe_seconds=2.0, stale_seconds=1.0,
+                           reconnect_initial=0.2, reconnect_max=1.0)
+    manager.add_quote_callback(recorder.on_quote)
+    transitions = []
+    manager.add_status_listener(transitions.append)
+    instruments = [f"rb{i:05d}" for i in range(count)]
+    manager.subscribe_market_data(instruments)
+    manager.connect()
+
+    ok = wait_for(lambda: manager.front_address is not None and recorder.count > 0, 5)
+    stats = manager.get_stats()
+    report.info(f"Failover test: {len(FRONTS)} fake fronts, {count} instruments")
+    for address in stats['ranking']:
+        front = stats['fronts'][address]
+        report.info(f"  {address}: login {front['login_ms']:.0f} ms, first tick {front['first_tick_ms']:.0f} ms")
+    report.info(f"selected {stats['active']} (expected tcp://fake-a:10131), standby {stats['standby']}, ok={ok}")
+    wait_for(lambda: manager.standby is not None, 3)
+    time.sleep(0.3)
+
+    for scenario in ('disconnect', 'stale'):
+        old = manager.active
+        before = manager.failover_count
+        cached = len(manager.get_all_quotes())
+        recorder.reset_gap()
+        started = time.monotonic()
+        if scenario == 'disconnect':
+            old.api.drop()
+        else:
+            old.api.frozen = True
+        switched = wait_for(lambda: manager.failover_count > before and manager.last_failover['stall_ms'], 5)
+        warm = len(manager.get_all_quotes())
+        failover = manager.last_failover
+        report.info(f"{scenario}: {failover['from']} -> {failover['to']}, switched={switched}, "
+                    f"detected+switch {(time.monotonic() - started) * 1000:.0f} ms, "
+                    f"switch {failover['switch_ms']} ms, stall {failover['stall_ms']} ms, "
+                    f"max client gap {recorder.max_gap * 1000:.0f} ms, cache {cached} -> {warm}, "
+                    f"old released={old.api.released}")
+        wait_for(lambda: manager.standby is not None, 12)
+        time.sleep(0.3)
+
+    # 全部前置不可用：切换失败后按退避重试，前置恢复后重新订阅
+    manager.probe_seconds = 0.3
+    transitions.clear()
+    DOWN.update(FRONTS)
+    standby = manager.standby
+    if standby is not None:
+        standby.api.drop()
+    started = time.monotonic()
+    manager.active.api.drop()
+    time.sleep(OUTAGE_SECONDS)
+    DOWN.clear()
+    recovered = wait_for(lambda: manager.feed_state.state == 'streaming', 10)
+    report.info(f"outage {OUTAGE_SECONDS:.0f}s: recovered={recovered} in {(time.monotonic() - started) * 1000:.0f} ms, "
+                f"recovery metric {manager.feed_state.last_recovery_ms} ms, "
+                f"reconnect attempts {sum(1 for e in transitions if e['state'] == 'reconnecting')}")
+    for event in transitions:
+        detail = {k: v for k, v in event.items() if k not in ('state', 'previous', 'timestamp')}
+        report.info(f"  {event['previous']} -> {event['state']} {detail}")
+    recovery = metrics.recovery.get_stats()
+    report.info(f"disconnects: {metrics.disconnect_count}, recovery p50 {recovery['p50_us'] / 1000:.0f} ms, "
+                f"max {recovery['max_us'] / 1000:.0f} ms")
+
+    manager.disconnect()
+    report.info(f"quotes delivered: {recorder.count}, failovers: {manager.failover_count}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""
+合约索引查找基准
+生成指定数量的合约，测量前缀、品种和交易所查找的单次耗时
+
+用法：python benchmarks/bench_instrument_search.py [合约数量]
+"""
+
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from loguru import logger
+
+from instrument_index import Instrument, InstrumentIndex
+
+EXCHANGES = ('SHFE', 'DCE', 'CZCE', 'CFFEX', 'INE', 'GFEX')
+
+
+def make_instruments(count: int) -> list[Instrument]:
+    """生成测试合约：品种代码 + 年月 + 期权行权价"""
+    instruments = []
+    products = [f"{chr(97 + i // 26)}{chr(97 + i % 26)}" for i in range(120)]
+    for i in range(count):
+        product = products[i % len(products)]
+        month = 2501 + (i // len(products)) % 12
+        strike = i // (len(products) * 12)
+        instrument_id = f"{product}{month}" + (f"-C-{1000 + strike * 50}" if strike else '')
+        instruments.append(Instrument(instrument_id, EXCHANGES[i % len(EXCHANGES)], product, price_tick=1.0))
+    return instruments
+
+
+def bench(name: str, search, rounds: int = 20000):
+    """测量单次查找耗时"""
+    found = 0
+    start = time.perf_counter()
+    for _ in range(rounds):
+        found = len(search())
+    elapsed = time.perf_counter() - start
+    logger.info(f"{name:24}{elapsed / rounds * 1e6:>12.2f}{found:>10}")
+
+
+def main():
+    """主函数"""
+    logger.remove()
+    logger.add(lambda msg: print(msg, end=""), level="INFO", format="{message}")
+
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    start = time.perf_counter()
+    index = InstrumentIndex(make_instruments(count))
+    logger.info(f"Instrument search benchmark: {len(index)} instruments, built in "
+                f"{(time.perf_counter() - start) * 1000:.1f} ms")
+    logger.info(f"{'':24}{'us/search':>12}{'results':>10}")
+    bench("prefix 'ab25'", lambda: index.search(prefix='ab25'))
+    bench("prefix 'ab2503-C'", lambda: index.search(prefix='ab2503-C'))
+    bench("product 'ab'", lambda: index.search(product='ab'))
+    bench("exchange 'DCE'", lambda: index.search(exchange='DCE'))
+    bench("product + exchange", lambda: index.search(product='ab', exchange='DCE'))
+    bench("contains", lambda: [i for i in ('ab2501', 'zz9999') if i in index])
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+行情路径日志开销基准
+对比逐笔 f-string 调试日志与按合约限速的采样日志在INFO和DEBUG级别下的单笔耗时，
+以及同步文件输出与队列异步输出（enqueue）的单行耗时
+
+用法：python benchmarks/bench_logging.py [笔数]
+"""
+
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from loguru import logger
+
+from log_sampler import LogSampler
+from quote import Quote
+
+FILE_FORMAT = "{time:YYYY-MM-DD HH:mm:ss} | {level} | {name}:{function}:{line} - {message}"
+
+
+def make_quotes(count: int) -> list[Quote]:
+    """生成测试行情：100个合约轮流"""
+    return [Quote(f"rb{2501 + i % 100}", 3500.0 + i % 50, 1.0, 0.03, i, ts=i) for i in range(count)]
+
+
+def log_fstring(quotes: list[Quote]):
+    for quote in quotes:
+        logger.debug(f"Sent quote: {quote.instrument_id} = {quote.last_price}")
+
+
+def make_log_sampled(sampler: LogSampler):
+    def log_sampled(quotes: list[Quote]):
+        for quote in quotes:
+            if sampler.allow(quote.instrument_id):
+                logger.debug("Sent quote: {} = {}", quote.instrument_id, quote.last_price)
+    return log_sampled
+
+
+def log_nothing(quotes: list[Quote]):
+    for quote in quotes:
+        pass
+
+
+def measure(run, quotes: list[Quote]) -> float:
+    """单笔耗时（纳秒）"""
+    start = time.perf_counter_ns()
+    run(quotes)
+    return (time.perf_counter_ns() - start) / len(quotes)
+
+
+def add_file_sink(directory: str, level: str, enqueue: bool) -> int:
+    """添加与服务相同格式的文件输出"""
+    return logger.add(f"{directory}/bench.log", level=level, format=FILE_FORMAT, enqueue=enqueue)
+
+
+def main():
+    """主函数"""
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    quotes = make_quotes(count)
+    logger.remove()
+    console = logger.add(lambda msg: print(msg, end=""), level="INFO", format="{message}",
+                         filter=lambda record: record["extra"].get("bench"))
+    report = logger.bind(bench=True)
+    results = []
+
+    with tempfile.TemporaryDirectory() as directory:
+        baseline = measure(log_nothing, quotes)
+        report.info(f"Logging benchmark: {count} ticks, ns/tick (loop overhead {baseline:.1f} ns removed)")
+        for level in ('INFO', 'DEBUG'):
+            for enqueue in (False, True):
+                sink = add_file_sink(directory, level, enqueue)
+                sampled = make_log_sampled(LogSampler(interval=10.0, enabled=level == 'DEBUG'))
+                mode = 'enqueue' if enqueue else 'sync'
+                for name, run in ((f"{level} {mode} f-string per tick", log_fstring),
+                                  (f"{level} {mode} sampled + lazy", sampled)):
+                    results.append((name, measure(run, quotes) - baseline))
+                logger.remove(sink)
+
+    for name, elapsed in results:
+        report.info(f"{name:40}{elapsed:>12.1f}")
+    logger.remove(console)
+
+
+if __name__ == '__main__':
+    main()
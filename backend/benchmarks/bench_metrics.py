@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+"""
+运行指标记录开销基准
+测量延迟直方图单次记录、行情计数和一次Prometheus输出的耗时
+
+用法：python benchmarks/bench_metrics.py [记录次数]
+"""
+
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from loguru import logger
+
+from metrics import Metrics
+
+
+def bench(name: str, operation, values: list):
+    """测量单次操作耗时（含循环开销）"""
+    start = time.perf_counter_ns()
+    for value in values:
+        operation(value)
+    elapsed = time.perf_counter_ns() - start
+    logger.info(f"{name:24}{elapsed / len(values):>12.1f}")
+
+
+def main():
+    """主函数"""
+    logger.remove()
+    logger.add(lambda msg: print(msg, end=""), level="INFO", format="{message}")
+
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    rng = random.Random(1)
+    # 对数均匀分布的耗时：1微秒到100毫秒
+    values = [int(10 ** rng.uniform(3, 8)) for _ in range(count)]
+    instruments = [f"rb{2501 + i % 12}" for i in range(count)]
+    metrics = Metrics()
+    histogram = metrics.histograms['queue']
+
+    logger.info(f"Metrics benchmark: {count} operations")
+    logger.info(f"{'':24}{'ns/op':>12}")
+    bench("loop overhead", lambda value: None, values)
+    bench("histogram.record", histogram.record, values)
+    bench("metrics.record", lambda value: metrics.record('queue', value), values)
+    bench("metrics.count_tick", metrics.count_tick, instruments)
+
+    start = time.perf_counter()
+    text = metrics.render()
+    logger.info(f"render: {(time.perf_counter() - start) * 1000:.2f} ms, {len(text.splitlines())} lines")
+    stats = histogram.get_stats()
+    logger.info(f"p50 {stats['p50_us']} us, p99 {stats['p99_us']} us, p999 {stats['p999_us']} us")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+行情记录内存与分配基准
+对比每笔行情使用8键字典和 __slots__ Quote 时的单合约内存占用与单笔分配次数
+
+用法：python benchmarks/bench_quote.py [合约数量] [行情笔数]
+"""
+
+import gc
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from loguru import logger
+
+from quote import Quote
+
+
+def make_dict(instrument_id: str, price: float, ts: int) -> dict:
+    """旧的字典行情（与原 _parse_market_data 相同的8个键）"""
+    return {
+        'instrumentId': instrument_id,
+        'lastPrice': round(price, 2),
+        'change': round(price - 3500.0, 2),
+        'changePercent': round((price - 3500.0) / 35.0, 2),
+        'volume': ts & 0xFFFF,
+        'updateTime': '14:30:00',
+        'updateMillisec': 500,
+        'ts': ts
+    }
+
+
+def make_quote(instrument_id: str, price: float, ts: int) -> Quote:
+    """__slots__ 行情记录"""
+    return Quote(
+        instrument_id,
+        round(price, 2),
+        round(price - 3500.0, 2),
+        round((price - 3500.0) / 35.0, 2),
+        ts & 0xFFFF,
+        '14:30:00',
+        500,
+        ts
+    )
+
+
+def measure_cache(factory, instrument_ids: list[str]) -> float:
+    """按合约缓存最新行情时每个合约占用的字节数"""
+    gc.collect()
+    tracemalloc.start()
+    base = tracemalloc.get_traced_memory()[0]
+    ts = 1_700_000_000_000
+    cache = {instrument_id: factory(instrument_id, 3500.0 + i * 0.01, ts + i)
+             for i, instrument_id in enumerate(instrument_ids)}
+    used = tracemalloc.get_traced_memory()[0] - base
+    tracemalloc.stop()
+    # 扣除缓存字典本身，只计行情记录
+    used -= sys.getsizeof(cache)
+    return used / len(instrument_ids)
+
+
+def measure_ticks(factory, instrument_ids: list[str], ticks: int) -> tuple[float, float]:
+    """逐笔覆盖缓存时每笔新增的内存块数与耗时（微秒）"""
+    cache = {}
+    count = len(instrument_ids)
+    ts = 1_700_000_000_000
+    gc.collect()
+    gc.disable()
+    blocks_before = sys.getallocatedblocks()
+    kept = []
+    start = time.perf_counter()
+    for i in range(ticks):
+        instrument_id = instrument_ids[i % count]
+        quote = factory(instrument_id, 3500.0 + (i % 97) * 0.2, ts + i)
+        cache[instrument_id] = quote
+        kept.append(quote)
+    elapsed = time.perf_counter() - start
+    blocks_after = sys.getallocatedblocks()
+    gc.enable()
+    # kept 保持每笔行情存活，块数差即为每笔行情产生的分配（含价格等浮点/整数对象）
+    blocks = (blocks_after - blocks_before) / ticks
+    return blocks, elapsed / ticks * 1e6
+
+
+def main():
+    """主函数"""
+    logger.remove()
+    logger.add(lambda msg: print(msg, end=""), level="INFO", format="{message}")
+
+    instrument_count = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    tick_count = int(sys.argv[2]) if len(sys.argv) > 2 else 200000
+    instrument_ids = [f"rb{2500 + i}" for i in range(instrument_count)]
+
+    logger.info(f"Quote record benchmark: {instrument_count} instruments, {tick_count} ticks")
+    logger.info(f"{'':8}{'bytes/instrument':>18}{'blocks/tick':>14}{'us/tick':>10}")
+    for name, factory in (("dict", make_dict), ("Quote", make_quote)):
+        per_instrument = measure_cache(factory, instrument_ids)
+        blocks, micros = measure_ticks(factory, instrument_ids, tick_count)
+        logger.info(f"{name:8}{per_instrument:>18.1f}{blocks:>14.2f}{micros:>10.3f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+共享内存行情表基准
+测量写入端单笔写入、读取端单合约一致读取和整表快照的耗时，并与从进程内字典复制全部行情
+（get_all_quotes）对比；另起一个进程持续写入，统计并发下的快照耗时和重试次数
+
+用法：python benchmarks/bench_shm_board.py [合约数]
+"""
+
+import multiprocessing as mp
+import os
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from loguru import logger
+
+from quote import Quote
+from shm_board import SharedQuoteBoard, SharedQuoteBoardReader
+
+EXTRA = {'bidPrice1': 3499.0, 'bidVolume1': 5, 'askPrice1': 3501.0, 'askVolume1': 7}
+
+
+def make_quotes(instruments: int, count: int) -> list[Quote]:
+    """生成测试行情：合约轮流，奇数笔带一档盘口"""
+    return [
+        Quote(f"rb{i % instruments:05d}", 3500.0 + i % 50, 1.0, 0.03, i, '10:00:00', i % 1000, ts=i + 1,
+              extra=EXTRA if i % 2 else None)
+        for i in range(count)
+    ]
+
+
+def per_op(elapsed_ns: int, count: int) -> float:
+    return elapsed_ns / count
+
+
+def writer_loop(name: str, instruments: int, stop, ready):
+    """并发测试的写入进程"""
+    logger.remove()
+    board = SharedQuoteBoard(name, capacity=instruments)
+    board.start()
+    quotes = make_quotes(instruments, 100_000)
+    ready.set()
+    while not stop.is_set():
+        for quote in quotes:
+            board.update(quote)
+    board.close()
+
+
+def main():
+    """主函数"""
+    logger.remove()
+    logger.add(lambda msg: print(msg, end=""), level="INFO", format="{message}",
+               filter=lambda record: record["name"] != "shm_board")
+
+    instruments = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    name = f"ctp_bench_{os.getpid()}"
+    quotes = make_quotes(instruments, 200_000)
+    ids = [f"rb{i:05d}" for i in range(instruments)]
+
+    board = SharedQuoteBoard(name, capacity=instruments)
+    board.start()
+    start = time.perf_counter_ns()
+    for quote in quotes:
+        board.update(quote)
+    write_ns = per_op(time.perf_counter_ns() - start, len(quotes))
+
+    reader = SharedQuoteBoardReader(name)
+    reader.read(ids[-1])
+    start = time.perf_counter_ns()
+    for instrument_id in ids:
+        reader.read(instrument_id)
+    read_ns = per_op(time.perf_counter_ns() - start, len(ids))
+    start = time.perf_counter_ns()
+    for instrument_id in ids:
+        reader.get_quote(instrument_id)
+    quote_ns = per_op(time.perf_counter_ns() - start, len(ids))
+
+    rounds = 200
+    start = time.perf_counter_ns()
+    for _ in range(rounds):
+        snapshot = reader.snapshot()
+    snapshot_us = per_op(time.perf_counter_ns() - start, rounds) / 1000
+    assert len(snapshot) == instruments
+
+    # 对比：进程内行情源 get_all_quotes() 在锁内复制字典
+    cache = {quote.instrument_id: quote for quote in quotes}
+    start = time.perf_counter_ns()
+    for _ in range(rounds):
+        cache.copy()
+    dict_us = per_op(time.perf_counter_ns() - start, rounds) / 1000
+    reader.close()
+    board.close()
+
+    logger.info(f"Shared quote board benchmark: {instruments} instruments")
+    logger.info(f"{'write (writer, per tick)':36}{write_ns:>12.1f} ns")
+    logger.info(f"{'read record (reader)':36}{read_ns:>12.1f} ns")
+    logger.info(f"{'read + to Quote (reader)':36}{quote_ns:>12.1f} ns")
+    logger.info(f"{'snapshot all (reader)':36}{snapshot_us:>12.1f} us")
+    logger.info(f"{'dict copy (in-process cache)':36}{dict_us:>12.1f} us")
+
+    # 另一个进程持续写入时的快照
+    concurrent_name = f"{name}_w"
+    stop, ready = mp.Event(), mp.Event()
+    writer = mp.Process(target=writer_loop, args=(concurrent_name, instruments, stop, ready))
+    writer.start()
+    ready.wait()
+    time.sleep(0.2)
+    reader = SharedQuoteBoardReader(concurrent_name)
+    start = time.perf_counter_ns()
+    for _ in range(rounds):
+        snapshot = reader.snapshot()
+    concurrent_us = per_op(time.perf_counter_ns() - start, rounds) / 1000
+    retries = reader.retry_count
+    reader.close()
+    stop.set()
+    writer.join()
+    logger.info(f"{'snapshot all, concurrent writer':36}{concurrent_us:>12.1f} us  ({retries} retries, "
+                f"{len(snapshot)} instruments)")
+
+
+if __name__ == '__main__':
+    mp.set_start_method('spawn')
+    main()
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+行情推送编码基准
+对比JSON（Socket.IO文本帧）与MessagePack（固定字段顺序数组）的单笔编码耗时和字节数
+
+用法：python benchmarks/bench_wire_encoding.py [行情笔数]
+"""
+
+import json
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from loguru import logger
+
+from quote import Quote
+from wire_codec import ENCODING_JSON, ENCODING_MSGPACK, encode_quote, encode_quotes, is_msgpack_available
+
+
+def make_quotes(count: int) -> list[Quote]:
+    """生成测试行情"""
+    quotes = []
+    for i in range(count):
+        price = 3500.0 + (i % 200) * 0.5
+        quotes.append(Quote(
+            f"rb{2501 + i % 12}",
+            price,
+            round(price - 3490.0, 2),
+            round((price - 3490.0) / 34.9, 2),
+            120000 + i,
+            '14:30:%02d' % (i % 60),
+            (i % 2) * 500,
+            1_700_000_000_000 + i * 500
+        ))
+    return quotes
+
+
+def wire_json(quote: Quote) -> str:
+    """与Socket.IO发送文本帧相同的JSON序列化（事件名 + 参数数组）"""
+    return json.dumps(['quote', encode_quote(quote, ENCODING_JSON)], separators=(',', ':'))
+
+
+def wire_msgpack(quote: Quote) -> bytes:
+    """二进制帧的附件内容"""
+    return encode_quote(quote, ENCODING_MSGPACK)
+
+
+def bench(name: str, encode, quotes: list[Quote]):
+    """测量单笔编码耗时与字节数"""
+    total_bytes = 0
+    start = time.perf_counter()
+    for quote in quotes:
+        total_bytes += len(encode(quote))
+    elapsed = time.perf_counter() - start
+    count = len(quotes)
+    logger.info(f"{name:16}{elapsed / count * 1e6:>12.3f}{total_bytes / count:>14.1f}")
+
+
+def bench_batch(name: str, encoding: str, quotes: list[Quote], batch_size: int = 100):
+    """测量批量 quotes 事件的单笔平均耗时与字节数"""
+    total_bytes = 0
+    start = time.perf_counter()
+    for i in range(0, len(quotes), batch_size):
+        encoded = encode_quotes(quotes[i:i + batch_size], encoding)
+        if encoding == ENCODING_JSON:
+            encoded = json.dumps(['quotes', encoded], separators=(',', ':'))
+        total_bytes += len(encoded)
+    elapsed = time.perf_counter() - start
+    count = len(quotes)
+    logger.info(f"{name:16}{elapsed / count * 1e6:>12.3f}{total_bytes / count:>14.1f}")
+
+
+def main():
+    """主函数"""
+    logger.remove()
+    logger.add(lambda msg: print(msg, end=""), level="INFO", format="{message}")
+
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    quotes = make_quotes(count)
+
+    logger.info(f"Wire encoding benchmark: {count} ticks")
+    logger.info(f"{'':16}{'us/tick':>12}{'bytes/tick':>14}")
+    bench("json", wire_json, quotes)
+    bench_batch("json x100", ENCODING_JSON, quotes)
+    if not is_msgpack_available():
+        logger.warning("msgpack is not installed, skipping MessagePack encoding")
+        return
+    bench("msgpack", wire_msgpack, quotes)
+    bench_batch("msgpack x100", ENCODING_MSGPACK, quotes)
+
+
+if __name__ == '__main__':
+    main()
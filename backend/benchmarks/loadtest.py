@@ -0,0 +1,421 @@
+#!/usr/bin/env python3
+"""
+端到端压测
+以模拟行情启动服务进程（或连接已运行的服务），在多个进程中启动无界面Socket.IO客户端订阅同一组合约，
+按行情生成时刻（ts）统计行情到达客户端的延迟分位数、吞吐量、丢失笔数和服务进程的CPU/内存，结果保存为JSON
+
+用法：python benchmarks/loadtest.py --clients 100 --instruments 50 --tick-rate 5000 --duration 30
+依赖：pip install aiohttp（python-socketio 的 asyncio 客户端）
+"""
+
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import platform
+import subprocess
+import sys
+import time
+import urllib.request
+from pathlib import Path
+from typing import Optional
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BACKEND_DIR))
+
+import numpy as np
+from loguru import logger
+
+from instrument_index import InstrumentIndex
+from mock_market import BASE_PRICES
+from quote import Quote
+
+try:
+    import msgpack
+except ImportError:  # MessagePack 为可选依赖
+    msgpack = None
+
+TS_INDEX = Quote.FIELDS.index('ts')
+# 测量窗口结束后继续接收的时间，用于收齐窗口内生成的行情
+DRAIN_SECONDS = 2.0
+
+
+class ClientStats:
+    """单个压测进程内全部客户端的接收统计"""
+
+    def __init__(self):
+        # 测量窗口（毫秒时间戳），开始信号之前不统计
+        self.start_ms = float('inf')
+        self.stop_ms = float('inf')
+        self.latencies: list[float] = []
+        self.quotes = 0
+        self.messages = 0
+        self.bytes = 0
+
+    def on_quote(self, data):
+        """逐笔推送"""
+        self._record(data, batch=False)
+
+    def on_quotes(self, data):
+        """批量推送"""
+        self._record(data, batch=True)
+
+    def _record(self, data, batch: bool):
+        """只统计生成时刻在测量窗口内的行情"""
+        now_ms = time.time() * 1000
+        size = 0
+        if isinstance(data, (bytes, bytearray)):
+            size = len(data)
+            data = msgpack.unpackb(data)
+        rows = data if batch else [data]
+        counted = 0
+        for row in rows:
+            ts = row['ts'] if isinstance(row, dict) else row[TS_INDEX]
+            if self.start_ms <= ts < self.stop_ms:
+                self.latencies.append(now_ms - ts)
+                counted += 1
+        if counted:
+            self.quotes += counted
+            self.messages += 1
+            self.bytes += size
+
+
+def run_clients(url: str, count: int, instruments: list[str], mode: str, encoding: str,
+                ready, start, window, done, results):
+    """
+    压测进程：在一个事件循环中建立 count 个客户端并订阅，收到开始信号后按测量窗口统计，收到结束信号后上报结果
+
+    Args:
+        ready: 连接完成后上报 (已连接数, 错误列表) 的队列
+        start: 开始信号，设置前 window 中写入测量窗口
+        window: 测量窗口 [开始, 结束)（毫秒时间戳）
+        done: 结束信号
+        results: 上报统计结果的队列
+    """
+    asyncio.run(_run_clients(url, count, instruments, mode, encoding, ready, start, window, done, results))
+
+
+async def _run_clients(url, count, instruments, mode, encoding, ready, start, window, done, results):
+    # 使用asyncio客户端：线程客户端在独立线程中处理每个消息，二进制附件可能先于其消息头被处理
+    import socketio
+
+    stats = ClientStats()
+    errors = []
+    # 限制同时握手的连接数，避免启动时的连接风暴
+    semaphore = asyncio.Semaphore(50)
+
+    async def connect():
+        client = socketio.AsyncClient(reconnection=False)
+        client.on('quote', stats.on_quote)
+        client.on('quotes', stats.on_quotes)
+        async with semaphore:
+            try:
+                await client.connect(url, transports=['websocket'], auth={'encoding': encoding}, wait_timeout=10)
+                await client.call('configure', {'mode': mode, 'encoding': encoding}, timeout=10)
+                response = await client.call('subscribe', {'instrumentIds': instruments}, timeout=30)
+                if not response.get('ok'):
+                    errors.append(f"subscribe failed: {response.get('error') or response.get('results')}")
+                return client
+            except Exception as e:
+                errors.append(f"{type(e).__name__}: {e}")
+                if client.connected:
+                    await client.disconnect()
+                return None
+
+    clients = [client for client in await asyncio.gather(*(connect() for _ in range(count))) if client]
+    ready.put((len(clients), errors))
+
+    loop = asyncio.get_running_loop()
+    await loop.run_in_executor(None, start.wait)
+    stats.start_ms, stats.stop_ms = window[0], window[1]
+    await loop.run_in_executor(None, done.wait)
+    connected = [client for client in clients if client.connected]
+    await asyncio.gather(*(client.disconnect() for client in connected))
+    results.put({
+        "clients": len(clients),
+        "disconnected": len(clients) - len(connected),
+        "quotes": stats.quotes,
+        "messages": stats.messages,
+        "bytes": stats.bytes,
+        "latencies": np.asarray(stats.latencies, dtype=np.float32).tobytes(),
+    })
+
+
+class ProcessSampler:
+    """按 /proc 采样服务进程的CPU和常驻内存（仅Linux）"""
+
+    def __init__(self, pid: Optional[int]):
+        self.pid = pid
+        self.clock_ticks = os.sysconf('SC_CLK_TCK') if hasattr(os, 'sysconf') else 100
+        self.cpu_percent: list[float] = []
+        self.rss_mb: list[float] = []
+        self.last = None
+
+    @property
+    def available(self) -> bool:
+        return self.pid is not None and Path(f"/proc/{self.pid}/stat").exists()
+
+    def sample(self):
+        """采样一次，CPU占用按与上次采样之间的增量计算（多线程时可超过100%）"""
+        if not self.available:
+            return
+        try:
+            fields = Path(f"/proc/{self.pid}/stat").read_text().rsplit(')', 1)[1].split()
+            cpu_seconds = (int(fields[11]) + int(fields[12])) / self.clock_ticks
+            for line in Path(f"/proc/{self.pid}/status").read_text().splitlines():
+                if line.startswith('VmRSS:'):
+                    self.rss_mb.append(int(line.split()[1]) / 1024)
+        except (OSError, IndexError, ValueError):
+            return
+        now = time.monotonic()
+        if self.last:
+            self.cpu_percent.append((cpu_seconds - self.last[1]) / (now - self.last[0]) * 100)
+        self.last = (now, cpu_seconds)
+
+    def reset(self):
+        self.cpu_percent.clear()
+        self.rss_mb.clear()
+        self.last = None
+        self.sample()
+
+    def get_stats(self) -> Optional[dict]:
+        if not self.cpu_percent:
+            return None
+        return {
+            "cpu_percent_avg": round(float(np.mean(self.cpu_percent)), 1),
+            "cpu_percent_max": round(float(np.max(self.cpu_percent)), 1),
+            "rss_mb_avg": round(float(np.mean(self.rss_mb)), 1),
+            "rss_mb_max": round(float(np.max(self.rss_mb)), 1),
+        }
+
+
+def get_json(url: str, timeout: float = 5.0) -> dict:
+    """GET请求并解析JSON"""
+    with urllib.request.urlopen(url, timeout=timeout) as response:
+        return json.loads(response.read())
+
+
+def start_server(args) -> subprocess.Popen:
+    """以模拟行情启动服务进程，等待健康检查通过"""
+    env = dict(os.environ)
+    env.update({
+        "PORT": str(args.port),
+        "CTP_USE_MOCK": "true",
+        "CTP_REPLAY_PATH": "",
+        "MOCK_TICK_RATE": str(args.tick_rate),
+        "MOCK_STEP_MS": str(args.step_ms),
+        "TICK_JOURNAL_ENABLED": "false",
+        "LOG_LEVEL": args.server_log_level,
+    })
+    output = open(args.server_log, 'w') if args.server_log else subprocess.DEVNULL
+    server = subprocess.Popen([sys.executable, 'app.py'], cwd=BACKEND_DIR, env=env,
+                              stdout=output, stderr=subprocess.STDOUT)
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        if server.poll() is not None:
+            raise RuntimeError(f"Server exited with code {server.returncode}")
+        try:
+            get_json(f"{args.url}/api/health", timeout=1)
+            return server
+        except OSError:
+            time.sleep(0.2)
+    server.terminate()
+    raise RuntimeError("Server did not become healthy within 30s")
+
+
+def pick_instruments(count: int) -> list[str]:
+    """从示例合约文件取前 count 个合约，合约文件为空时使用模拟行情的默认合约"""
+    index = InstrumentIndex.load(str(BACKEND_DIR / 'data' / 'instruments.example.csv'))
+    ids = [instrument.instrument_id for instrument in index.instruments] or list(BASE_PRICES)
+    return ids[:count]
+
+
+def get_server_counters(url: str) -> dict:
+    """读取服务端的行情计数：模拟行情生成笔数、合并推送笔数和线程桥丢弃笔数"""
+    health = get_json(f"{url}/api/health")
+    status = get_json(f"{url}/api/ctp/status")
+    return {
+        "generated": (status.get("stats") or {}).get("generated", 0),
+        "emitted": health["conflation"]["emitted"],
+        "conflated": health["conflation"]["conflated"],
+        "bridge_dropped": health["bridge"]["overflow_dropped"],
+        "bridge_coalesced": health["bridge"]["overflow_coalesced"],
+    }
+
+
+def get_git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=BACKEND_DIR,
+                              capture_output=True, text=True, timeout=5).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def percentiles(latencies: np.ndarray) -> dict:
+    """延迟分位数（毫秒）"""
+    if not len(latencies):
+        return {}
+    p50, p90, p99, p999 = np.percentile(latencies, [50, 90, 99, 99.9])
+    return {
+        "min": round(float(latencies.min()), 2),
+        "p50": round(float(p50), 2),
+        "p90": round(float(p90), 2),
+        "p99": round(float(p99), 2),
+        "p999": round(float(p999), 2),
+        "max": round(float(latencies.max()), 2),
+        "mean": round(float(latencies.mean()), 2),
+    }
+
+
+def run(args) -> dict:
+    """执行一次压测，返回结果"""
+    server = None if args.external else start_server(args)
+    sampler = ProcessSampler(server.pid if server else args.server_pid)
+    try:
+        instruments = pick_instruments(args.instruments)
+        ctx = multiprocessing.get_context('spawn')
+        ready, results = ctx.Queue(), ctx.Queue()
+        start, done = ctx.Event(), ctx.Event()
+        window = ctx.Array('d', 2)
+        processes = []
+        for i in range(args.processes):
+            count = args.clients // args.processes + (1 if i < args.clients % args.processes else 0)
+            if count:
+                process = ctx.Process(target=run_clients, daemon=True, args=(
+                    args.url, count, instruments, args.mode, args.encoding, ready, start, window, done, results
+                ))
+                process.start()
+                processes.append(process)
+
+        connected, errors = 0, []
+        for _ in processes:
+            count, process_errors = ready.get(timeout=300)
+            connected += count
+            errors.extend(process_errors)
+        logger.info(f"{connected}/{args.clients} clients connected, {len(instruments)} instruments each"
+                    + (f", {len(errors)} errors, first: {errors[0]}" if errors else ""))
+
+        # 预热后开始测量
+        time.sleep(args.warmup)
+        sampler.reset()
+        before = get_server_counters(args.url)
+        start_ms = time.time() * 1000
+        window[0], window[1] = start_ms, start_ms + args.duration * 1000
+        start.set()
+        stop_at = time.monotonic() + args.duration
+        while time.monotonic() < stop_at:
+            time.sleep(min(1.0, max(stop_at - time.monotonic(), 0)))
+            sampler.sample()
+        after = get_server_counters(args.url)
+        server_process = sampler.get_stats()
+        time.sleep(DRAIN_SECONDS)
+        done.set()
+
+        reports = [results.get(timeout=60) for _ in processes]
+        for process in processes:
+            process.join(timeout=10)
+    finally:
+        if server:
+            server.terminate()
+            server.wait(timeout=10)
+
+    latencies = np.concatenate([np.frombuffer(r["latencies"], dtype=np.float32) for r in reports]) \
+        if reports else np.zeros(0, dtype=np.float32)
+    received = sum(r["quotes"] for r in reports)
+    counters = {key: after[key] - before[key] for key in after}
+    # 每笔合并推送的行情发给每个连接的客户端（全部客户端订阅同一组合约）；窗口边界上的一个推送间隔为误差
+    expected = counters["emitted"] * connected
+    return {
+        "timestamp": time.strftime('%Y-%m-%dT%H:%M:%S'),
+        "commit": get_git_commit(),
+        "platform": {"python": platform.python_version(), "system": platform.platform(), "cpus": os.cpu_count()},
+        "config": {
+            "clients": args.clients, "processes": len(processes), "instruments": len(instruments),
+            "tick_rate": args.tick_rate, "tick_rate_achieved": round(counters["generated"] / args.duration, 1),
+            "step_ms": args.step_ms, "mode": args.mode, "encoding": args.encoding,
+            "duration": args.duration, "warmup": args.warmup, "url": args.url, "external": args.external,
+        },
+        "clients": {
+            "connected": connected,
+            "connect_errors": len(errors),
+            "disconnected": sum(r["disconnected"] for r in reports),
+        },
+        "throughput": {
+            "generated_per_sec": round(counters["generated"] / args.duration, 1),
+            "emitted_per_sec": round(counters["emitted"] / args.duration, 1),
+            "delivered_per_sec": round(received / args.duration, 1),
+            "messages_per_sec": round(sum(r["messages"] for r in reports) / args.duration, 1),
+            "msgpack_bytes_per_sec": round(sum(r["bytes"] for r in reports) / args.duration, 1),
+        },
+        "latency_ms": percentiles(latencies),
+        "drops": {
+            "expected": expected,
+            "received": received,
+            "missing": max(expected - received, 0),
+            "conflated": counters["conflated"],
+            "bridge_dropped": counters["bridge_dropped"],
+            "bridge_coalesced": counters["bridge_coalesced"],
+        },
+        "server_process": server_process,
+    }
+
+
+def main():
+    """主函数"""
+    logger.remove()
+    logger.add(lambda msg: print(msg, end=""), level="INFO", format="{message}")
+
+    parser = argparse.ArgumentParser(description="End-to-end Socket.IO load test")
+    parser.add_argument('--clients', type=int, default=50, help="客户端数")
+    parser.add_argument('--processes', type=int, default=max(1, min(4, (os.cpu_count() or 2) // 2)),
+                        help="运行客户端的进程数")
+    parser.add_argument('--instruments', type=int, default=20, help="每个客户端订阅的合约数")
+    parser.add_argument('--tick-rate', type=float, default=1000, help="模拟行情每秒总笔数")
+    parser.add_argument('--step-ms', type=int, default=50, help="模拟行情生成步长")
+    parser.add_argument('--mode', choices=('tick', 'batch'), default='tick', help="推送方式")
+    parser.add_argument('--encoding', choices=('json', 'msgpack'), default='json', help="推送编码")
+    parser.add_argument('--duration', type=float, default=20, help="测量时长（秒）")
+    parser.add_argument('--warmup', type=float, default=3, help="连接完成后的预热时长（秒）")
+    parser.add_argument('--port', type=int, default=5105, help="启动服务使用的端口")
+    parser.add_argument('--url', help="连接已运行的服务（不启动服务进程），如 http://127.0.0.1:5005")
+    parser.add_argument('--server-pid', type=int, help="连接已运行的服务时，采样CPU/内存的进程号")
+    parser.add_argument('--server-log', help="启动的服务进程输出写入的文件（默认丢弃）")
+    parser.add_argument('--server-log-level', default='WARNING', help="启动的服务进程的 LOG_LEVEL")
+    parser.add_argument('--output', help="结果JSON文件（默认 benchmarks/results/loadtest-<时间>.json）")
+    args = parser.parse_args()
+
+    if args.encoding == 'msgpack' and msgpack is None:
+        parser.error("msgpack encoding requires the msgpack package")
+    args.external = bool(args.url)
+    args.url = (args.url or f"http://127.0.0.1:{args.port}").rstrip('/')
+    args.processes = max(1, min(args.processes, args.clients))
+
+    logger.info(f"Load test: {args.clients} clients x {args.instruments} instruments, "
+                f"{args.tick_rate:g} ticks/s, mode={args.mode}, encoding={args.encoding}, {args.duration:g}s")
+    result = run(args)
+
+    output = Path(args.output) if args.output else \
+        BACKEND_DIR / 'benchmarks' / 'results' / f"loadtest-{time.strftime('%Y%m%d-%H%M%S')}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(result, indent=2, ensure_ascii=False))
+
+    throughput, latency, drops = result["throughput"], result["latency_ms"], result["drops"]
+    achieved = result["config"]["tick_rate_achieved"]
+    if not args.external and achieved < args.tick_rate * 0.9:
+        logger.warning(f"mock generator reached only {achieved:.0f} of {args.tick_rate:g} requested ticks/s")
+    logger.info(f"generated {throughput['generated_per_sec']:.0f}/s, emitted {throughput['emitted_per_sec']:.0f}/s, "
+                f"delivered {throughput['delivered_per_sec']:.0f} quotes/s in {throughput['messages_per_sec']:.0f} msgs/s")
+    if latency:
+        logger.info(f"latency ms: p50 {latency['p50']}, p99 {latency['p99']}, p999 {latency['p999']}, max {latency['max']}")
+    logger.info(f"missing {drops['missing']}/{drops['expected']}, conflated {drops['conflated']}, "
+                f"bridge dropped {drops['bridge_dropped']}, disconnected {result['clients']['disconnected']}")
+    if result["server_process"]:
+        process = result["server_process"]
+        logger.info(f"server cpu avg {process['cpu_percent_avg']}% max {process['cpu_percent_max']}%, "
+                    f"rss max {process['rss_mb_max']} MB")
+    logger.info(f"Results saved to {output}")
+
+
+if __name__ == '__main__':
+    main()
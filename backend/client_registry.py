@@ -0,0 +1,165 @@
+"""
+客户端订阅登记
+记录每个Socket.IO会话关注的合约，以及每个合约房间的成员
+"""
+
+import threading
+from typing import Dict, Set, Tuple
+
+# 推送方式：逐笔 quote 事件、批量 quotes 事件、字段级增量 quote_delta 事件
+MODE_TICK = 'tick'
+MODE_BATCH = 'batch'
+MODE_DELTA = 'delta'
+
+DEFAULT_ENCODING = 'json'
+
+
+class ClientRegistry:
+    """客户端订阅登记类"""
+
+    def __init__(self):
+        self.client_instruments: Dict[str, Set[str]] = {}
+        self.room_members: Dict[str, Set[str]] = {}
+        # 非逐笔推送的客户端及其推送方式
+        self.client_modes: Dict[str, str] = {}
+        # 非默认编码的客户端及其编码
+        self.client_encodings: Dict[str, str] = {}
+        # 需要扩展字段的客户端及其字段组（规范化的元组）
+        self.client_fields: Dict[str, tuple] = {}
+        self.lock = threading.Lock()
+
+    def join(self, sid: str, instrument_id: str) -> bool:
+        """客户端加入合约房间，返回是否为新加入"""
+        with self.lock:
+            instruments = self.client_instruments.setdefault(sid, set())
+            if instrument_id in instruments:
+                return False
+            instruments.add(instrument_id)
+            self.room_members.setdefault(instrument_id, set()).add(sid)
+            return True
+
+    def leave(self, sid: str, instrument_id: str) -> bool:
+        """客户端离开合约房间，返回是否确实离开"""
+        with self.lock:
+            instruments = self.client_instruments.get(sid)
+            if not instruments or instrument_id not in instruments:
+                return False
+            instruments.discard(instrument_id)
+            self._discard_member(instrument_id, sid)
+            return True
+
+    def drop_client(self, sid: str) -> Set[str]:
+        """移除客户端的全部登记，返回其关注过的合约"""
+        with self.lock:
+            instruments = self.client_instruments.pop(sid, set())
+            self.client_modes.pop(sid, None)
+            self.client_encodings.pop(sid, None)
+            self.client_fields.pop(sid, None)
+            for instrument_id in instruments:
+                self._discard_member(instrument_id, sid)
+            return instruments
+
+    def get_client_instruments(self, sid: str) -> Set[str]:
+        """获取客户端关注的合约"""
+        with self.lock:
+            return self.client_instruments.get(sid, set()).copy()
+
+    def get_members(self, instrument_id: str) -> Set[str]:
+        """获取合约房间内的客户端"""
+        with self.lock:
+            return self.room_members.get(instrument_id, set()).copy()
+
+    def has_members(self, instrument_id: str) -> bool:
+        """合约房间是否有客户端"""
+        return bool(self.room_members.get(instrument_id))
+
+    def set_mode(self, sid: str, mode: str):
+        """设置客户端的推送方式"""
+        with self.lock:
+            if mode == MODE_TICK:
+                self.client_modes.pop(sid, None)
+            else:
+                self.client_modes[sid] = mode
+
+    def get_mode(self, sid: str) -> str:
+        """获取客户端的推送方式"""
+        return self.client_modes.get(sid, MODE_TICK)
+
+    def set_encoding(self, sid: str, encoding: str):
+        """设置客户端的推送编码"""
+        with self.lock:
+            if encoding == DEFAULT_ENCODING:
+                self.client_encodings.pop(sid, None)
+            else:
+                self.client_encodings[sid] = encoding
+
+    def get_encoding(self, sid: str) -> str:
+        """获取客户端的推送编码"""
+        return self.client_encodings.get(sid, DEFAULT_ENCODING)
+
+    def set_fields(self, sid: str, groups: tuple):
+        """设置客户端需要的扩展字段组"""
+        with self.lock:
+            if groups:
+                self.client_fields[sid] = groups
+            else:
+                self.client_fields.pop(sid, None)
+
+    def get_fields(self, sid: str) -> tuple:
+        """获取客户端需要的扩展字段组"""
+        return self.client_fields.get(sid, ())
+
+    def get_field_union(self) -> Set[str]:
+        """全部客户端需要的扩展字段组的并集"""
+        with self.lock:
+            return {group for groups in self.client_fields.values() for group in groups}
+
+    def get_fanout(self, instrument_id: str) -> Tuple[Set[Tuple[str, tuple]], list[str], list[str]]:
+        """
+        获取合约行情的推送对象
+
+        Returns:
+            (逐笔接收客户端的 (编码, 字段组) 集合, 批量接收的客户端列表, 增量接收的客户端列表)
+        """
+        with self.lock:
+            members = self.room_members.get(instrument_id)
+            if not members:
+                return set(), [], []
+            tick_profiles = set()
+            batch_sids = []
+            delta_sids = []
+            for sid in members:
+                mode = self.client_modes.get(sid)
+                if mode == MODE_BATCH:
+                    batch_sids.append(sid)
+                elif mode == MODE_DELTA:
+                    delta_sids.append(sid)
+                else:
+                    tick_profiles.add((
+                        self.client_encodings.get(sid, DEFAULT_ENCODING),
+                        self.client_fields.get(sid, ())
+                    ))
+            return tick_profiles, batch_sids, delta_sids
+
+    def get_room_counts(self) -> Dict[str, int]:
+        """获取每个合约房间的成员数"""
+        with self.lock:
+            return {instrument_id: len(sids) for instrument_id, sids in self.room_members.items()}
+
+    def get_client_count(self) -> int:
+        """获取登记的客户端数量"""
+        with self.lock:
+            return len(self.client_instruments)
+
+    def get_clients(self) -> list[str]:
+        """获取登记的客户端"""
+        with self.lock:
+            return list(self.client_instruments)
+
+    def _discard_member(self, instrument_id: str, sid: str):
+        members = self.room_members.get(instrument_id)
+        if members is None:
+            return
+        members.discard(sid)
+        if not members:
+            del self.room_members[instrument_id]
@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+拆分部署启动脚本
+启动一个行情接入进程（ingest.py）和 WORKER_PROCESSES 个Socket.IO工作进程（app.py）。
+工作进程共用 PORT 端口（SO_REUSEPORT，由内核分配连接），只使用 websocket 传输，
+子进程退出后自动重启，收到 SIGINT/SIGTERM 时停止全部子进程
+
+用法：python cluster.py [工作进程数]
+"""
+
+import os
+import signal
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Dict, Optional
+
+from loguru import logger
+
+from config import Config
+from log_setup import setup_logging
+
+BACKEND_DIR = Path(__file__).resolve().parent
+# 子进程退出后的重启间隔（秒）
+RESTART_SECONDS = 2.0
+
+
+class Cluster:
+    """接入进程和工作进程的监督类"""
+
+    def __init__(self, workers: int, ingest_socket: str):
+        """
+        初始化监督
+
+        Args:
+            workers: Socket.IO工作进程数
+            ingest_socket: 接入进程的Unix套接字路径
+        """
+        self.workers = workers
+        self.ingest_socket = ingest_socket
+        # 名称 -> 子进程
+        self.processes: Dict[str, Optional[subprocess.Popen]] = {}
+        self.restart_at: Dict[str, float] = {}
+
+    def _spawn(self, name: str) -> subprocess.Popen:
+        env = dict(os.environ, INGEST_SOCKET=self.ingest_socket)
+        if name == 'ingest':
+            script = 'ingest.py'
+        else:
+            script = 'app.py'
+            # 共用端口时同一客户端的轮询请求可能落到不同工作进程，只能使用 websocket
+            env['SOCKETIO_TRANSPORTS'] = 'websocket'
+        process = subprocess.Popen([sys.executable, script], cwd=BACKEND_DIR, env=env)
+        logger.info(f"Started {name} (pid {process.pid})")
+        return process
+
+    def start(self):
+        """启动接入进程，等待套接字就绪后启动工作进程"""
+        self.processes['ingest'] = self._spawn('ingest')
+        deadline = time.monotonic() + 10
+        while not os.path.exists(self.ingest_socket) and time.monotonic() < deadline:
+            time.sleep(0.1)
+        for index in range(1, self.workers + 1):
+            self.processes[f'worker-{index}'] = self._spawn(f'worker-{index}')
+
+    def check(self):
+        """重启已退出的子进程"""
+        now = time.monotonic()
+        for name, process in self.processes.items():
+            if process is None:
+                if now >= self.restart_at[name]:
+                    self.processes[name] = self._spawn(name)
+            elif process.poll() is not None:
+                logger.warning(f"{name} exited with code {process.returncode}, restarting in {RESTART_SECONDS}s")
+                self.processes[name] = None
+                self.restart_at[name] = now + RESTART_SECONDS
+
+    def stop(self):
+        """停止全部子进程（先停工作进程，最后停接入进程）"""
+        running = [p for p in self.processes.values() if p is not None and p.poll() is None]
+        for process in reversed(running):
+            process.terminate()
+        for process in reversed(running):
+            try:
+                process.wait(timeout=5)
+            except subprocess.TimeoutExpired:
+                process.kill()
+        logger.info("Cluster stopped")
+
+
+def main():
+    """主函数"""
+    setup_logging('cluster', log_file=False)
+
+    workers = int(sys.argv[1]) if len(sys.argv) > 1 else Config.WORKER_PROCESSES
+    ingest_socket = Config.INGEST_SOCKET or f"/tmp/ctp_ingest_{Config.PORT}.sock"
+    cluster = Cluster(workers, ingest_socket)
+
+    def handle_signal(signum, frame):
+        raise KeyboardInterrupt
+
+    signal.signal(signal.SIGTERM, handle_signal)
+    logger.info(f"Starting cluster: 1 ingest + {workers} workers on port {Config.PORT}, socket {ingest_socket}")
+    try:
+        cluster.start()
+        while True:
+            time.sleep(1)
+            cluster.check()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        cluster.stop()
+
+
+if __name__ == '__main__':
+    main()
@@ -26,13 +26,64 @@ class Config:
     CTP_USER_ID = os.getenv('CTP_USER_ID', '')
     CTP_PASSWORD = os.getenv('CTP_PASSWORD', '')
     CTP_USE_MOCK = os.getenv('CTP_USE_MOCK', 'false').lower() == 'true'  # 模拟数据模式
+    MOCK_TICK_RATE = float(os.getenv('MOCK_TICK_RATE', '200'))  # 模拟行情每秒总笔数
+    MOCK_STEP_MS = int(os.getenv('MOCK_STEP_MS', '50'))  # 模拟行情生成步长
+    CTP_REPLAY_PATH = os.getenv('CTP_REPLAY_PATH', '')  # 回放模式：逐笔行情日志文件或目录
+    CTP_REPLAY_SPEED = float(os.getenv('CTP_REPLAY_SPEED', '1'))  # 回放倍速，0为不限速
+    CTP_REPLAY_LOOP = os.getenv('CTP_REPLAY_LOOP', 'false').lower() == 'true'
+    CTP_SUBSCRIBE_CHUNK = int(os.getenv('CTP_SUBSCRIBE_CHUNK', '100'))  # 单次订阅请求的最大合约数
+    CTP_SUBSCRIBE_TIMEOUT_MS = int(os.getenv('CTP_SUBSCRIBE_TIMEOUT_MS', '2000'))  # 等待订阅回报的时间
+    # 多前置：逗号分隔的前置地址，为空时使用 CTPConfig 的默认前置
+    CTP_FRONT_ADDRESSES = [f.strip() for f in os.getenv('CTP_FRONT_ADDRESSES', '').split(',') if f.strip()]
+    CTP_PROBE_INSTRUMENTS = [i.strip() for i in os.getenv('CTP_PROBE_INSTRUMENTS', '').split(',') if i.strip()]  # 测量首笔行情耗时的合约
+    CTP_PROBE_SECONDS = float(os.getenv('CTP_PROBE_SECONDS', '5'))  # 前置连接登录和等待首笔行情的超时
+    CTP_STALE_SECONDS = float(os.getenv('CTP_STALE_SECONDS', '30'))  # 多久没有行情视为停滞并切换前置，0为不检测
+    CTP_RECONNECT_INITIAL = float(os.getenv('CTP_RECONNECT_INITIAL', '1'))  # 全部前置不可用时第一次重连前的等待（秒），之后每次翻倍
+    CTP_RECONNECT_MAX = float(os.getenv('CTP_RECONNECT_MAX', '60'))  # 重连等待上限（秒）
+    INSTRUMENT_FILE = os.getenv('INSTRUMENT_FILE', '')  # 合约信息文件（CSV或JSON），为空时不校验订阅的合约
+    SUBSCRIPTION_GRACE_SECONDS = float(os.getenv('SUBSCRIPTION_GRACE_SECONDS', '30'))  # 无人关注后保留上游订阅的时间
+    
+    # 拆分部署：设置后本进程作为Socket.IO工作进程，从该Unix套接字上的行情接入进程（ingest.py）接收行情
+    INGEST_SOCKET = os.getenv('INGEST_SOCKET', '')
+    INGEST_AUTHKEY = os.getenv('INGEST_AUTHKEY', '')  # 接入进程认证密钥，默认使用 SECRET_KEY
+    WORKER_PROCESSES = int(os.getenv('WORKER_PROCESSES', '2'))  # cluster.py 启动的工作进程数
+    # Socket.IO传输方式（逗号分隔），多个工作进程共用端口时只能用 websocket
+    SOCKETIO_TRANSPORTS = [t.strip() for t in os.getenv('SOCKETIO_TRANSPORTS', 'polling,websocket').split(',') if t.strip()]
+    
+    # 行情推送配置
+    QUOTE_FLUSH_INTERVAL_MS = int(os.getenv('QUOTE_FLUSH_INTERVAL_MS', '100'))  # 合并推送间隔
+    QUOTE_FLUSH_ADAPTIVE = os.getenv('QUOTE_FLUSH_ADAPTIVE', 'false').lower() == 'true'  # 按行情速率自适应
+    QUOTE_FLUSH_MIN_MS = int(os.getenv('QUOTE_FLUSH_MIN_MS', '50'))
+    QUOTE_FLUSH_MAX_MS = int(os.getenv('QUOTE_FLUSH_MAX_MS', '250'))
+    QUOTE_BRIDGE_CAPACITY = int(os.getenv('QUOTE_BRIDGE_CAPACITY', '10000'))  # 行情线程桥队列容量
+    QUOTE_BRIDGE_POLL_MS = int(os.getenv('QUOTE_BRIDGE_POLL_MS', '5'))  # 主循环取行情的间隔
+    
+    # K线配置
+    BAR_HISTORY_SIZE = int(os.getenv('BAR_HISTORY_SIZE', '500'))  # 每个合约每个周期保留的K线数
+    
+    # 逐笔行情日志配置
+    TICK_JOURNAL_ENABLED = os.getenv('TICK_JOURNAL_ENABLED', 'false').lower() == 'true'
+    TICK_JOURNAL_DIR = os.getenv('TICK_JOURNAL_DIR', 'journal')
+    TICK_JOURNAL_FLUSH_MS = int(os.getenv('TICK_JOURNAL_FLUSH_MS', '200'))  # 批量写入间隔
+    TICK_JOURNAL_SEGMENT_MB = int(os.getenv('TICK_JOURNAL_SEGMENT_MB', '64'))  # 新日志文件初始大小
+    
+    # 共享内存行情表：设置名称后把每个合约的最新行情写入同名共享内存段，供本机其他进程读取
+    SHM_BOARD_NAME = os.getenv('SHM_BOARD_NAME', '')
+    SHM_BOARD_CAPACITY = int(os.getenv('SHM_BOARD_CAPACITY', '4096'))  # 合约容量
     
     # 日志配置
     LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO')
+    LOG_MODE = os.getenv('LOG_MODE', 'dev').lower()  # dev 或 production（异步写日志、行情路径日志采样）
+    LOG_TICK_SAMPLE_SECONDS = float(os.getenv('LOG_TICK_SAMPLE_SECONDS', '10'))  # 行情路径日志每个合约的最小间隔
+    LOG_SUMMARY_SECONDS = int(os.getenv('LOG_SUMMARY_SECONDS', '60'))  # 运行汇总日志间隔，0为不输出
+    # Socket.IO/Engine.IO 逐个报文的日志，production 模式默认关闭
+    SOCKETIO_LOGGER = os.getenv('SOCKETIO_LOGGER', 'false' if LOG_MODE == 'production' else 'true').lower() == 'true'
     
     @classmethod
     def validate_ctp_config(cls) -> tuple[bool, str]:
         """验证CTP配置"""
+        if cls.CTP_REPLAY_PATH:
+            return True, "Using replay data mode"
         if cls.CTP_USE_MOCK:
             return True, "Using mock data mode"
         if not cls.CTP_USER_ID:
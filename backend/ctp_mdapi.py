@@ -10,11 +10,22 @@ from typing import Callable, Dict, Optional, Set
 from ctp import CThostFtdcMdSpi
 from loguru import logger
 
+from log_sampler import LogSampler
+from metrics import metrics
+from quote import Quote, group_fields, normalize_groups
+
+# CTP用 DBL_MAX 表示无效价格（如无挂单、未结算）
+INVALID_PRICE = 1e300
+# 登录失败后的重试等待（秒），每次失败翻倍，登录成功后复位
+LOGIN_RETRY_INITIAL = 1.0
+LOGIN_RETRY_MAX = 60.0
+
 
 class CTPMarketDataAPI(CThostFtdcMdSpi):
     """CTP行情接口类"""
 
-    def __init__(self, front_address: str, broker_id: str, user_id: str, password: str):
+    def __init__(self, front_address: str, broker_id: str, user_id: str, password: str,
+                 subscribe_chunk: int = 100):
         """
         初始化CTP行情接口
 
@@ -23,20 +34,35 @@ class CTPMarketDataAPI(CThostFtdcMdSpi):
             broker_id: 期货公司代码
             user_id: 用户代码
             password: 密码
+            subscribe_chunk: 单次 SubscribeMarketData 请求的最大合约数
         """
         super().__init__()
         self.front_address = front_address
         self.broker_id = broker_id
         self.user_id = user_id
         self.password = password
+        self.subscribe_chunk = max(1, subscribe_chunk)
 
         self.is_connected = False
         self.is_logged_in = False
         self.subscribed_instruments: Set[str] = set()
+        # 合约 -> 订阅状态（pending/subscribed/failed）及失败原因，由 OnRspSubMarketData 更新
+        self.sub_status: Dict[str, str] = {}
+        self.sub_errors: Dict[str, str] = {}
+        # 需要解析的扩展字段：(推送字段名, CTP字段名, 是否为整数)
+        self.parse_groups: tuple = ()
+        self.parse_fields: tuple = ()
         self.quote_callbacks: list[Callable] = []
+        # 连接状态回调 callback(event, detail)，event 为 connected/disconnected/logged_in/login_failed
+        self.status_callbacks: list[Callable] = []
+        # 行情回调出错时按类别限速输出日志
+        self.error_log = LogSampler()
+        # 登录失败后的重试定时器和下一次等待时间
+        self.login_timer: Optional[threading.Timer] = None
+        self.login_retry_seconds = LOGIN_RETRY_INITIAL
 
         # 行情数据缓存
-        self.last_quotes: Dict[str, dict] = {}
+        self.last_quotes: Dict[str, Quote] = {}
         self.lock = threading.Lock()
 
         logger.info(f"CTP Market Data API initialized for user: {user_id}")
@@ -52,6 +78,18 @@ class CTPMarketDataAPI(CThostFtdcMdSpi):
             self.quote_callbacks.remove(callback)
             logger.info(f"Removed quote callback, total callbacks: {len(self.quote_callbacks)}")
 
+    def add_status_callback(self, callback: Callable):
+        """添加连接状态回调函数"""
+        self.status_callbacks.append(callback)
+
+    def _notify_status(self, event: str, detail=None):
+        """在CTP回调线程上通知连接状态变化"""
+        for callback in self.status_callbacks:
+            try:
+                callback(event, detail)
+            except Exception as e:
+                logger.error(f"Error in status callback: {e}")
+
     def connect(self) -> bool:
         """连接到CTP服务器"""
         try:
@@ -79,16 +117,20 @@ class CTPMarketDataAPI(CThostFtdcMdSpi):
             return False
 
     def subscribe_market_data(self, instruments: list[str]) -> bool:
-        """订阅行情数据"""
+        """订阅行情数据，按 subscribe_chunk 分批请求，结果由 OnRspSubMarketData 异步回报"""
         try:
             if not instruments:
                 return True
 
-            logger.info(f"Subscribing to market data: {instruments}")
-            self.SubscribeMarketData(instruments)
-
+            logger.info(f"Subscribing to market data: {len(instruments)} instruments")
             with self.lock:
                 self.subscribed_instruments.update(instruments)
+                for instrument in instruments:
+                    self.sub_status[instrument] = 'pending'
+                    self.sub_errors.pop(instrument, None)
+
+            for start in range(0, len(instruments), self.subscribe_chunk):
+                self.SubscribeMarketData(instruments[start:start + self.subscribe_chunk])
 
             return True
         except Exception as e:
@@ -96,35 +138,58 @@ class CTPMarketDataAPI(CThostFtdcMdSpi):
             return False
 
     def unsubscribe_market_data(self, instruments: list[str]) -> bool:
-        """取消订阅行情数据"""
+        """取消订阅行情数据，按 subscribe_chunk 分批请求"""
         try:
             if not instruments:
                 return True
 
-            logger.info(f"Unsubscribing from market data: {instruments}")
-            self.UnSubscribeMarketData(instruments)
+            logger.info(f"Unsubscribing from market data: {len(instruments)} instruments")
+            for start in range(0, len(instruments), self.subscribe_chunk):
+                self.UnSubscribeMarketData(instruments[start:start + self.subscribe_chunk])
 
             with self.lock:
                 for instrument in instruments:
                     self.subscribed_instruments.discard(instrument)
                     self.last_quotes.pop(instrument, None)
+                    self.sub_status.pop(instrument, None)
+                    self.sub_errors.pop(instrument, None)
 
             return True
         except Exception as e:
             logger.error(f"Failed to unsubscribe market data: {e}")
             return False
 
+    def set_parse_groups(self, groups):
+        """设置需要解析的扩展字段组（全部客户端所需字段组的并集）"""
+        self.parse_groups = normalize_groups(groups)
+        self.parse_fields = tuple(
+            (field, field[0].upper() + field[1:], 'Volume' in field)
+            for field in group_fields(self.parse_groups)
+        )
+        logger.info(f"Market data extra field groups: {list(self.parse_groups) or 'none'}")
+
+    def get_subscription_status(self, instruments: list[str]) -> Dict[str, dict]:
+        """获取合约的订阅状态：pending（等待回报）、subscribed、failed（附 error）或 unsubscribed"""
+        with self.lock:
+            result = {}
+            for instrument in instruments:
+                status = {"status": self.sub_status.get(instrument, 'unsubscribed')}
+                if instrument in self.sub_errors:
+                    status["error"] = self.sub_errors[instrument]
+                result[instrument] = status
+            return result
+
     def get_subscribed_instruments(self) -> Set[str]:
         """获取已订阅的合约列表"""
         with self.lock:
             return self.subscribed_instruments.copy()
 
-    def get_last_quote(self, instrument_id: str) -> Optional[dict]:
+    def get_last_quote(self, instrument_id: str) -> Optional[Quote]:
         """获取指定合约的最新行情"""
         with self.lock:
             return self.last_quotes.get(instrument_id)
 
-    def get_all_quotes(self) -> Dict[str, dict]:
+    def get_all_quotes(self) -> Dict[str, Quote]:
         """获取所有合约的最新行情"""
         with self.lock:
             return self.last_quotes.copy()
@@ -132,31 +197,81 @@ class CTPMarketDataAPI(CThostFtdcMdSpi):
     # CTP回调函数
     def OnFrontConnected(self):
         """前置机连接成功"""
-        logger.info("CTP front connected successfully")
+        logger.info(f"CTP front connected successfully: {self.front_address}")
         self.is_connected = True
+        self._notify_status('connected')
         self.login()
 
     def OnFrontDisconnected(self, reason: int):
         """前置机连接断开"""
-        logger.warning(f"CTP front disconnected, reason: {reason}")
+        logger.warning(f"CTP front disconnected: {self.front_address}, reason: {reason}")
         self.is_connected = False
         self.is_logged_in = False
+        self._cancel_login_retry()
+        # CTP会自动重连，订阅在重新登录后补发，期间为 pending
+        with self.lock:
+            for instrument in self.subscribed_instruments:
+                self.sub_status[instrument] = 'pending'
+        self._notify_status('disconnected', reason)
 
     def OnRspUserLogin(self, data, error, nRequestID, isLast):
         """用户登录响应"""
         if error and error['ErrorID'] != 0:
             logger.error(f"Login failed: {error['ErrorMsg']}")
             self.is_logged_in = False
+            self._schedule_login_retry()
+            self._notify_status('login_failed', error['ErrorMsg'])
         else:
             logger.info("Login successful")
             self.is_logged_in = True
+            self.login_retry_seconds = LOGIN_RETRY_INITIAL
+            self._resubscribe()
+            self._notify_status('logged_in')
+
+    def _schedule_login_retry(self):
+        """登录失败且前置仍连接时，按指数退避重新登录"""
+        if not self.is_connected:
+            return
+        delay = self.login_retry_seconds
+        self.login_retry_seconds = min(delay * 2, LOGIN_RETRY_MAX)
+        logger.info(f"Retrying CTP login in {delay:.0f}s")
+        self._cancel_login_retry()
+        self.login_timer = threading.Timer(delay, self._retry_login)
+        self.login_timer.daemon = True
+        self.login_timer.start()
+
+    def _retry_login(self):
+        if self.is_connected and not self.is_logged_in:
+            self.login()
+
+    def _cancel_login_retry(self):
+        if self.login_timer is not None:
+            self.login_timer.cancel()
+            self.login_timer = None
+
+    def _resubscribe(self):
+        """重新登录后按批次补发全部已订阅合约（CTP重连后服务端不保留订阅）"""
+        with self.lock:
+            instruments = sorted(self.subscribed_instruments)
+        if instruments:
+            logger.info(f"Resubscribing {len(instruments)} instruments after login")
+            self.subscribe_market_data(instruments)
 
     def OnRspSubMarketData(self, data, error, nRequestID, isLast):
-        """订阅行情响应"""
+        """订阅行情响应（每个合约一条）"""
+        instrument = data.get('InstrumentID') if data else None
         if error and error['ErrorID'] != 0:
-            logger.error(f"Subscribe market data failed: {error['ErrorMsg']}")
+            logger.error(f"Subscribe market data failed: {instrument} {error['ErrorMsg']}")
+            if instrument:
+                with self.lock:
+                    self.sub_status[instrument] = 'failed'
+                    self.sub_errors[instrument] = error['ErrorMsg']
         else:
-            logger.info(f"Subscribe market data successful: {data}")
+            logger.info(f"Subscribe market data successful: {instrument}")
+            if instrument:
+                with self.lock:
+                    if instrument in self.subscribed_instruments:
+                        self.sub_status[instrument] = 'subscribed'
 
     def OnRspUnSubMarketData(self, data, error, nRequestID, isLast):
         """取消订阅行情响应"""
@@ -169,25 +284,33 @@ class CTPMarketDataAPI(CThostFtdcMdSpi):
         """行情数据推送"""
         try:
             # 解析行情数据
+            recv_ns = time.perf_counter_ns()
             quote = self._parse_market_data(data)
             if not quote:
                 return
+            quote.recv_ns = recv_ns
+            parsed_ns = time.perf_counter_ns()
+            metrics.record('parse', parsed_ns - recv_ns)
 
             # 更新缓存
             with self.lock:
-                self.last_quotes[quote['instrumentId']] = quote
+                self.last_quotes[quote.instrument_id] = quote
 
             # 调用回调函数
             for callback in self.quote_callbacks:
                 try:
                     callback(quote)
                 except Exception as e:
-                    logger.error(f"Error in quote callback: {e}")
+                    metrics.count_error('callback')
+                    if self.error_log.allow('callback'):
+                        logger.error(f"Error in quote callback: {e}")
+            metrics.record('callback', time.perf_counter_ns() - parsed_ns)
 
         except Exception as e:
+            metrics.count_error('parse')
             logger.error(f"Error processing market data: {e}")
 
-    def _parse_market_data(self, data) -> Optional[dict]:
+    def _parse_market_data(self, data) -> Optional[Quote]:
         """解析行情数据"""
         try:
             instrument_id = data.get('InstrumentID', '')
@@ -217,20 +340,34 @@ class CTPMarketDataAPI(CThostFtdcMdSpi):
             update_time = data.get('UpdateTime', '')
             update_millisec = int(data.get('UpdateMillisec', 0))
 
-            quote = {
-                'instrumentId': instrument_id,
-                'lastPrice': round(last_price, 2),
-                'change': round(change, 2),
-                'changePercent': round(change_percent, 2),
-                'volume': volume,
-                'updateTime': update_time,
-                'updateMillisec': update_millisec,
-                'ts': int(time.time() * 1000)
-            }
-
-            return quote
+            # 只解析有客户端需要的扩展字段
+            extra = None
+            if self.parse_fields:
+                extra = {}
+                for field, ctp_field, is_int in self.parse_fields:
+                    value = data.get(ctp_field)
+                    if value is None:
+                        extra[field] = None
+                    elif is_int:
+                        extra[field] = int(value)
+                    else:
+                        value = float(value)
+                        extra[field] = value if abs(value) < INVALID_PRICE else None
+
+            return Quote(
+                instrument_id,
+                round(last_price, 2),
+                round(change, 2),
+                round(change_percent, 2),
+                volume,
+                update_time,
+                update_millisec,
+                int(time.time() * 1000),
+                extra
+            )
 
         except Exception as e:
+            metrics.count_error('parse')
             logger.error(f"Error parsing market data: {e}")
             return None
 
@@ -238,6 +375,7 @@ class CTPMarketDataAPI(CThostFtdcMdSpi):
         """断开连接"""
         try:
             logger.info("Disconnecting from CTP server")
+            self._cancel_login_retry()
             self.Release()
             self.is_connected = False
             self.is_logged_in = False
@@ -257,15 +395,17 @@ class CTPConfig:
     PROD_BROKER_ID = "9999"
 
     @classmethod
-    def get_config(cls, is_sim: bool = True) -> dict:
-        """获取CTP配置"""
+    def get_config(cls, is_sim: bool = True, front_addresses: Optional[list[str]] = None) -> dict:
+        """获取CTP配置，front_addresses 为配置的前置列表（为空时使用默认前置）"""
         if is_sim:
-            return {
+            config = {
                 'front_address': cls.SIM_FRONT_ADDRESS,
                 'broker_id': cls.SIM_BROKER_ID,
             }
         else:
-            return {
+            config = {
                 'front_address': cls.PROD_FRONT_ADDRESS,
                 'broker_id': cls.PROD_BROKER_ID,
             }
+        config['front_addresses'] = list(front_addresses or [config['front_address']])
+        return config
@@ -0,0 +1,50 @@
+"""
+字段级增量编码
+记录每个客户端每个合约上次发送的字段值，之后只发送变化的字段
+"""
+
+from typing import Dict, Optional
+
+
+class DeltaEncoder:
+    """单个客户端的增量编码器
+
+    每条增量以合约序号 k 标识合约；某合约第一次发送或重新同步时发送全量记录，
+    全量记录带 instrumentId，客户端据此建立 k 与合约的对应关系。
+    """
+
+    def __init__(self):
+        self.last_sent: Dict[str, dict] = {}
+
+    def encode(self, key: int, payload: dict) -> Optional[dict]:
+        """
+        编码一笔行情
+
+        Args:
+            key: 合约序号
+            payload: 推送格式的行情字典
+
+        Returns:
+            需要发送的记录，没有字段变化时为None
+        """
+        instrument_id = payload['instrumentId']
+        last = self.last_sent.get(instrument_id)
+        self.last_sent[instrument_id] = payload
+        if last is None:
+            entry = {'k': key}
+            entry.update(payload)
+            return entry
+
+        entry = {'k': key}
+        for field, value in payload.items():
+            if last.get(field) != value:
+                entry[field] = value
+        return entry if len(entry) > 1 else None
+
+    def forget(self, instrument_id: str):
+        """忘记合约的发送记录，下次发送全量"""
+        self.last_sent.pop(instrument_id, None)
+
+    def reset(self):
+        """清空全部发送记录，之后每个合约都发送全量"""
+        self.last_sent.clear()
@@ -0,0 +1,150 @@
+"""
+行情源连接状态机
+记录行情源的连接状态和每次状态变化，断线后按指数退避安排重连，并统计断线到恢复后第一笔行情的时间。
+
+状态：
+    connecting    启动后正在连接前置
+    logged_in     已登录，没有需要订阅的合约
+    subscribing   已登录并（重新）发出全部订阅，等待第一笔行情
+    streaming     正在收到行情
+    disconnected  工作会话断开或行情停滞，正在切换
+    reconnecting  没有可用的前置，等待下一次重连（退避时间按次数翻倍）
+    stopped       已主动断开
+"""
+
+import random
+import threading
+import time
+from typing import Callable, Optional
+
+from loguru import logger
+
+from metrics import metrics
+
+STATE_CONNECTING = 'connecting'
+STATE_LOGGED_IN = 'logged_in'
+STATE_SUBSCRIBING = 'subscribing'
+STATE_STREAMING = 'streaming'
+STATE_DISCONNECTED = 'disconnected'
+STATE_RECONNECTING = 'reconnecting'
+STATE_STOPPED = 'stopped'
+
+# 视为已连接（可以收到行情）的状态
+CONNECTED_STATES = (STATE_LOGGED_IN, STATE_SUBSCRIBING, STATE_STREAMING)
+
+
+class FeedState:
+    """行情源连接状态机类"""
+
+    def __init__(self, backoff_initial: float = 1.0, backoff_max: float = 60.0):
+        """
+        初始化连接状态机
+
+        Args:
+            backoff_initial: 第一次重连前的等待时间（秒）
+            backoff_max: 重连等待时间上限（秒）
+        """
+        self.backoff_initial = backoff_initial
+        self.backoff_max = backoff_max
+        self.state = STATE_STOPPED
+        self.changed_at = time.time()
+        # 本次断线以来的重连次数
+        self.attempt = 0
+        # 本次断线的时刻（monotonic），恢复后第一笔行情时清除
+        self.disconnected_at: Optional[float] = None
+        self.last_recovery_ms: Optional[float] = None
+        self.disconnect_count = 0
+        # 状态变化回调 listener(event)，在触发变化的线程上调用
+        self.listeners: list[Callable] = []
+        self.lock = threading.Lock()
+
+    def add_listener(self, listener: Callable):
+        """添加状态变化回调"""
+        self.listeners.append(listener)
+
+    @property
+    def is_connected(self) -> bool:
+        return self.state in CONNECTED_STATES
+
+    def transition(self, state: str, **detail):
+        """切换状态并通知回调，detail 为附加信息（前置、原因、重连等待等）"""
+        with self.lock:
+            event = self._transition_locked(state, detail)
+        self._notify(event, detail)
+
+    def _transition_locked(self, state: str, detail: dict) -> Optional[dict]:
+        """切换状态（调用方持有锁），返回状态变化事件，状态未变化时返回 None"""
+        previous = self.state
+        if state == previous and not detail:
+            return None
+        self.state = state
+        self.changed_at = time.time()
+        return {
+            "state": state,
+            "previous": previous,
+            "timestamp": int(self.changed_at * 1000),
+            "attempt": self.attempt,
+            **detail,
+        }
+
+    def _notify(self, event: Optional[dict], detail: dict):
+        """在锁外通知状态变化回调"""
+        if event is None:
+            return
+        logger.info(f"Feed state: {event['previous']} -> {event['state']} {detail or ''}")
+        for listener in self.listeners:
+            try:
+                listener(event)
+            except Exception as e:
+                logger.error(f"Error in feed state listener: {e}")
+
+    def on_disconnected(self, reason: str, **detail):
+        """工作会话断开或行情停滞，开始计算恢复时间"""
+        detail["reason"] = reason
+        with self.lock:
+            if self.disconnected_at is None:
+                self.disconnected_at = time.monotonic()
+                self.disconnect_count += 1
+                metrics.count_disconnect()
+            event = self._transition_locked(STATE_DISCONNECTED, detail)
+        self._notify(event, detail)
+
+    def schedule_retry(self, reason: str) -> float:
+        """本次重连失败，返回下一次重连前的等待时间（指数退避，带±20%抖动）"""
+        with self.lock:
+            delay = min(self.backoff_initial * (2 ** self.attempt), self.backoff_max)
+            delay *= random.uniform(0.8, 1.2)
+            self.attempt += 1
+            detail = {"reason": reason, "retry_in_ms": int(delay * 1000)}
+            event = self._transition_locked(STATE_RECONNECTING, detail)
+        self._notify(event, detail)
+        return delay
+
+    def on_tick(self):
+        """收到行情（行情线程，每笔调用，非 streaming 时才有额外处理）"""
+        # 无锁快速路径；切换前在锁内重新检查，并发的第一笔行情只切换一次
+        if self.state == STATE_STREAMING:
+            return
+        with self.lock:
+            if self.state == STATE_STREAMING:
+                return
+            detail = {}
+            if self.disconnected_at is not None:
+                recovery_ns = int((time.monotonic() - self.disconnected_at) * 1e9)
+                self.disconnected_at = None
+                self.last_recovery_ms = round(recovery_ns / 1e6, 1)
+                metrics.record_recovery(recovery_ns)
+                detail["recovery_ms"] = self.last_recovery_ms
+            self.attempt = 0
+            event = self._transition_locked(STATE_STREAMING, detail)
+        self._notify(event, detail)
+
+    def get_stats(self) -> dict:
+        """获取状态摘要"""
+        return {
+            "state": self.state,
+            "since": int(self.changed_at * 1000),
+            "attempt": self.attempt,
+            "disconnects": self.disconnect_count,
+            "last_recovery_ms": self.last_recovery_ms,
+        }
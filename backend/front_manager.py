@@ -0,0 +1,504 @@
+"""
+CTP多前置管理
+为配置的每个前置建立会话，测量连接、登录和探测合约首笔行情的耗时，选最快的前置作为工作会话，
+次快的保持登录作为热备。工作会话断开（OnFrontDisconnected）或行情停滞超过 stale_seconds 时切换到热备
+（没有热备时按排名依次连接其他前置），按批次重新订阅全部合约。切换期间最新行情缓存保持不变，
+客户端只会看到短暂的停顿。全部前置都不可用时按指数退避重试；连接状态变化由 FeedState 记录并通知
+（见 feed_state.py），断线到恢复后第一笔行情的时间记入 metrics。
+
+会话由 session_factory(前置地址) 创建，接口与 CTPMarketDataAPI 相同（另需 add_status_callback，
+CTP自动重连同一前置并重新登录后由会话自己补发订阅），可替换为模拟前置测试切换（见 benchmarks/bench_failover.py）
+"""
+
+import threading
+import time
+from typing import Callable, Dict, Optional, Set
+
+from loguru import logger
+
+from feed_state import (STATE_CONNECTING, STATE_LOGGED_IN, STATE_RECONNECTING, STATE_STOPPED,
+                        STATE_SUBSCRIBING, FeedState)
+from log_sampler import LogSampler
+from metrics import metrics
+from quote import Quote, normalize_groups
+
+# 后台检查（行情停滞、热备会话）的间隔（秒）
+WATCH_SECONDS = 0.5
+# 重建热备会话的间隔（秒）
+RETRY_SECONDS = 10.0
+
+
+class FrontSession:
+    """一个前置上的会话及其测量结果"""
+
+    def __init__(self, address: str, api):
+        self.address = address
+        self.api = api
+        self.started = time.monotonic()
+        # 连接、登录、探测合约首笔行情的耗时（毫秒），未完成为 None
+        self.connect_ms: Optional[float] = None
+        self.login_ms: Optional[float] = None
+        self.first_tick_ms: Optional[float] = None
+        self.probe_sent: Optional[float] = None
+        self.logged_in = False
+        # 曾经断开过（CTP会自动重连同一前置，重新登录后需要重新订阅）
+        self.dropped = False
+
+    def rank_key(self) -> tuple:
+        """排序键：有首笔行情的在前，按首笔行情耗时、再按登录耗时"""
+        return (
+            self.first_tick_ms is None,
+            self.first_tick_ms or 0.0,
+            self.login_ms if self.login_ms is not None else float('inf'),
+        )
+
+    def to_dict(self) -> dict:
+        return {
+            "address": self.address,
+            "connect_ms": self.connect_ms,
+            "login_ms": self.login_ms,
+            "first_tick_ms": self.first_tick_ms,
+            "logged_in": self.logged_in,
+        }
+
+
+class FrontManager:
+    """CTP多前置管理类（行情源接口与 CTPMarketDataAPI 相同）"""
+
+    def __init__(self, front_addresses: list[str], session_factory: Callable,
+                 probe_instruments: Optional[list[str]] = None, probe_seconds: float = 5.0,
+                 stale_seconds: float = 30.0, reconnect_initial: float = 1.0, reconnect_max: float = 60.0):
+        """
+        初始化多前置管理
+
+        Args:
+            front_addresses: 前置地址列表
+            session_factory: 会话工厂，session_factory(前置地址) 返回未连接的会话
+            probe_instruments: 测量首笔行情耗时的合约，为空时只按登录耗时排序
+            probe_seconds: 连接登录和等待首笔行情的超时（秒）
+            stale_seconds: 工作会话多久没有行情视为停滞并切换，0为不检测
+            reconnect_initial: 没有可用前置时第一次重试前的等待（秒），之后每次翻倍
+            reconnect_max: 重试等待上限（秒）
+        """
+        self.front_addresses = list(dict.fromkeys(front_addresses))
+        self.session_factory = session_factory
+        self.probe_instruments = list(probe_instruments or [])
+        self.probe_seconds = probe_seconds
+        self.stale_seconds = stale_seconds
+
+        self.subscribed_instruments: Set[str] = set()
+        self.quote_callbacks: list[Callable] = []
+        # 行情回调出错时按类别限速输出日志
+        self.error_log = LogSampler()
+        self.parse_groups: tuple = ()
+
+        # 最新行情缓存（跨会话保持，切换前置时不清空）
+        self.last_quotes: Dict[str, Quote] = {}
+        self.lock = threading.Lock()
+        # 同一时刻只进行一次切换
+        self.switch_lock = threading.Lock()
+
+        self.active: Optional[FrontSession] = None
+        self.standby: Optional[FrontSession] = None
+        # 前置按测量结果排序，最快在前
+        self.ranking: list[str] = list(self.front_addresses)
+        # 前置地址 -> 最近一次测量结果
+        self.measurements: Dict[str, dict] = {}
+        self.disconnect_counts: Dict[str, int] = {address: 0 for address in self.front_addresses}
+
+        self.last_tick = 0.0
+        # 收到过行情后才检测停滞，避免收盘后在前置之间来回切换
+        self.stale_armed = False
+        self.failover_count = 0
+        self.last_failover: Optional[dict] = None
+        # 正在进行的切换的开始时刻，新会话收到第一笔行情时计算停顿时间
+        self.switch_started: Optional[float] = None
+        self.stopped = True
+        self.watch_thread: Optional[threading.Thread] = None
+        # 连接状态机，处于 reconnecting 时到 next_retry 再尝试连接
+        self.feed_state = FeedState(reconnect_initial, reconnect_max)
+        self.next_retry = 0.0
+
+    @property
+    def is_connected(self) -> bool:
+        active = self.active
+        return bool(active and active.api.is_connected)
+
+    @property
+    def is_logged_in(self) -> bool:
+        active = self.active
+        return bool(active and active.api.is_logged_in)
+
+    @property
+    def front_address(self) -> Optional[str]:
+        """当前工作前置"""
+        active = self.active
+        return active.address if active else None
+
+    def add_quote_callback(self, callback: Callable):
+        """添加行情回调函数"""
+        self.quote_callbacks.append(callback)
+        logger.info(f"Added quote callback, total callbacks: {len(self.quote_callbacks)}")
+
+    def remove_quote_callback(self, callback: Callable):
+        """移除行情回调函数"""
+        if callback in self.quote_callbacks:
+            self.quote_callbacks.remove(callback)
+            logger.info(f"Removed quote callback, total callbacks: {len(self.quote_callbacks)}")
+
+    def add_status_listener(self, listener: Callable):
+        """添加连接状态变化回调 listener(event)，在行情或管理线程上调用"""
+        self.feed_state.add_listener(listener)
+
+    def connect(self) -> bool:
+        """开始测量全部前置并选择工作前置（在后台线程进行，立即返回）"""
+        if not self.front_addresses:
+            logger.error("No CTP front address configured")
+            return False
+        logger.info(f"Probing {len(self.front_addresses)} CTP fronts: {self.front_addresses}")
+        self.stopped = False
+        self.feed_state.transition(STATE_CONNECTING)
+        self.watch_thread = threading.Thread(target=self._run, name='ctp-fronts', daemon=True)
+        self.watch_thread.start()
+        return True
+
+    def login(self) -> bool:
+        """各会话在前置连接后自动登录，这里只返回工作会话的登录状态"""
+        return self.is_logged_in
+
+    def subscribe_market_data(self, instruments: list[str]) -> bool:
+        """订阅行情数据；尚未选出工作前置时只登记，选出后统一订阅"""
+        if not instruments:
+            return True
+        with self.lock:
+            self.subscribed_instruments.update(instruments)
+            active = self.active
+        if active is None:
+            return True
+        return active.api.subscribe_market_data(instruments)
+
+    def unsubscribe_market_data(self, instruments: list[str]) -> bool:
+        """取消订阅行情数据"""
+        if not instruments:
+            return True
+        with self.lock:
+            self.subscribed_instruments.difference_update(instruments)
+            for instrument in instruments:
+                self.last_quotes.pop(instrument, None)
+            active = self.active
+        if active is None:
+            return True
+        return active.api.unsubscribe_market_data(instruments)
+
+    def set_parse_groups(self, groups):
+        """设置需要解析的扩展字段组（工作会话和热备会话）"""
+        self.parse_groups = normalize_groups(groups)
+        for session in (self.active, self.standby):
+            if session:
+                session.api.set_parse_groups(self.parse_groups)
+
+    def get_subscription_status(self, instruments: list[str]) -> Dict[str, dict]:
+        """获取合约的订阅状态（工作会话的回报；切换期间为 pending）"""
+        active = self.active
+        if active is not None:
+            return active.api.get_subscription_status(instruments)
+        with self.lock:
+            return {
+                instrument: {"status": 'pending' if instrument in self.subscribed_instruments else 'unsubscribed'}
+                for instrument in instruments
+            }
+
+    def get_subscribed_instruments(self) -> Set[str]:
+        """获取已订阅的合约列表"""
+        with self.lock:
+            return self.subscribed_instruments.copy()
+
+    def get_last_quote(self, instrument_id: str) -> Optional[Quote]:
+        """获取指定合约的最新行情"""
+        with self.lock:
+            return self.last_quotes.get(instrument_id)
+
+    def get_all_quotes(self) -> Dict[str, Quote]:
+        """获取所有合约的最新行情"""
+        with self.lock:
+            return self.last_quotes.copy()
+
+    def get_stats(self) -> dict:
+        """获取前置测量结果和切换统计"""
+        active, standby = self.active, self.standby
+        return {
+            "active": active.address if active else None,
+            "standby": standby.address if standby else None,
+            "ranking": list(self.ranking),
+            "fronts": {
+                address: dict(self.measurements.get(address, {}), disconnects=self.disconnect_counts.get(address, 0))
+                for address in self.front_addresses
+            },
+            "connection": self.feed_state.get_stats(),
+            "failovers": self.failover_count,
+            "last_failover": self.last_failover,
+        }
+
+    def disconnect(self):
+        """断开全部会话"""
+        logger.info("Disconnecting from all CTP fronts")
+        self.stopped = True
+        with self.lock:
+            sessions = [s for s in (self.active, self.standby) if s]
+            self.active = self.standby = None
+        for session in sessions:
+            session.api.disconnect()
+        self.feed_state.transition(STATE_STOPPED)
+
+    # 会话回调
+    def _on_session_status(self, session: FrontSession, event: str, detail):
+        """会话连接状态变化（CTP回调线程）"""
+        now = time.monotonic()
+        if event == 'connected':
+            if session.connect_ms is None:
+                session.connect_ms = (now - session.started) * 1000
+        elif event == 'logged_in':
+            if session.login_ms is None:
+                session.login_ms = (now - session.started) * 1000
+            session.logged_in = True
+            if session.dropped and session is self.active:
+                # CTP自动重连了同一前置，会话已补发订阅，切换线程找到其他前置前恢复时仍使用该前置
+                session.dropped = False
+                logger.info(f"CTP front {session.address} logged in again")
+                self._set_subscribing(session)
+        elif event == 'login_failed':
+            session.logged_in = False
+            if session is self.active:
+                self.feed_state.transition(self.feed_state.state, front=session.address,
+                                           reason=f"login failed ({detail})")
+        elif event == 'disconnected':
+            session.logged_in = False
+            session.dropped = True
+            self.disconnect_counts[session.address] = self.disconnect_counts.get(session.address, 0) + 1
+            if session is self.active:
+                self.feed_state.on_disconnected(f"disconnected ({detail})", front=session.address)
+                # 不能在CTP回调线程中释放会话，切换在单独的线程中进行
+                threading.Thread(target=self._failover, args=(f"disconnected ({detail})",),
+                                 name='ctp-failover', daemon=True).start()
+            elif session is self.standby:
+                with self.lock:
+                    self.standby = None
+                self._release(session)
+
+    def _on_session_quote(self, session: FrontSession, quote: Quote):
+        """会话行情回调：只转发工作会话的已订阅合约"""
+        now = time.monotonic()
+        if session.first_tick_ms is None and session.probe_sent is not None:
+            session.first_tick_ms = (now - session.probe_sent) * 1000
+        if session is not self.active:
+            return
+        with self.lock:
+            if quote.instrument_id not in self.subscribed_instruments:
+                return
+            self.last_quotes[quote.instrument_id] = quote
+        self.last_tick = now
+        self.stale_armed = True
+        self.feed_state.on_tick()
+        if self.switch_started is not None:
+            stall_ms = (now - self.switch_started) * 1000
+            self.switch_started = None
+            if self.last_failover is not None:
+                self.last_failover["stall_ms"] = round(stall_ms, 1)
+            logger.info(f"First tick from {session.address} after failover, stall {stall_ms:.1f} ms")
+
+        for callback in self.quote_callbacks:
+            try:
+                callback(quote)
+            except Exception as e:
+                metrics.count_error('callback')
+                if self.error_log.allow('callback'):
+                    logger.error(f"Error in quote callback: {e}")
+
+    # 会话管理
+    def _open(self, address: str) -> FrontSession:
+        """创建会话并开始连接"""
+        api = self.session_factory(address)
+        session = FrontSession(address, api)
+        api.set_parse_groups(self.parse_groups)
+        api.add_quote_callback(lambda quote: self._on_session_quote(session, quote))
+        api.add_status_callback(lambda event, detail: self._on_session_status(session, event, detail))
+        session.started = time.monotonic()
+        api.connect()
+        return session
+
+    def _release(self, session: FrontSession):
+        """在后台线程释放会话"""
+        threading.Thread(target=session.api.disconnect, name='ctp-release', daemon=True).start()
+
+    def _wait(self, condition: Callable[[], bool], timeout: float) -> bool:
+        """等待条件成立"""
+        deadline = time.monotonic() + timeout
+        while not condition():
+            if self.stopped or time.monotonic() >= deadline:
+                return condition()
+            time.sleep(0.01)
+        return True
+
+    def _run(self):
+        """测量前置、选出工作前置，然后定期检查行情停滞和热备会话"""
+        self._probe()
+        next_standby = time.monotonic() + RETRY_SECONDS
+        while not self.stopped:
+            time.sleep(WATCH_SECONDS)
+            now = time.monotonic()
+            if self.feed_state.state == STATE_RECONNECTING:
+                if now >= self.next_retry:
+                    self._failover(f"reconnect attempt {self.feed_state.attempt}")
+                continue
+            active = self.active
+            if active is None:
+                continue
+
+            if (self.stale_seconds > 0 and self.stale_armed and self.subscribed_instruments
+                    and active.logged_in and now - self.last_tick > self.stale_seconds):
+                # 新前置同样没有行情（如收盘）时不再连续切换，收到行情后重新检测
+                self.stale_armed = False
+                reason = f"stale ({now - self.last_tick:.1f}s without ticks)"
+                self.feed_state.on_disconnected(reason, front=active.address)
+                self._failover(reason)
+            elif self.standby is None and len(self.front_addresses) > 1 and now >= next_standby:
+                next_standby = now + RETRY_SECONDS
+                self._open_standby()
+
+    def _probe(self):
+        """同时连接全部前置，按登录和首笔行情耗时排序，最快的作为工作会话，次快的作为热备"""
+        sessions = [self._open(address) for address in self.front_addresses]
+        self._wait(lambda: all(s.logged_in for s in sessions), self.probe_seconds)
+        logged_in = [s for s in sessions if s.logged_in]
+
+        if self.probe_instruments and logged_in:
+            for session in logged_in:
+                session.probe_sent = time.monotonic()
+                session.api.subscribe_market_data(self.probe_instruments)
+            self._wait(lambda: all(s.first_tick_ms is not None for s in logged_in), self.probe_seconds)
+
+        sessions.sort(key=FrontSession.rank_key)
+        self.ranking = [s.address for s in sessions if s.logged_in] + [s.address for s in sessions if not s.logged_in]
+        for session in sessions:
+            self.measurements[session.address] = session.to_dict()
+            logger.info(f"CTP front {session.address}: connect {session.connect_ms} ms, login {session.login_ms} ms, "
+                        f"first tick {session.first_tick_ms} ms")
+
+        for session in sessions:
+            if not session.logged_in:
+                self._release(session)
+        if not logged_in:
+            logger.error("No CTP front logged in, will retry")
+            self._schedule_retry("no front logged in")
+            return
+
+        logged_in = [s for s in sessions if s.logged_in]
+        if len(logged_in) > 1:
+            standby = logged_in[1]
+            if self.probe_instruments:
+                standby.api.unsubscribe_market_data(self.probe_instruments)
+            self.standby = standby
+        for session in logged_in[2:]:
+            self._release(session)
+        self._activate(logged_in[0])
+        logger.info(f"Selected CTP front {logged_in[0].address}, standby {self.standby.address if self.standby else None}")
+
+    def _activate(self, session: FrontSession):
+        """设为工作会话并按批次订阅全部合约"""
+        with self.lock:
+            self.active = session
+            instruments = sorted(self.subscribed_instruments)
+        self.last_tick = time.monotonic()
+        self.stale_armed = False
+        session.dropped = False
+        if self.probe_instruments and session.probe_sent is not None:
+            unused = [i for i in self.probe_instruments if i not in self.subscribed_instruments]
+            if unused:
+                session.api.unsubscribe_market_data(unused)
+        if instruments:
+            session.api.subscribe_market_data(instruments)
+        self._set_subscribing(session)
+
+    def _set_subscribing(self, session: FrontSession):
+        """工作会话已登录并发出全部订阅，等待第一笔行情"""
+        with self.lock:
+            count = len(self.subscribed_instruments)
+        state = STATE_SUBSCRIBING if count else STATE_LOGGED_IN
+        self.feed_state.transition(state, front=session.address, instruments=count)
+        # 已连上前置，下一次断线重新从最短的等待开始
+        self.feed_state.attempt = 0
+
+    def _schedule_retry(self, reason: str):
+        """没有可用前置，按指数退避安排下一次连接"""
+        delay = self.feed_state.schedule_retry(reason)
+        self.next_retry = time.monotonic() + delay
+        logger.warning(f"Next CTP reconnect attempt in {delay:.1f}s")
+
+    def _open_standby(self):
+        """按排名连接一个非工作前置作为热备"""
+        active = self.active
+        for address in self.ranking:
+            if active and address == active.address:
+                continue
+            session = self._open(address)
+            if self._wait(lambda: session.logged_in, self.probe_seconds):
+                with self.lock:
+                    if self.standby is None and not self.stopped:
+                        self.standby = session
+                        session = None
+                if session is not None:
+                    self._release(session)
+                else:
+                    logger.info(f"CTP standby front ready: {address}")
+                return
+            self._release(session)
+
+    def _failover(self, reason: str) -> bool:
+        """切换到热备会话，没有热备时按排名依次连接其他前置（工作前置最后尝试）"""
+        with self.switch_lock:
+            if self.stopped:
+                return False
+            started = time.monotonic()
+            old = self.active
+            logger.warning(f"CTP front failover from {old.address if old else None}: {reason}")
+
+            with self.lock:
+                candidate, self.standby = self.standby, None
+            if candidate is not None and not candidate.logged_in:
+                self._release(candidate)
+                candidate = None
+            if candidate is None:
+                addresses = [a for a in self.ranking if not old or a != old.address]
+                if old:
+                    addresses.append(old.address)
+                for address in addresses:
+                    session = self._open(address)
+                    if self._wait(lambda: session.logged_in, self.probe_seconds):
+                        candidate = session
+                        break
+                    self._release(session)
+
+            if candidate is None:
+                logger.error("No CTP front available for failover")
+                if old is None or not old.logged_in:
+                    self._schedule_retry("no front available")
+                return False
+            if self.stopped:
+                self._release(candidate)
+                return False
+
+            self.failover_count += 1
+            self.last_failover = {
+                "from": old.address if old else None,
+                "to": candidate.address,
+                "reason": reason,
+                "time": time.time(),
+                "switch_ms": round((time.monotonic() - started) * 1000, 1),
+                "stall_ms": None,
+            }
+            self.switch_started = started
+            self._activate(candidate)
+            if old is not None:
+                self._release(old)
+            logger.warning(f"Switched to CTP front {candidate.address} in {self.last_failover['switch_ms']} ms")
+            return True
@@ -0,0 +1,497 @@
+"""
+行情接入进程
+拆分部署时由单个接入进程持有CTP会话（或模拟/回放行情源），通过本地Unix套接字（multiprocessing.connection）
+向各Socket.IO工作进程转发行情。工作进程转发订阅变化，接入进程按工作进程合并引用后向行情源订阅/退订，
+每个工作进程只收到自己订阅的合约
+
+用法：python ingest.py（套接字路径为 INGEST_SOCKET）
+"""
+
+import os
+import signal
+import socket
+import sys
+import threading
+import time
+from collections import deque
+from multiprocessing.connection import Client, Connection, Listener
+from typing import Dict, Optional, Set
+
+from loguru import logger
+
+from config import Config
+from ctp_mdapi import CTPConfig, CTPMarketDataAPI
+from front_manager import FrontManager
+from instrument_index import InstrumentIndex
+from log_setup import setup_logging
+from mock_ctp import MockCTPAPI
+from quote import Quote, normalize_groups
+from replay_feed import ReplayCTPAPI
+from shm_board import SharedQuoteBoard
+from tick_journal import TickJournal
+
+# 发给工作进程的每批行情之间的间隔（秒）
+FLUSH_SECONDS = 0.005
+# 行情源状态的发送间隔（秒）
+FEED_INFO_SECONDS = 1.0
+
+
+def pack_quote(quote: Quote) -> tuple:
+    """打包为跨进程传输的元组：(FIELDS顺序的字段, 扩展字段, 收到时刻)"""
+    return quote.to_row(), quote.extra, quote.recv_ns
+
+
+def unpack_quote(packed: tuple) -> Quote:
+    """解包跨进程传输的行情（recv_ns 为系统单调时钟，同一主机上的进程间可比较）"""
+    row, extra, recv_ns = packed
+    return Quote(*row, extra=extra, recv_ns=recv_ns)
+
+
+def get_authkey() -> bytes:
+    """接入进程与工作进程之间的认证密钥"""
+    return (Config.INGEST_AUTHKEY or Config.SECRET_KEY).encode()
+
+
+class WorkerChannel:
+    """接入进程与一个工作进程之间的连接"""
+
+    def __init__(self, worker_id: int, conn: Connection, capacity: int):
+        self.worker_id = worker_id
+        self.conn = conn
+        # 该工作进程订阅的合约和需要的扩展字段组
+        self.instruments: Set[str] = set()
+        self.groups: tuple = ()
+        # 待发送的行情，积压超过容量时丢弃最旧的
+        self.pending: deque = deque(maxlen=capacity)
+        # 等待订阅回报的合约
+        self.pending_status: Set[str] = set()
+        # 待发送的状态消息 (消息, 内容)：行情源连接状态变化、订阅变化和固定订阅请求的回复
+        self.pending_messages: deque = deque()
+        self.sent_count = 0
+        self.dropped_count = 0
+        self.closed = False
+
+
+class IngestServer:
+    """行情接入服务类"""
+
+    def __init__(self, feed, address: str, authkey: bytes, capacity: int = 100000):
+        """
+        初始化行情接入服务
+
+        Args:
+            feed: 行情源（FrontManager、MockCTPAPI 或 ReplayCTPAPI）
+            address: Unix套接字路径
+            authkey: 认证密钥
+            capacity: 每个工作进程的待发送行情上限
+        """
+        self.feed = feed
+        self.address = address
+        self.authkey = authkey
+        self.capacity = capacity
+
+        self.workers: Dict[int, WorkerChannel] = {}
+        # 合约 -> 订阅该合约的工作进程数
+        self.ref_counts: Dict[str, int] = {}
+        self.lock = threading.Lock()
+        # 串行化引用计数变化和上游订阅/退订，避免不同工作进程的订阅和退订乱序到达行情源
+        self.feed_lock = threading.Lock()
+        self.listener: Optional[Listener] = None
+        self.next_worker_id = 1
+        self.received_count = 0
+        # 最近一次行情源连接状态变化，新连接的工作进程先收到这一条
+        self.last_feed_event: Optional[dict] = None
+        # REST固定订阅（跨全部工作进程），固定订阅本身计一次引用，工作进程重启不影响
+        self.pinned: Set[str] = set()
+
+        feed.add_quote_callback(self._on_quote)
+        if isinstance(feed, FrontManager):
+            feed.add_status_listener(self._on_feed_state)
+
+    def start(self):
+        """开始接受工作进程连接"""
+        if os.path.exists(self.address):
+            os.unlink(self.address)
+        self.listener = Listener(self.address, family='AF_UNIX', authkey=self.authkey)
+        threading.Thread(target=self._accept_loop, name='ingest-accept', daemon=True).start()
+        logger.info(f"Ingest server listening on {self.address}")
+
+    def close(self):
+        """关闭全部连接"""
+        with self.lock:
+            workers = list(self.workers.values())
+        for worker in workers:
+            self._drop_worker(worker)
+        if self.listener:
+            self.listener.close()
+            self.listener = None
+
+    def get_stats(self) -> dict:
+        """获取接入统计"""
+        with self.lock:
+            return {
+                "workers": len(self.workers),
+                "instruments": len(self.ref_counts),
+                "pinned": len(self.pinned),
+                "received": self.received_count,
+                "sent": sum(worker.sent_count for worker in self.workers.values()),
+                "dropped": sum(worker.dropped_count for worker in self.workers.values()),
+            }
+
+    def _on_quote(self, quote: Quote):
+        """行情源回调：放入订阅了该合约的工作进程的发送队列"""
+        packed = pack_quote(quote)
+        with self.lock:
+            self.received_count += 1
+            for worker in self.workers.values():
+                if quote.instrument_id in worker.instruments:
+                    if len(worker.pending) == self.capacity:
+                        worker.dropped_count += 1
+                    worker.pending.append(packed)
+
+    def _on_feed_state(self, event: dict):
+        """行情源连接状态变化：转发给全部工作进程"""
+        with self.lock:
+            self.last_feed_event = event
+            for worker in self.workers.values():
+                worker.pending_messages.append(('state', event))
+
+    def _accept_loop(self):
+        while self.listener:
+            try:
+                conn = self.listener.accept()
+            except Exception as e:
+                if self.listener:
+                    logger.error(f"Error accepting worker connection: {e}")
+                    time.sleep(0.5)
+                continue
+            with self.lock:
+                worker = WorkerChannel(self.next_worker_id, conn, self.capacity)
+                if self.last_feed_event:
+                    worker.pending_messages.append(('state', self.last_feed_event))
+                worker.pending_messages.append(self._get_subscriptions_message())
+                self.next_worker_id += 1
+                self.workers[worker.worker_id] = worker
+            logger.info(f"Worker {worker.worker_id} connected")
+            threading.Thread(target=self._read_loop, args=(worker,), daemon=True,
+                             name=f'ingest-read-{worker.worker_id}').start()
+            threading.Thread(target=self._send_loop, args=(worker,), daemon=True,
+                             name=f'ingest-send-{worker.worker_id}').start()
+
+    def _read_loop(self, worker: WorkerChannel):
+        """处理工作进程的订阅、退订和字段组变化"""
+        while not worker.closed:
+            try:
+                command, payload = worker.conn.recv()
+            except (EOFError, OSError):
+                break
+            except Exception as e:
+                logger.error(f"Invalid message from worker {worker.worker_id}: {e}")
+                break
+            try:
+                if command == 'subscribe':
+                    self._subscribe(worker, payload)
+                elif command == 'unsubscribe':
+                    self._unsubscribe(worker, payload)
+                elif command == 'pin':
+                    self._pin(worker, *payload)
+                elif command == 'unpin':
+                    self._unpin(worker, *payload)
+                elif command == 'parse_groups':
+                    with self.lock:
+                        worker.groups = normalize_groups(payload)
+                    self._update_parse_groups()
+                else:
+                    logger.warning(f"Unknown command from worker {worker.worker_id}: {command}")
+            except Exception as e:
+                logger.error(f"Error handling {command} from worker {worker.worker_id}: {e}")
+        self._drop_worker(worker)
+
+    def _send_loop(self, worker: WorkerChannel):
+        """批量发送行情、订阅回报和行情源状态（只有本线程向该连接写入）"""
+        next_info = 0.0
+        while not worker.closed:
+            with self.lock:
+                batch = list(worker.pending)
+                worker.pending.clear()
+                pending_status = list(worker.pending_status)
+                messages = list(worker.pending_messages)
+                worker.pending_messages.clear()
+            try:
+                for message in messages:
+                    worker.conn.send(message)
+                if batch:
+                    worker.conn.send(('quotes', batch))
+                    worker.sent_count += len(batch)
+                if pending_status:
+                    status = self.feed.get_subscription_status(pending_status)
+                    worker.conn.send(('status', status))
+                    done = {i for i, s in status.items() if s.get('status') != 'pending'}
+                    with self.lock:
+                        worker.pending_status -= done
+                now = time.monotonic()
+                if now >= next_info:
+                    worker.conn.send(('feed', self._get_feed_info()))
+                    next_info = now + FEED_INFO_SECONDS
+            except (EOFError, OSError):
+                break
+            time.sleep(FLUSH_SECONDS)
+        self._drop_worker(worker)
+
+    def _subscribe(self, worker: WorkerChannel, instrument_ids: list[str]):
+        """工作进程订阅合约，第一个订阅的工作进程触发上游订阅；已有行情的合约立即发送最新一笔"""
+        added = []
+        with self.feed_lock:
+            with self.lock:
+                for instrument_id in instrument_ids:
+                    if instrument_id in worker.instruments:
+                        continue
+                    worker.instruments.add(instrument_id)
+                    if self._ref(instrument_id):
+                        added.append(instrument_id)
+                worker.pending_status.update(instrument_ids)
+                if added:
+                    self._broadcast_subscriptions()
+            if added:
+                self.feed.subscribe_market_data(added)
+        with self.lock:
+            for instrument_id in instrument_ids:
+                quote = self.feed.get_last_quote(instrument_id)
+                if quote:
+                    worker.pending.append(pack_quote(quote))
+
+    def _unsubscribe(self, worker: WorkerChannel, instrument_ids: list[str]):
+        """工作进程退订合约，最后一个工作进程退订时取消上游订阅"""
+        with self.feed_lock:
+            with self.lock:
+                removed = self._release(worker, instrument_ids)
+                if removed:
+                    self._broadcast_subscriptions()
+            if removed:
+                self.feed.unsubscribe_market_data(removed)
+
+    def _pin(self, worker: WorkerChannel, request_id: int, instrument_ids: list[str]):
+        """REST固定订阅，回复此前未固定的合约；第一个引用触发上游订阅"""
+        added = []
+        with self.feed_lock:
+            with self.lock:
+                changed = [i for i in dict.fromkeys(instrument_ids) if i not in self.pinned]
+                for instrument_id in changed:
+                    self.pinned.add(instrument_id)
+                    if self._ref(instrument_id):
+                        added.append(instrument_id)
+                if changed:
+                    self._broadcast_subscriptions()
+                worker.pending_messages.append(('reply', (request_id, changed)))
+            if added:
+                self.feed.subscribe_market_data(added)
+        if changed:
+            logger.info(f"Worker {worker.worker_id} pinned {len(changed)} instruments, {len(self.pinned)} pinned")
+
+    def _unpin(self, worker: WorkerChannel, request_id: int, instrument_ids: list[str]):
+        """释放REST固定订阅，回复确实释放的合约；最后一个引用释放时取消上游订阅"""
+        removed = []
+        with self.feed_lock:
+            with self.lock:
+                changed = [i for i in dict.fromkeys(instrument_ids) if i in self.pinned]
+                for instrument_id in changed:
+                    self.pinned.discard(instrument_id)
+                    if self._unref(instrument_id):
+                        removed.append(instrument_id)
+                if changed:
+                    self._broadcast_subscriptions()
+                worker.pending_messages.append(('reply', (request_id, changed)))
+            if removed:
+                self.feed.unsubscribe_market_data(removed)
+        if changed:
+            logger.info(f"Worker {worker.worker_id} unpinned {len(changed)} instruments, {len(self.pinned)} pinned")
+
+    def _ref(self, instrument_id: str) -> bool:
+        """增加合约引用，返回是否为第一个引用（调用方持有锁）"""
+        count = self.ref_counts.get(instrument_id, 0)
+        self.ref_counts[instrument_id] = count + 1
+        return count == 0
+
+    def _unref(self, instrument_id: str) -> bool:
+        """减少合约引用，返回是否已没有引用（调用方持有锁）"""
+        count = self.ref_counts.get(instrument_id, 0) - 1
+        if count > 0:
+            self.ref_counts[instrument_id] = count
+            return False
+        self.ref_counts.pop(instrument_id, None)
+        return True
+
+    def _get_subscriptions_message(self) -> tuple:
+        """固定订阅和全部已订阅合约（调用方持有锁）"""
+        return ('subscriptions', {"pinned": sorted(self.pinned), "instruments": sorted(self.ref_counts)})
+
+    def _broadcast_subscriptions(self):
+        """订阅变化后通知全部工作进程（调用方持有锁）"""
+        message = self._get_subscriptions_message()
+        for worker in self.workers.values():
+            worker.pending_messages.append(message)
+
+    def _release(self, worker: WorkerChannel, instrument_ids) -> list[str]:
+        """减少合约引用，返回不再有工作进程订阅的合约（调用方持有锁）"""
+        removed = []
+        for instrument_id in list(instrument_ids):
+            if instrument_id not in worker.instruments:
+                continue
+            worker.instruments.discard(instrument_id)
+            worker.pending_status.discard(instrument_id)
+            if self._unref(instrument_id):
+                removed.append(instrument_id)
+        return removed
+
+    def _drop_worker(self, worker: WorkerChannel):
+        """工作进程断开：释放其全部订阅"""
+        with self.feed_lock:
+            with self.lock:
+                if worker.closed:
+                    return
+                worker.closed = True
+                self.workers.pop(worker.worker_id, None)
+                removed = self._release(worker, worker.instruments)
+                if removed:
+                    self._broadcast_subscriptions()
+            if removed:
+                self.feed.unsubscribe_market_data(removed)
+        shutdown_connection(worker.conn)
+        try:
+            worker.conn.close()
+        except OSError:
+            pass
+        self._update_parse_groups()
+        logger.info(f"Worker {worker.worker_id} disconnected, released {len(removed)} instruments")
+
+    def _update_parse_groups(self):
+        """行情源解析全部工作进程所需字段组的并集"""
+        with self.lock:
+            groups = [group for worker in self.workers.values() for group in worker.groups]
+        self.feed.set_parse_groups(normalize_groups(groups))
+
+    def _get_feed_info(self) -> dict:
+        """行情源状态"""
+        feed = self.feed
+        if isinstance(feed, ReplayCTPAPI):
+            mode = "replay"
+        elif isinstance(feed, MockCTPAPI):
+            mode = "mock"
+        else:
+            mode = "real"
+        return {
+            "mode": mode,
+            "connected": feed.is_connected,
+            "logged_in": feed.is_logged_in,
+            "subscribed": len(feed.get_subscribed_instruments()),
+        }
+
+
+def create_feed(instrument_index: InstrumentIndex):
+    """按配置创建行情源（回放、模拟或CTP），与单进程部署的选择顺序相同"""
+    if Config.CTP_REPLAY_PATH:
+        return ReplayCTPAPI(Config.CTP_REPLAY_PATH, speed=Config.CTP_REPLAY_SPEED, loop=Config.CTP_REPLAY_LOOP)
+    if Config.CTP_USE_MOCK:
+        return MockCTPAPI(tick_rate=Config.MOCK_TICK_RATE, step_ms=Config.MOCK_STEP_MS,
+                          instrument_index=instrument_index)
+    ctp_config = CTPConfig.get_config(Config.CTP_IS_SIM, Config.CTP_FRONT_ADDRESSES)
+    return FrontManager(
+        ctp_config['front_addresses'],
+        session_factory=lambda front_address: CTPMarketDataAPI(
+            front_address=front_address,
+            broker_id=ctp_config['broker_id'],
+            user_id=Config.CTP_USER_ID,
+            password=Config.CTP_PASSWORD,
+            subscribe_chunk=Config.CTP_SUBSCRIBE_CHUNK
+        ),
+        probe_instruments=Config.CTP_PROBE_INSTRUMENTS,
+        probe_seconds=Config.CTP_PROBE_SECONDS,
+        stale_seconds=Config.CTP_STALE_SECONDS,
+        reconnect_initial=Config.CTP_RECONNECT_INITIAL,
+        reconnect_max=Config.CTP_RECONNECT_MAX
+    )
+
+
+def connect_ingest(address: str, timeout: float = 0.0) -> Connection:
+    """连接接入进程，timeout 秒内重试"""
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            return Client(address, family='AF_UNIX', authkey=get_authkey())
+        except (FileNotFoundError, ConnectionRefusedError):
+            if time.monotonic() >= deadline:
+                raise
+            time.sleep(0.2)
+
+
+def shutdown_connection(conn: Connection):
+    """关闭连接套接字的读写：读线程阻塞在 recv 时只关闭文件描述符既不会唤醒它，也不会让对端收到断开"""
+    try:
+        with socket.socket(fileno=os.dup(conn.fileno())) as sock:
+            sock.shutdown(socket.SHUT_RDWR)
+    except OSError:
+        pass
+
+
+def main():
+    """主函数"""
+    setup_logging('ingest')
+
+    if not Config.INGEST_SOCKET:
+        logger.error("INGEST_SOCKET is required")
+        sys.exit(1)
+    is_valid, error_msg = Config.validate_ctp_config()
+    if not is_valid:
+        logger.error(f"CTP config invalid: {error_msg}")
+        sys.exit(1)
+
+    feed = create_feed(InstrumentIndex.load(Config.INSTRUMENT_FILE))
+    journal = TickJournal(
+        directory=Config.TICK_JOURNAL_DIR,
+        segment_bytes=Config.TICK_JOURNAL_SEGMENT_MB * 1024 * 1024,
+        flush_interval_ms=Config.TICK_JOURNAL_FLUSH_MS
+    ) if Config.TICK_JOURNAL_ENABLED else None
+    if journal:
+        # 行情日志在最前，记录每一笔
+        feed.add_quote_callback(journal.append)
+        journal.start()
+    shm_board = SharedQuoteBoard(
+        Config.SHM_BOARD_NAME,
+        capacity=Config.SHM_BOARD_CAPACITY
+    ) if Config.SHM_BOARD_NAME else None
+    if shm_board:
+        feed.add_quote_callback(shm_board.update)
+
+    server = IngestServer(feed, Config.INGEST_SOCKET, get_authkey(), capacity=Config.QUOTE_BRIDGE_CAPACITY * 10)
+    # CTP在前置连接后自动登录，模拟和回放行情源需要显式登录
+    connected = feed.connect() and (isinstance(feed, FrontManager) or feed.login())
+    if not connected:
+        logger.error("Failed to start market data feed")
+        sys.exit(1)
+    if shm_board:
+        shm_board.start()
+    server.start()
+
+    def handle_signal(signum, frame):
+        raise KeyboardInterrupt
+
+    # cluster.py 用 SIGTERM 停止接入进程，需要写完行情日志
+    signal.signal(signal.SIGTERM, handle_signal)
+    try:
+        while True:
+            time.sleep(60)
+            logger.info(f"Ingest stats: {server.get_stats()}")
+    except KeyboardInterrupt:
+        logger.info("Ingest stopped by user")
+    finally:
+        server.close()
+        feed.disconnect()
+        if journal:
+            journal.close()
+        if shm_board:
+            shm_board.close()
+        logger.complete()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,165 @@
+"""
+合约索引
+启动时从本地合约文件（CSV或JSON，字段同CTP ReqQryInstrument 的返回）一次性加载全部合约，
+在内存中按合约代码排序，支持前缀、品种和交易所查找，订阅时校验合约无需任何I/O。
+全部合约都已到期的文件（如过期的示例数据）只用于查找，不用于校验订阅
+"""
+
+import bisect
+import csv
+import json
+import time
+from pathlib import Path
+from typing import Dict, Iterable, Optional
+
+from loguru import logger
+
+
+class Instrument:
+    """合约信息"""
+
+    __slots__ = ('instrument_id', 'exchange_id', 'product_id', 'name', 'price_tick', 'multiplier', 'expire_date')
+
+    def __init__(self, instrument_id: str, exchange_id: str, product_id: str, name: str = '',
+                 price_tick: float = 0.0, multiplier: int = 1, expire_date: str = ''):
+        self.instrument_id = instrument_id
+        self.exchange_id = exchange_id
+        self.product_id = product_id
+        self.name = name
+        self.price_tick = price_tick
+        self.multiplier = multiplier
+        self.expire_date = expire_date
+
+    @classmethod
+    def from_record(cls, record: dict) -> Optional['Instrument']:
+        """从CTP字段名的记录创建"""
+        instrument_id = (record.get('InstrumentID') or '').strip()
+        if not instrument_id:
+            return None
+        return cls(
+            instrument_id=instrument_id,
+            exchange_id=(record.get('ExchangeID') or '').strip(),
+            product_id=(record.get('ProductID') or '').strip(),
+            name=(record.get('InstrumentName') or '').strip(),
+            price_tick=float(record.get('PriceTick') or 0.0),
+            multiplier=int(record.get('VolumeMultiple') or 1),
+            expire_date=str(record.get('ExpireDate') or '').strip(),
+        )
+
+    def to_dict(self) -> dict:
+        """转换为接口返回格式"""
+        return {
+            'instrumentId': self.instrument_id,
+            'exchangeId': self.exchange_id,
+            'productId': self.product_id,
+            'name': self.name,
+            'priceTick': self.price_tick,
+            'multiplier': self.multiplier,
+            'expireDate': self.expire_date,
+        }
+
+
+class InstrumentIndex:
+    """合约索引类"""
+
+    def __init__(self, instruments: Iterable[Instrument] = ()):
+        self.by_id: Dict[str, Instrument] = {}
+        # 小写合约代码升序排列，与 instruments 一一对应，用于二分查找前缀
+        self.keys: list[str] = []
+        self.instruments: list[Instrument] = []
+        # 小写品种/交易所代码 -> 合约（按合约代码排序）
+        self.by_product: Dict[str, list[Instrument]] = {}
+        self.by_exchange: Dict[str, list[Instrument]] = {}
+        # 最晚的到期日（YYYYMMDD），有合约缺少到期日时为空
+        self.last_expire_date = ''
+        self._build(instruments)
+
+    @classmethod
+    def load(cls, path: str) -> 'InstrumentIndex':
+        """从CSV或JSON文件加载，未配置或文件不存在时返回空索引"""
+        if not path:
+            logger.info("No instrument file configured, instrument validation disabled")
+            return cls()
+        file = Path(path)
+        if not file.exists():
+            logger.warning(f"Instrument file not found: {path}, instrument validation disabled")
+            return cls()
+
+        with open(file, encoding='utf-8') as f:
+            if file.suffix.lower() == '.json':
+                records = json.load(f)
+            else:
+                records = list(csv.DictReader(f))
+        index = cls(filter(None, map(Instrument.from_record, records)))
+        logger.info(f"Loaded {len(index)} instruments from {path}")
+        if index.is_expired():
+            logger.warning(f"All instruments in {path} expired on or before {index.last_expire_date}, "
+                           f"instrument validation disabled")
+        return index
+
+    def get(self, instrument_id: str) -> Optional[Instrument]:
+        """按合约代码获取合约"""
+        return self.by_id.get(instrument_id)
+
+    def search(self, prefix: str = '', product: str = '', exchange: str = '', limit: int = 50) -> list[Instrument]:
+        """
+        查找合约（条件之间为且，均不区分大小写）
+
+        Args:
+            prefix: 合约代码前缀
+            product: 品种代码
+            exchange: 交易所代码
+            limit: 返回条数上限
+        """
+        prefix = prefix.lower()
+        if product:
+            candidates = self.by_product.get(product.lower(), [])
+        elif exchange:
+            candidates = self.by_exchange.get(exchange.lower(), [])
+        elif prefix:
+            # 前缀对应排序数组中的一段连续区间
+            start = bisect.bisect_left(self.keys, prefix)
+            stop = bisect.bisect_left(self.keys, prefix + '\uffff', start)
+            candidates = self.instruments[start:stop]
+            prefix = ''
+        else:
+            candidates = self.instruments
+
+        exchange = exchange.lower()
+        result = []
+        for instrument in candidates:
+            if prefix and not instrument.instrument_id.lower().startswith(prefix):
+                continue
+            if exchange and instrument.exchange_id.lower() != exchange:
+                continue
+            result.append(instrument)
+            if len(result) >= limit:
+                break
+        return result
+
+    def is_expired(self, today: str = '') -> bool:
+        """全部合约都已到期（today 为 YYYYMMDD，默认本地日期）；有合约缺少到期日时视为未到期"""
+        if not self.last_expire_date:
+            return False
+        return self.last_expire_date < (today or time.strftime('%Y%m%d'))
+
+    def validates(self) -> bool:
+        """是否用于校验订阅：有合约且未全部到期"""
+        return bool(self.by_id) and not self.is_expired()
+
+    def __contains__(self, instrument_id: str) -> bool:
+        return instrument_id in self.by_id
+
+    def __len__(self) -> int:
+        return len(self.by_id)
+
+    def _build(self, instruments: Iterable[Instrument]):
+        for instrument in instruments:
+            self.by_id[instrument.instrument_id] = instrument
+        self.instruments = sorted(self.by_id.values(), key=lambda i: i.instrument_id.lower())
+        self.keys = [instrument.instrument_id.lower() for instrument in self.instruments]
+        for instrument in self.instruments:
+            self.by_product.setdefault(instrument.product_id.lower(), []).append(instrument)
+            self.by_exchange.setdefault(instrument.exchange_id.lower(), []).append(instrument)
+        if self.instruments and all(instrument.expire_date for instrument in self.instruments):
+            self.last_expire_date = max(instrument.expire_date for instrument in self.instruments)
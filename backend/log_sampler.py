@@ -0,0 +1,46 @@
+"""
+日志采样
+行情路径上的日志按键（如合约）限速：每个键每隔 interval 秒最多输出一行，其余只计数，
+由定期汇总日志报告被抑制的行数；未启用时 allow 直接返回 False，调用方不会格式化任何参数
+"""
+
+import time
+from typing import Dict, Hashable
+
+
+class LogSampler:
+    """按键限速的日志采样类"""
+
+    def __init__(self, interval: float = 10.0, enabled: bool = True):
+        """
+        初始化日志采样
+
+        Args:
+            interval: 同一个键两行日志之间的最小间隔（秒），0为不限速
+            enabled: 是否输出（行情路径的调试日志只在DEBUG级别启用）
+        """
+        self.interval = interval
+        self.enabled = enabled
+        # 键 -> 上次输出时间（monotonic）
+        self.last_logged: Dict[Hashable, float] = {}
+        self.allowed_count = 0
+        self.suppressed_count = 0
+
+    def allow(self, key: Hashable) -> bool:
+        """该键本次是否输出日志"""
+        if not self.enabled:
+            return False
+        now = time.monotonic()
+        last = self.last_logged.get(key)
+        if last is not None and now - last < self.interval:
+            self.suppressed_count += 1
+            return False
+        self.last_logged[key] = now
+        self.allowed_count += 1
+        return True
+
+    def drain_suppressed(self) -> int:
+        """取出并清零被抑制的行数"""
+        suppressed = self.suppressed_count
+        self.suppressed_count = 0
+        return suppressed
@@ -0,0 +1,43 @@
+"""
+日志配置
+app.py、ingest.py 和 cluster.py 共用：输出到控制台和按天轮转的日志文件。
+production 模式下日志经队列由后台线程写出，行情线程和主循环不等待I/O，异常日志不收集变量值
+"""
+
+import os
+
+from loguru import logger
+
+from config import Config
+
+
+def setup_logging(name: str, log_file: bool = True):
+    """
+    设置日志配置
+
+    Args:
+        name: 进程名称，用作日志文件名前缀和控制台日志的标记
+        log_file: 是否写日志文件，为 False 时只输出到控制台
+    """
+    production = Config.LOG_MODE == 'production'
+    options = {
+        "level": Config.LOG_LEVEL,
+        "enqueue": production,
+        "backtrace": not production,
+        "diagnose": not production,
+    }
+    logger.remove()  # 移除默认处理器
+    if log_file:
+        os.makedirs("logs", exist_ok=True)
+        logger.add(
+            f"logs/{name}_{{time}}.log",
+            rotation="1 day",
+            retention="7 days",
+            format="{time:YYYY-MM-DD HH:mm:ss} | {level} | {name}:{function}:{line} - {message}",
+            **options
+        )
+    logger.add(
+        lambda msg: print(msg, end=""),
+        format=f"<green>{{time:HH:mm:ss}}</green> | <level>{{level}}</level> | {name} | {{message}}",
+        **options
+    )
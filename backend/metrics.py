@@ -0,0 +1,235 @@
+"""
+运行指标
+按行情处理阶段记录HDR风格的对数线性延迟直方图（纳秒），统计各合约的行情笔数、每秒笔数、错误次数以及行情源断线次数和恢复时间，
+以Prometheus文本格式输出。记录只做整数位运算和列表自增，不加锁，可在生产环境常开；
+行情线程与主循环同时记录同一直方图时偶尔少计一次，对分位数没有影响
+"""
+
+import time
+from typing import Dict, Iterable, Optional
+
+# 每个2的幂区间分为 2^SUB_BUCKET_BITS 档，相对误差不超过 1/8
+SUB_BUCKET_BITS = 3
+SUB_BUCKETS = 1 << SUB_BUCKET_BITS
+# 可记录的最大值 2^MAX_VALUE_BITS 纳秒（约18分钟），更大的值记入最后一档
+MAX_VALUE_BITS = 40
+MAX_VALUE = (1 << MAX_VALUE_BITS) - 1
+BUCKET_COUNT = (MAX_VALUE_BITS - SUB_BUCKET_BITS + 1) * SUB_BUCKETS
+# Prometheus输出的 le 边界：1.024微秒到约17秒的2的幂纳秒，恰好是细分档的边界
+EXPORT_BOUNDS_NS = [1 << bits for bits in range(10, 35)]
+# 断线恢复时间的 le 边界：约16毫秒到约9分钟
+RECOVERY_BOUNDS_NS = [1 << bits for bits in range(24, 40)]
+
+# 行情处理阶段，按处理顺序
+STAGES = (
+    'parse',     # 行情线程：CTP行情解析为 Quote
+    'callback',  # 行情线程：更新最新行情缓存并执行行情回调（日志、线程桥）
+    'queue',     # 收到行情到主循环从线程桥取出
+    'cache',     # 主循环：更新行情看板、K线和合并缓冲
+    'emit',      # 收到行情到推送（含合并等待）
+    'flush',     # 一次合并推送的总耗时
+)
+
+
+def bucket_index(value: int) -> int:
+    """纳秒值所在的档位"""
+    if value < 2 * SUB_BUCKETS:
+        return value if value > 0 else 0
+    if value > MAX_VALUE:
+        value = MAX_VALUE
+    shift = value.bit_length() - SUB_BUCKET_BITS - 1
+    return (shift << SUB_BUCKET_BITS) + (value >> shift)
+
+
+def bucket_upper(index: int) -> int:
+    """档位的上界（不含）"""
+    if index < 2 * SUB_BUCKETS:
+        return index + 1
+    shift = (index >> SUB_BUCKET_BITS) - 1
+    return (index - (shift << SUB_BUCKET_BITS) + 1) << shift
+
+
+class LatencyHistogram:
+    """对数线性延迟直方图"""
+
+    __slots__ = ('counts', 'sum')
+
+    def __init__(self):
+        self.counts = [0] * BUCKET_COUNT
+        self.sum = 0
+
+    def record(self, value_ns: int, count: int = 1):
+        """记录 count 次耗时为 value_ns 纳秒的事件"""
+        if value_ns < 2 * SUB_BUCKETS:
+            index = value_ns if value_ns > 0 else 0
+        else:
+            if value_ns > MAX_VALUE:
+                value_ns = MAX_VALUE
+            shift = value_ns.bit_length() - SUB_BUCKET_BITS - 1
+            index = (shift << SUB_BUCKET_BITS) + (value_ns >> shift)
+        self.counts[index] += count
+        self.sum += value_ns * count
+
+    def get_count(self) -> int:
+        return sum(self.counts)
+
+    def percentile(self, q: float, counts: Optional[list[int]] = None) -> int:
+        """分位数（纳秒，取所在档位的上界），q 为0~100"""
+        counts = counts if counts is not None else list(self.counts)
+        total = sum(counts)
+        if not total:
+            return 0
+        rank = max(1, int(total * q / 100 + 0.5))
+        seen = 0
+        for index, count in enumerate(counts):
+            seen += count
+            if seen >= rank:
+                return bucket_upper(index)
+        return MAX_VALUE
+
+    def get_cumulative(self, bounds_ns: Iterable[int]) -> list[int]:
+        """各边界以下的累计次数"""
+        counts = list(self.counts)
+        result = []
+        index = 0
+        cumulative = 0
+        for bound in bounds_ns:
+            while index < BUCKET_COUNT and bucket_upper(index) <= bound:
+                cumulative += counts[index]
+                index += 1
+            result.append(cumulative)
+        return result
+
+    def get_stats(self) -> dict:
+        """次数和分位数（微秒）"""
+        counts = list(self.counts)
+        total = sum(counts)
+        if not total:
+            return {"count": 0}
+        return {
+            "count": total,
+            "mean_us": round(self.sum / total / 1000, 2),
+            **{f"p{name}_us": round(self.percentile(q, counts) / 1000, 2)
+               for name, q in (('50', 50), ('99', 99), ('999', 99.9))},
+            "max_us": round(self.percentile(100, counts) / 1000, 2),
+        }
+
+
+class Metrics:
+    """运行指标类"""
+
+    def __init__(self):
+        self.histograms: Dict[str, LatencyHistogram] = {stage: LatencyHistogram() for stage in STAGES}
+        # 合约 -> 行情笔数（只在主循环中更新）
+        self.tick_counts: Dict[str, int] = {}
+        self.tick_total = 0
+        # 错误类别 -> 次数
+        self.error_counts: Dict[str, int] = {}
+        # 行情源断线次数和断线到恢复后第一笔行情的时间
+        self.disconnect_count = 0
+        self.recovery = LatencyHistogram()
+        # 最近一秒的行情笔数
+        self.ticks_per_second = 0.0
+        self._rate_mark = (time.monotonic(), 0)
+
+    def record(self, stage: str, value_ns: int, count: int = 1):
+        """记录阶段耗时（纳秒）"""
+        self.histograms[stage].record(value_ns, count)
+
+    def count_tick(self, instrument_id: str):
+        """主循环处理一笔行情"""
+        self.tick_counts[instrument_id] = self.tick_counts.get(instrument_id, 0) + 1
+        self.tick_total += 1
+
+    def count_error(self, kind: str):
+        """记录一次错误：parse（行情解析）、callback（行情回调）、emit（推送）"""
+        self.error_counts[kind] = self.error_counts.get(kind, 0) + 1
+
+    def count_disconnect(self):
+        """记录一次行情源断线"""
+        self.disconnect_count += 1
+
+    def record_recovery(self, value_ns: int):
+        """记录断线到恢复后第一笔行情的时间（纳秒）"""
+        self.recovery.record(value_ns)
+
+    def update_rate(self):
+        """满一秒时更新每秒行情笔数，由主循环定期调用"""
+        now = time.monotonic()
+        mark_time, mark_total = self._rate_mark
+        if now - mark_time >= 1.0:
+            self.ticks_per_second = (self.tick_total - mark_total) / (now - mark_time)
+            self._rate_mark = (now, self.tick_total)
+
+    def get_stats(self) -> dict:
+        """获取指标摘要（用于健康检查）"""
+        return {
+            "ticks": self.tick_total,
+            "ticks_per_second": round(self.ticks_per_second, 1),
+            "errors": dict(self.error_counts),
+            "disconnects": self.disconnect_count,
+            "recovery": self.recovery.get_stats(),
+            "latency": {stage: histogram.get_stats() for stage, histogram in self.histograms.items()},
+        }
+
+    def render(self, gauges: Optional[Dict[str, tuple]] = None, counters: Optional[Dict[str, tuple]] = None) -> str:
+        """
+        输出Prometheus文本格式
+
+        Args:
+            gauges: 附加的瞬时值，指标名 -> (值, 说明)
+            counters: 附加的累计计数（指标名以 _total 结尾），指标名 -> (值, 说明)
+        """
+        lines = [
+            "# HELP ctp_stage_latency_seconds Quote pipeline stage latency",
+            "# TYPE ctp_stage_latency_seconds histogram",
+        ]
+        for stage, histogram in self.histograms.items():
+            cumulative = histogram.get_cumulative(EXPORT_BOUNDS_NS)
+            total = histogram.get_count()
+            for bound, count in zip(EXPORT_BOUNDS_NS, cumulative):
+                lines.append(f'ctp_stage_latency_seconds_bucket{{stage="{stage}",le="{bound / 1e9:.9g}"}} {count}')
+            lines.append(f'ctp_stage_latency_seconds_bucket{{stage="{stage}",le="+Inf"}} {total}')
+            lines.append(f'ctp_stage_latency_seconds_sum{{stage="{stage}"}} {histogram.sum / 1e9:.9g}')
+            lines.append(f'ctp_stage_latency_seconds_count{{stage="{stage}"}} {total}')
+
+        lines += [
+            "# HELP ctp_ticks_total Quotes processed per instrument",
+            "# TYPE ctp_ticks_total counter",
+        ]
+        for instrument_id, count in sorted(self.tick_counts.items()):
+            lines.append(f'ctp_ticks_total{{instrument="{instrument_id}"}} {count}')
+        lines += [
+            "# HELP ctp_ticks_per_second Quotes processed in the last second",
+            "# TYPE ctp_ticks_per_second gauge",
+            f"ctp_ticks_per_second {self.ticks_per_second:.1f}",
+            "# HELP ctp_errors_total Errors by kind",
+            "# TYPE ctp_errors_total counter",
+        ]
+        for kind in sorted({'parse', 'callback', 'emit', *self.error_counts}):
+            lines.append(f'ctp_errors_total{{kind="{kind}"}} {self.error_counts.get(kind, 0)}')
+
+        lines += [
+            "# HELP ctp_disconnects_total Feed disconnects (front dropped or stale)",
+            "# TYPE ctp_disconnects_total counter",
+            f"ctp_disconnects_total {self.disconnect_count}",
+            "# HELP ctp_recovery_seconds Time from feed disconnect to first tick after recovery",
+            "# TYPE ctp_recovery_seconds histogram",
+        ]
+        cumulative = self.recovery.get_cumulative(RECOVERY_BOUNDS_NS)
+        total = self.recovery.get_count()
+        for bound, count in zip(RECOVERY_BOUNDS_NS, cumulative):
+            lines.append(f'ctp_recovery_seconds_bucket{{le="{bound / 1e9:.9g}"}} {count}')
+        lines.append(f'ctp_recovery_seconds_bucket{{le="+Inf"}} {total}')
+        lines.append(f'ctp_recovery_seconds_sum {self.recovery.sum / 1e9:.9g}')
+        lines.append(f'ctp_recovery_seconds_count {total}')
+
+        for name, (value, description) in (counters or {}).items():
+            lines += [f"# HELP {name} {description}", f"# TYPE {name} counter", f"{name} {value}"]
+        for name, (value, description) in (gauges or {}).items():
+            lines += [f"# HELP {name} {description}", f"# TYPE {name} gauge", f"{name} {value}"]
+        return "\n".join(lines) + "\n"
+
+
+# 进程内共用的指标，各模块直接导入记录
+metrics = Metrics()
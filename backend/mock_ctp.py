@@ -1,47 +1,60 @@
 """
 CTP模拟数据生成器
-当无法连接真实CTP服务器时，使用此模块生成模拟行情数据
+当无法连接真实CTP服务器时，使用此模块生成模拟行情数据。
+行情由 MockMarket 按步批量生成，总成交速率可配置，用于对服务端做压力测试
 """
 
 import time
-import random
 import threading
 from typing import Dict, Set, Callable, Optional
 from loguru import logger
 
+from log_sampler import LogSampler
+from metrics import metrics
+from mock_market import MockMarket
+from quote import Quote, normalize_groups
+
 
 class MockCTPAPI:
     """CTP模拟数据API类"""
     
-    def __init__(self):
+    def __init__(self, tick_rate: float = 200.0, step_ms: int = 50, instrument_index=None,
+                 seed: Optional[int] = None):
+        """
+        初始化模拟API
+
+        Args:
+            tick_rate: 全部订阅合约合计的每秒行情笔数
+            step_ms: 生成步长（毫秒），同一合约在一步内可以有多笔
+            instrument_index: 合约索引，提供最小变动价位和合约乘数（可选）
+            seed: 随机数种子
+        """
         self.is_connected = False
         self.is_logged_in = False
         self.subscribed_instruments: Set[str] = set()
         self.quote_callbacks: list[Callable] = []
+        # 行情回调出错时按类别限速输出日志
+        self.error_log = LogSampler()
+        # 需要生成的扩展字段组
+        self.parse_groups: tuple = ()
         
         # 行情数据缓存
-        self.last_quotes: Dict[str, dict] = {}
+        self.last_quotes: Dict[str, Quote] = {}
         self.lock = threading.Lock()
         
         # 模拟数据生成线程
         self.mock_thread = None
         self.stop_mock = False
+        self.tick_rate = tick_rate
+        self.step_ms = max(1, step_ms)
+        self.market = MockMarket(instrument_index=instrument_index, seed=seed)
+        self.generated_count = 0
+        self.lagging_steps = 0
+        # 本次开始生成的时刻和此前的生成笔数，用于计算实际生成速率
+        self.started_at: Optional[float] = None
+        self.started_count = 0
         
-        # 基础价格数据（用于生成模拟数据）
-        self.base_prices = {
-            'rb2501': 3500.0,  # 螺纹钢
-            'hc2501': 3600.0,  # 热卷
-            'i2501': 800.0,    # 铁矿石
-            'j2501': 2500.0,   # 焦炭
-            'jm2501': 1800.0,  # 焦煤
-            'cu2501': 70000.0, # 铜
-            'al2501': 18000.0, # 铝
-            'zn2501': 25000.0, # 锌
-            'ag2501': 6000.0,  # 白银
-            'au2501': 500.0,   # 黄金
-        }
-        
-        logger.info("Mock CTP API initialized")
+        logger.info(f"Mock CTP API initialized, tick rate: {tick_rate}/s, step: {self.step_ms}ms")
     
     def add_quote_callback(self, callback: Callable):
         """添加行情回调函数"""
@@ -88,10 +101,7 @@ class MockCTPAPI:
             
             with self.lock:
                 self.subscribed_instruments.update(instruments)
-                # 为每个合约初始化基础价格
-                for instrument in instruments:
-                    if instrument not in self.base_prices:
-                        self.base_prices[instrument] = 1000.0  # 默认价格
+                self.market.add(instruments)
             
             # 启动模拟数据生成线程
             if not self.mock_thread or not self.mock_thread.is_alive():
@@ -116,6 +126,7 @@ class MockCTPAPI:
                 for instrument in instruments:
                     self.subscribed_instruments.discard(instrument)
                     self.last_quotes.pop(instrument, None)
+                self.market.remove(instruments)
             
             # 如果没有订阅的合约了，停止模拟数据生成
             if not self.subscribed_instruments:
@@ -126,54 +137,93 @@ class MockCTPAPI:
             logger.error(f"Failed to unsubscribe mock market data: {e}")
             return False
     
+    def set_parse_groups(self, groups):
+        """设置需要生成的扩展字段组"""
+        self.parse_groups = normalize_groups(groups)
+        logger.info(f"Mock market data extra field groups: {list(self.parse_groups) or 'none'}")
+
+    def get_subscription_status(self, instruments: list[str]) -> Dict[str, dict]:
+        """获取合约的订阅状态，模拟数据源订阅立即生效"""
+        with self.lock:
+            return {
+                instrument: {"status": 'subscribed' if instrument in self.subscribed_instruments else 'unsubscribed'}
+                for instrument in instruments
+            }
+
     def get_subscribed_instruments(self) -> Set[str]:
         """获取已订阅的合约列表"""
         with self.lock:
             return self.subscribed_instruments.copy()
     
-    def get_last_quote(self, instrument_id: str) -> Optional[dict]:
+    def get_last_quote(self, instrument_id: str) -> Optional[Quote]:
         """获取指定合约的最新行情"""
         with self.lock:
             return self.last_quotes.get(instrument_id)
     
-    def get_all_quotes(self) -> Dict[str, dict]:
+    def get_all_quotes(self) -> Dict[str, Quote]:
         """获取所有合约的最新行情"""
         with self.lock:
             return self.last_quotes.copy()
+
+    def get_stats(self) -> dict:
+        """获取模拟行情统计"""
+        elapsed = time.monotonic() - self.started_at if self.started_at else 0.0
+        return {
+            "generated": self.generated_count,
+            "tick_rate": self.tick_rate,
+            "effective_tick_rate": round((self.generated_count - self.started_count) / elapsed, 1) if elapsed else 0.0,
+            "step_ms": self.step_ms,
+            "instruments": len(self.market),
+            "lagging_steps": self.lagging_steps,
+        }
     
     def _generate_mock_data(self):
-        """生成模拟行情数据"""
+        """按固定步长批量生成模拟行情，每步的成交次数为 tick_rate x 步长"""
         logger.info("Starting mock data generation")
-        logger.info(f"Subscribed instruments: {self.subscribed_instruments}")
+        step = self.step_ms / 1000.0
+        carry = 0.0
+        next_step = time.monotonic()
+        self.started_at = next_step
+        self.started_count = self.generated_count
         
         while not self.stop_mock:
             try:
-                with self.lock:
-                    instruments = list(self.subscribed_instruments)
+                # 小数部分累积到下一步，长期速率准确
+                carry += self.tick_rate * step
+                tick_count = int(carry)
+                carry -= tick_count
                 
-                if not instruments:
-                    time.sleep(1)
-                    continue
+                recv_ns = time.perf_counter_ns()
+                with self.lock:
+                    quotes = self.market.step(int(time.time() * 1000), tick_count, self.parse_groups)
+                    for quote in quotes:
+                        quote.recv_ns = recv_ns
+                        self.last_quotes[quote.instrument_id] = quote
+                self.generated_count += len(quotes)
+                if quotes:
+                    # 一步内的行情一起生成，解析耗时按笔均摊
+                    metrics.record('parse', (time.perf_counter_ns() - recv_ns) // len(quotes), len(quotes))
                 
-                # 为每个订阅的合约生成行情数据
-                for instrument in instruments:
-                    quote = self._create_mock_quote(instrument)
-                    if quote:
-                        with self.lock:
-                            self.last_quotes[instrument] = quote
-                        
-                        logger.debug(f"Generated quote for {instrument}: {quote}")
-                        
-                        # 调用回调函数
-                        for callback in self.quote_callbacks:
-                            try:
-                                callback(quote)
-                                logger.debug(f"Callback executed for {instrument}")
-                            except Exception as e:
+                # 调用回调函数
+                for quote in quotes:
+                    callback_ns = time.perf_counter_ns()
+                    for callback in self.quote_callbacks:
+                        try:
+                            callback(quote)
+                        except Exception as e:
+                            metrics.count_error('callback')
+                            if self.error_log.allow('callback'):
                                 logger.error(f"Error in mock quote callback: {e}")
+                    metrics.record('callback', time.perf_counter_ns() - callback_ns)
                 
-                # 每500ms更新一次数据
-                time.sleep(0.5)
+                next_step += step
+                delay = next_step - time.monotonic()
+                if delay > 0:
+                    time.sleep(delay)
+                elif delay < -1.0:
+                    # 落后超过1秒时不再追赶
+                    self.lagging_steps += 1
+                    next_step = time.monotonic()
                 
             except Exception as e:
                 logger.error(f"Error generating mock data: {e}")
@@ -181,45 +231,6 @@ class MockCTPAPI:
         
         logger.info("Mock data generation stopped")
     
-    def _create_mock_quote(self, instrument_id: str) -> Optional[dict]:
-        """创建模拟行情数据"""
-        try:
-            # 获取基础价格
-            base_price = self.base_prices.get(instrument_id, 1000.0)
-            
-            # 生成价格波动（-2% 到 +2%）
-            change_percent = random.uniform(-2.0, 2.0)
-            price_change = base_price * (change_percent / 100)
-            last_price = base_price + price_change
-            
-            # 更新基础价格（模拟价格趋势）
-            self.base_prices[instrument_id] = last_price
-            
-            # 生成成交量
-            volume = random.randint(100, 10000)
-            
-            # 生成时间
-            current_time = time.time()
-            update_time = time.strftime("%H:%M:%S", time.localtime(current_time))
-            update_millisec = int((current_time % 1) * 1000)
-            
-            quote = {
-                'instrumentId': instrument_id,
-                'lastPrice': round(last_price, 2),
-                'change': round(price_change, 2),
-                'changePercent': round(change_percent, 2),
-                'volume': volume,
-                'updateTime': update_time,
-                'updateMillisec': update_millisec,
-                'ts': int(current_time * 1000)
-            }
-            
-            return quote
-            
-        except Exception as e:
-            logger.error(f"Error creating mock quote for {instrument_id}: {e}")
-            return None
-    
     def disconnect(self):
         """断开连接"""
         try:
@@ -0,0 +1,246 @@
+"""
+向量化模拟行情
+用NumPy数组保存全部合约的价格、成交量等状态，每一步一次性推进本步有成交的合约：
+价格为带跳跃的几何布朗运动，按合约的最小变动价位取整；成交量、持仓量和成交额累计变化
+"""
+
+import math
+import time
+import zlib
+from typing import Dict, Optional
+
+import numpy as np
+
+from quote import Quote
+
+# 已知合约的初始价格，其他合约按代码生成稳定的随机初始价
+BASE_PRICES = {
+    'rb2501': 3500.0,   # 螺纹钢
+    'hc2501': 3600.0,   # 热卷
+    'i2501': 800.0,     # 铁矿石
+    'j2501': 2500.0,    # 焦炭
+    'jm2501': 1800.0,   # 焦煤
+    'cu2501': 70000.0,  # 铜
+    'al2501': 18000.0,  # 铝
+    'zn2501': 25000.0,  # 锌
+    'ag2501': 6000.0,   # 白银
+    'au2501': 500.0,    # 黄金
+}
+
+# 每年交易秒数（252天 x 4小时），用于把年化波动率换算为每秒波动率
+TRADING_SECONDS_PER_YEAR = 252 * 4 * 3600
+# 跳跃强度（每秒次数）和跳跃幅度（对数收益标准差）
+JUMP_RATE = 0.02
+JUMP_SIZE = 0.003
+# 涨跌停幅度
+LIMIT_RATIO = 0.07
+
+
+class MockMarket:
+    """向量化模拟行情类"""
+
+    def __init__(self, instrument_index=None, seed: Optional[int] = None, capacity: int = 256):
+        """
+        初始化模拟行情
+
+        Args:
+            instrument_index: 合约索引，提供最小变动价位和合约乘数（可选）
+            seed: 随机数种子
+            capacity: 初始合约容量，不足时按倍数扩容
+        """
+        self.instrument_index = instrument_index
+        self.rng = np.random.default_rng(seed)
+
+        self.instrument_ids: list[str] = []
+        self.slots: Dict[str, int] = {}
+        self.capacity = 0
+        self.arrays: Dict[str, np.ndarray] = {}
+        self._grow(capacity)
+
+        # 活跃合约的槽位和按活跃度归一化的抽样权重
+        self.active_slots = np.zeros(0, dtype=np.int64)
+        self.active_weights = np.zeros(0)
+
+    def add(self, instrument_ids: list[str], now_ms: Optional[int] = None):
+        """加入合约，已退订的合约保留原有价格状态"""
+        now_ms = int(time.time() * 1000) if now_ms is None else now_ms
+        a = self.arrays
+        for instrument_id in instrument_ids:
+            slot = self.slots.get(instrument_id)
+            if slot is None:
+                slot = len(self.instrument_ids)
+                if slot >= self.capacity:
+                    self._grow(self.capacity * 2)
+                self.instrument_ids.append(instrument_id)
+                self.slots[instrument_id] = slot
+                self._init_slot(slot, instrument_id, now_ms)
+            a['active'][slot] = True
+        self._refresh_active()
+
+    def remove(self, instrument_ids: list[str]):
+        """移除合约（停止生成行情）"""
+        for instrument_id in instrument_ids:
+            slot = self.slots.get(instrument_id)
+            if slot is not None:
+                self.arrays['active'][slot] = False
+        self._refresh_active()
+
+    def step(self, now_ms: int, tick_count: int, groups: tuple = ()) -> list[Quote]:
+        """
+        推进一步
+
+        按活跃度有放回地抽取 tick_count 笔成交的合约，同一合约在一步内可以有多笔：
+        按轮次推进，第 r 轮推进本步至少有 r+1 笔的合约，每笔按距上一笔的时间推进价格，
+        返回按轮次排列的 tick_count 笔新行情
+
+        Args:
+            now_ms: 当前时间戳（毫秒）
+            tick_count: 本步的行情笔数
+            groups: 需要生成的扩展字段组
+        """
+        if tick_count <= 0 or not len(self.active_slots):
+            return []
+        drawn = self.rng.choice(self.active_slots, size=tick_count, replace=True, p=self.active_weights)
+        slots, counts = np.unique(drawn, return_counts=True)
+        quotes = []
+        for round_index in range(int(counts.max())):
+            quotes += self._advance(slots[counts > round_index], now_ms, groups)
+        return quotes
+
+    def __len__(self) -> int:
+        return len(self.active_slots)
+
+    def _advance(self, slots: np.ndarray, now_ms: int, groups: tuple) -> list[Quote]:
+        """各合约（槽位不重复）推进一笔，返回新行情"""
+        rng = self.rng
+        a = self.arrays
+        n = len(slots)
+
+        # 带跳跃的几何布朗运动；同一步内的后续各笔按1毫秒推进
+        dt = np.maximum(now_ms - a['last_ts'][slots], 1) / 1000.0
+        sigma = a['sigma'][slots]
+        log_return = -0.5 * sigma * sigma * dt + sigma * np.sqrt(dt) * rng.standard_normal(n)
+        jumps = rng.random(n) < JUMP_RATE * dt
+        if jumps.any():
+            log_return[jumps] += rng.normal(0.0, JUMP_SIZE, int(jumps.sum()))
+        fair = a['fair'][slots] * np.exp(log_return)
+        a['fair'][slots] = fair
+
+        tick = a['tick'][slots]
+        price = np.round(np.maximum(np.round(fair / tick), 1) * tick, 4)
+        a['high'][slots] = np.maximum(a['high'][slots], price)
+        a['low'][slots] = np.minimum(a['low'][slots], price)
+
+        lots = rng.geometric(0.2, n)
+        volume = a['volume'][slots] + lots
+        a['volume'][slots] = volume
+        a['turnover'][slots] += price * lots * a['multiplier'][slots]
+        a['open_interest'][slots] = np.maximum(
+            a['open_interest'][slots] + rng.integers(-lots, lots, endpoint=True), 0
+        )
+        a['last_ts'][slots] = now_ms
+
+        pre_settlement = a['pre_settlement'][slots]
+        change = np.round(price - pre_settlement, 2)
+        change_percent = np.round(change / pre_settlement * 100, 2)
+
+        update_time = time.strftime('%H:%M:%S', time.localtime(now_ms / 1000))
+        update_millisec = now_ms % 1000
+        extras = self._make_extras(slots, price, groups) if groups else [None] * n
+        ids = self.instrument_ids
+        return [
+            Quote(ids[slot], p, c, cp, v, update_time, update_millisec, now_ms, extra)
+            for slot, p, c, cp, v, extra in zip(
+                slots.tolist(), price.tolist(), change.tolist(), change_percent.tolist(), volume.tolist(), extras
+            )
+        ]
+
+    def _make_extras(self, slots: np.ndarray, price: np.ndarray, groups: tuple) -> list[dict]:
+        """按字段组批量生成盘口和统计字段"""
+        a = self.arrays
+        n = len(slots)
+        columns: Dict[str, list] = {}
+        if 'top' in groups or 'depth' in groups:
+            tick = a['tick'][slots]
+            levels = 5 if 'depth' in groups else 1
+            sizes = self.rng.integers(1, 500, size=(2 * levels, n))
+            for level in range(1, levels + 1):
+                columns[f"bidPrice{level}"] = np.round(price - tick * level, 4).tolist()
+                columns[f"bidVolume{level}"] = sizes[2 * level - 2].tolist()
+                columns[f"askPrice{level}"] = np.round(price + tick * level, 4).tolist()
+                columns[f"askVolume{level}"] = sizes[2 * level - 1].tolist()
+        if 'stats' in groups:
+            volume = a['volume'][slots]
+            turnover = a['turnover'][slots]
+            columns.update({
+                'openPrice': a['open'][slots].tolist(),
+                'highestPrice': a['high'][slots].tolist(),
+                'lowestPrice': a['low'][slots].tolist(),
+                'closePrice': [None] * n,
+                'settlementPrice': [None] * n,
+                'preSettlementPrice': a['pre_settlement'][slots].tolist(),
+                'preClosePrice': a['pre_settlement'][slots].tolist(),
+                'openInterest': a['open_interest'][slots].tolist(),
+                'preOpenInterest': a['pre_open_interest'][slots].tolist(),
+                'turnover': np.round(turnover, 2).tolist(),
+                'averagePrice': np.round(turnover / np.maximum(volume, 1), 2).tolist(),
+            })
+        if 'limits' in groups:
+            columns['upperLimitPrice'] = a['upper_limit'][slots].tolist()
+            columns['lowerLimitPrice'] = a['lower_limit'][slots].tolist()
+        names = list(columns)
+        return [dict(zip(names, values)) for values in zip(*columns.values())]
+
+    def _init_slot(self, slot: int, instrument_id: str, now_ms: int):
+        """初始化新合约的参数和状态，随机参数由合约代码决定，重启后保持一致"""
+        rng = np.random.default_rng(zlib.crc32(instrument_id.encode()))
+        instrument = self.instrument_index.get(instrument_id) if self.instrument_index is not None else None
+
+        price = BASE_PRICES.get(instrument_id) or float(np.exp(rng.uniform(math.log(100), math.log(80000))))
+        if instrument and instrument.price_tick > 0:
+            tick = instrument.price_tick
+        else:
+            tick = max(0.01, 10.0 ** (math.floor(math.log10(price)) - 3))
+        price = max(round(price / tick), 1) * tick
+        multiplier = instrument.multiplier if instrument else 10
+
+        a = self.arrays
+        a['fair'][slot] = price
+        a['pre_settlement'][slot] = price
+        a['open'][slot] = price
+        a['high'][slot] = price
+        a['low'][slot] = price
+        a['tick'][slot] = tick
+        a['multiplier'][slot] = multiplier
+        a['upper_limit'][slot] = round(round(price * (1 + LIMIT_RATIO) / tick) * tick, 4)
+        a['lower_limit'][slot] = round(round(price * (1 - LIMIT_RATIO) / tick) * tick, 4)
+        # 年化波动率约15%~60%，换算为每秒
+        a['sigma'][slot] = rng.lognormal(math.log(0.3), 0.35) / math.sqrt(TRADING_SECONDS_PER_YEAR)
+        # 活跃度差异很大：少数合约贡献大部分成交
+        a['weight'][slot] = rng.lognormal(0.0, 1.0)
+        a['open_interest'][slot] = a['pre_open_interest'][slot] = float(rng.integers(10_000, 500_000))
+        a['volume'][slot] = 0
+        a['turnover'][slot] = 0.0
+        a['last_ts'][slot] = now_ms
+
+    def _refresh_active(self):
+        active = np.flatnonzero(self.arrays['active'][:len(self.instrument_ids)])
+        weights = self.arrays['weight'][active]
+        self.active_slots = active
+        self.active_weights = weights / weights.sum() if len(active) else weights
+
+    def _grow(self, capacity: int):
+        """扩容全部状态数组"""
+        dtypes = {
+            'fair': np.float64, 'pre_settlement': np.float64, 'open': np.float64,
+            'high': np.float64, 'low': np.float64, 'tick': np.float64, 'multiplier': np.float64,
+            'upper_limit': np.float64, 'lower_limit': np.float64, 'sigma': np.float64,
+            'weight': np.float64, 'open_interest': np.float64, 'pre_open_interest': np.float64,
+            'turnover': np.float64, 'volume': np.int64, 'last_ts': np.int64, 'active': np.bool_,
+        }
+        for name, dtype in dtypes.items():
+            grown = np.zeros(capacity, dtype=dtype)
+            if name in self.arrays:
+                grown[:self.capacity] = self.arrays[name]
+            self.arrays[name] = grown
+        self.capacity = capacity
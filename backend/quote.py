@@ -0,0 +1,143 @@
+"""
+行情记录类型
+行情接收、缓存和推送链路统一使用该类型，只在发送到WebSocket时转换为字典。
+基础字段每笔必有；盘口、统计等扩展字段按字段组解析，只在有客户端需要时存在于 extra 中
+"""
+
+from functools import lru_cache
+from typing import Dict, Iterable, Optional
+
+# 扩展字段组 -> 推送字段名（CTP字段名为首字母大写）
+FIELD_GROUPS: Dict[str, tuple] = {
+    # 一档盘口
+    'top': ('bidPrice1', 'bidVolume1', 'askPrice1', 'askVolume1'),
+    # 五档盘口
+    'depth': tuple(
+        f"{side}{kind}{level}"
+        for level in range(1, 6)
+        for side in ('bid', 'ask')
+        for kind in ('Price', 'Volume')
+    ),
+    # 当日统计
+    'stats': (
+        'openPrice', 'highestPrice', 'lowestPrice', 'closePrice', 'settlementPrice',
+        'preSettlementPrice', 'preClosePrice', 'openInterest', 'preOpenInterest',
+        'turnover', 'averagePrice',
+    ),
+    # 涨跌停价
+    'limits': ('upperLimitPrice', 'lowerLimitPrice'),
+}
+
+
+def normalize_groups(groups: Optional[Iterable[str]]) -> tuple:
+    """字段组去重排序，作为客户端字段配置的规范形式"""
+    return tuple(sorted(set(groups or ()) & FIELD_GROUPS.keys()))
+
+
+@lru_cache(maxsize=None)
+def group_fields(groups: tuple) -> tuple:
+    """字段组对应的推送字段名（去重，保持组内顺序）"""
+    fields = []
+    for group in groups:
+        fields.extend(FIELD_GROUPS[group])
+    return tuple(dict.fromkeys(fields))
+
+
+class Quote:
+    """单笔行情记录"""
+
+    # 推送字段的固定顺序（二进制编码按此顺序输出数组）
+    FIELDS = (
+        'instrumentId',
+        'lastPrice',
+        'change',
+        'changePercent',
+        'volume',
+        'updateTime',
+        'updateMillisec',
+        'ts',
+    )
+
+    __slots__ = (
+        'instrument_id',
+        'last_price',
+        'change',
+        'change_percent',
+        'volume',
+        'update_time',
+        'update_millisec',
+        'ts',
+        'extra',
+        'recv_ns',
+    )
+
+    def __init__(self, instrument_id: str, last_price: float, change: float, change_percent: float,
+                 volume: int = 0, update_time: str = '', update_millisec: int = 0, ts: int = 0,
+                 extra: Optional[dict] = None, recv_ns: int = 0):
+        self.instrument_id = instrument_id
+        self.last_price = last_price
+        self.change = change
+        self.change_percent = change_percent
+        self.volume = volume
+        self.update_time = update_time
+        self.update_millisec = update_millisec
+        self.ts = ts
+        # 扩展字段（推送字段名 -> 值），没有客户端需要扩展字段时为 None
+        self.extra = extra
+        # 行情源收到该笔行情的时刻（perf_counter_ns，只在进程内有意义，不推送），0为未知
+        self.recv_ns = recv_ns
+
+    def to_dict(self, groups: tuple = ()) -> dict:
+        """转换为推送格式，groups 为客户端需要的扩展字段组"""
+        payload = {
+            'instrumentId': self.instrument_id,
+            'lastPrice': self.last_price,
+            'change': self.change,
+            'changePercent': self.change_percent,
+            'volume': self.volume,
+            'updateTime': self.update_time,
+            'updateMillisec': self.update_millisec,
+            'ts': self.ts,
+        }
+        if groups:
+            payload.update(self.get_extra(groups))
+        return payload
+
+    def get_extra(self, groups: tuple) -> dict:
+        """按字段组取扩展字段，未解析的字段为 None"""
+        extra = self.extra or {}
+        return {field: extra.get(field) for field in group_fields(groups)}
+
+    def to_row(self) -> tuple:
+        """按 FIELDS 顺序转换为元组"""
+        return (
+            self.instrument_id,
+            self.last_price,
+            self.change,
+            self.change_percent,
+            self.volume,
+            self.update_time,
+            self.update_millisec,
+            self.ts,
+        )
+
+    @classmethod
+    def from_dict(cls, data: dict) -> Optional['Quote']:
+        """从推送格式的字典创建"""
+        instrument_id = data.get('instrumentId')
+        if not instrument_id:
+            return None
+        return cls(
+            instrument_id=instrument_id,
+            last_price=data.get('lastPrice', 0.0),
+            change=data.get('change', 0.0),
+            change_percent=data.get('changePercent', 0.0),
+            volume=data.get('volume', 0),
+            update_time=data.get('updateTime', ''),
+            update_millisec=data.get('updateMillisec', 0),
+            ts=data.get('ts', 0),
+            extra={k: v for k, v in data.items() if k not in cls.FIELDS} or None,
+        )
+
+    def __repr__(self) -> str:
+        return f"Quote({self.instrument_id} {self.last_price} {self.change:+} @ {self.ts})"
@@ -0,0 +1,136 @@
+"""
+列式行情看板
+为全部订阅合约预分配按字段存放的NumPy数组，每笔行情按合约序号原地更新，
+全市场排序、筛选和快照都是数组切片运算
+"""
+
+import threading
+from typing import Dict, Iterable, Optional
+
+import numpy as np
+
+from quote import Quote
+
+
+class QuoteBoard:
+    """列式行情看板类"""
+
+    # 推送字段名 -> 数组类型
+    COLUMNS = {
+        'lastPrice': np.float64,
+        'change': np.float64,
+        'changePercent': np.float64,
+        'volume': np.int64,
+        'ts': np.int64,
+    }
+
+    def __init__(self, capacity: int = 1024):
+        """
+        初始化行情看板
+
+        Args:
+            capacity: 初始合约容量，不足时按倍数扩容
+        """
+        self.capacity = capacity
+        self.instrument_ids: list[str] = []
+        self.ordinals: Dict[str, int] = {}
+        self.columns: Dict[str, np.ndarray] = {
+            name: np.zeros(capacity, dtype=dtype) for name, dtype in self.COLUMNS.items()
+        }
+        self.lock = threading.Lock()
+
+    def get_ordinal(self, instrument_id: str) -> int:
+        """获取合约序号，新合约分配下一个序号"""
+        ordinal = self.ordinals.get(instrument_id)
+        if ordinal is not None:
+            return ordinal
+        with self.lock:
+            ordinal = self.ordinals.get(instrument_id)
+            if ordinal is None:
+                ordinal = len(self.instrument_ids)
+                if ordinal >= self.capacity:
+                    self._grow(self.capacity * 2)
+                self.instrument_ids.append(instrument_id)
+                self.ordinals[instrument_id] = ordinal
+            return ordinal
+
+    def update(self, quote: Quote):
+        """按合约序号原地写入一笔行情"""
+        ordinal = self.get_ordinal(quote.instrument_id)
+        columns = self.columns
+        columns['lastPrice'][ordinal] = quote.last_price
+        columns['change'][ordinal] = quote.change
+        columns['changePercent'][ordinal] = quote.change_percent
+        columns['volume'][ordinal] = quote.volume
+        columns['ts'][ordinal] = quote.ts
+
+    def clear(self, instrument_id: str):
+        """清除合约行情（序号保留），快照与查询中不再出现"""
+        ordinal = self.ordinals.get(instrument_id)
+        if ordinal is not None:
+            self.columns['ts'][ordinal] = 0
+
+    def snapshot(self) -> Dict[str, np.ndarray]:
+        """获取有行情的合约的列快照（数组拷贝）"""
+        with self.lock:
+            count = len(self.instrument_ids)
+            valid = np.flatnonzero(self.columns['ts'][:count])
+            snapshot = {name: column[valid] for name, column in self.columns.items()}
+            snapshot['instrumentId'] = np.array(self.instrument_ids, dtype=object)[valid]
+        return snapshot
+
+    def query(self, instrument_ids: Optional[Iterable[str]] = None, sort_by: Optional[str] = None,
+              descending: bool = True, limit: Optional[int] = None) -> list[dict]:
+        """
+        查询看板
+
+        Args:
+            instrument_ids: 只返回这些合约，默认全部
+            sort_by: 排序字段，取 COLUMNS 中的字段名
+            descending: 是否降序
+            limit: 返回条数上限
+        """
+        if sort_by is not None and sort_by not in self.COLUMNS:
+            raise ValueError(f"Unsupported sort field: {sort_by}")
+
+        with self.lock:
+            count = len(self.instrument_ids)
+            if instrument_ids is None:
+                rows = np.arange(count)
+            else:
+                rows = np.array([self.ordinals[i] for i in instrument_ids if i in self.ordinals], dtype=np.int64)
+            rows = rows[self.columns['ts'][rows] > 0]
+
+            if sort_by is not None:
+                order = np.argsort(self.columns[sort_by][rows], kind='stable')
+                if descending:
+                    order = order[::-1]
+                rows = rows[order]
+            if limit is not None:
+                rows = rows[:limit]
+
+            values = {name: self.columns[name][rows].tolist() for name in self.COLUMNS}
+            instrument_list = [self.instrument_ids[row] for row in rows.tolist()]
+
+        return [
+            {
+                'instrumentId': instrument_id,
+                'lastPrice': values['lastPrice'][i],
+                'change': values['change'][i],
+                'changePercent': values['changePercent'][i],
+                'volume': values['volume'][i],
+                'ts': values['ts'][i],
+            }
+            for i, instrument_id in enumerate(instrument_list)
+        ]
+
+    def __len__(self) -> int:
+        return len(self.instrument_ids)
+
+    def _grow(self, capacity: int):
+        """扩容全部列"""
+        for name, column in self.columns.items():
+            grown = np.zeros(capacity, dtype=column.dtype)
+            grown[:self.capacity] = column
+            self.columns[name] = grown
+        self.capacity = capacity
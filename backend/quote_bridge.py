@@ -0,0 +1,101 @@
+"""
+行情线程桥
+CTP回调运行在行情库自己的原生线程上，这里用有界队列把行情交给eventlet主循环，
+写入端只做内存操作，不会因为推送变慢而阻塞行情接收线程
+"""
+
+import threading
+from collections import deque
+from typing import Deque, Dict
+
+from quote import Quote
+
+
+class QuoteBridge:
+    """原生线程到eventlet主循环的有界行情队列
+
+    溢出策略：队列已满时，若同一合约还有未取走的行情，用新行情覆盖其中最新的一笔
+    （即丢弃该合约较旧的一笔）；否则丢弃队列中最旧的一笔行情。
+    """
+
+    def __init__(self, capacity: int = 10000):
+        """
+        初始化行情线程桥
+
+        Args:
+            capacity: 队列容量（笔）
+        """
+        self.capacity = capacity
+        # 队列元素为单元素列表，便于溢出时原地替换
+        self.queue: Deque[list] = deque()
+        self.latest_entries: Dict[str, list] = {}
+        self.lock = threading.Lock()
+
+        # 统计计数
+        self.put_count = 0
+        self.drained_count = 0
+        self.overflow_coalesced = 0
+        self.overflow_dropped = 0
+        self.high_watermark = 0
+
+    def put(self, quote: Quote) -> bool:
+        """
+        写入一笔行情（行情线程调用，不阻塞）
+
+        Returns:
+            是否作为新元素入队，发生溢出时为False
+        """
+        instrument_id = quote.instrument_id
+        with self.lock:
+            self.put_count += 1
+            if len(self.queue) >= self.capacity:
+                entry = self.latest_entries.get(instrument_id)
+                if entry is not None:
+                    entry[0] = quote
+                    self.overflow_coalesced += 1
+                    return False
+                oldest = self.queue.popleft()
+                self._forget(oldest)
+                self.overflow_dropped += 1
+                overflowed = True
+            else:
+                overflowed = False
+
+            entry = [quote]
+            self.queue.append(entry)
+            self.latest_entries[instrument_id] = entry
+            if len(self.queue) > self.high_watermark:
+                self.high_watermark = len(self.queue)
+            return not overflowed
+
+    def drain(self) -> list[Quote]:
+        """按到达顺序取出全部行情（主循环调用）"""
+        with self.lock:
+            entries = self.queue
+            self.queue = deque()
+            self.latest_entries = {}
+            self.drained_count += len(entries)
+        return [entry[0] for entry in entries]
+
+    def get_depth(self) -> int:
+        """当前队列深度"""
+        return len(self.queue)
+
+    def get_stats(self) -> dict:
+        """获取队列统计"""
+        with self.lock:
+            return {
+                "depth": len(self.queue),
+                "capacity": self.capacity,
+                "high_watermark": self.high_watermark,
+                "put": self.put_count,
+                "drained": self.drained_count,
+                "overflow_coalesced": self.overflow_coalesced,
+                "overflow_dropped": self.overflow_dropped,
+            }
+
+    def _forget(self, entry: list):
+        """出队元素若仍是该合约最新的一笔，移除其索引"""
+        instrument_id = entry[0].instrument_id
+        if self.latest_entries.get(instrument_id) is entry:
+            del self.latest_entries[instrument_id]
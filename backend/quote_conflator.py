@@ -0,0 +1,99 @@
+"""
+行情合并缓冲
+按合约只保留最新一笔行情，由推送线程按固定或自适应节奏批量取出
+"""
+
+import threading
+import time
+from typing import Dict
+
+from quote import Quote
+
+
+class QuoteConflator:
+    """最新值合并缓冲类"""
+
+    # 自适应模式下，低于该速率使用最短间隔，高于该速率使用最长间隔（笔/秒）
+    ADAPTIVE_LOW_RATE = 200.0
+    ADAPTIVE_HIGH_RATE = 5000.0
+
+    def __init__(self, interval_ms: int = 100, adaptive: bool = False,
+                 min_interval_ms: int = 50, max_interval_ms: int = 250):
+        """
+        初始化合并缓冲
+
+        Args:
+            interval_ms: 固定推送间隔（毫秒）
+            adaptive: 是否根据行情速率自适应调整推送间隔
+            min_interval_ms: 自适应模式的最短间隔（毫秒）
+            max_interval_ms: 自适应模式的最长间隔（毫秒）
+        """
+        self.interval_ms = interval_ms
+        self.adaptive = adaptive
+        self.min_interval_ms = min_interval_ms
+        self.max_interval_ms = max_interval_ms
+
+        self.pending: Dict[str, Quote] = {}
+        self.lock = threading.Lock()
+
+        # 统计计数
+        self.received_count = 0
+        self.emitted_count = 0
+        self.flush_count = 0
+        self._received_since_flush = 0
+        self._last_flush_time = time.monotonic()
+        self._current_interval_ms = float(interval_ms)
+
+    def offer(self, quote: Quote):
+        """放入一笔行情，同合约未推送的旧行情被覆盖"""
+        with self.lock:
+            self.pending[quote.instrument_id] = quote
+            self.received_count += 1
+            self._received_since_flush += 1
+
+    def drain(self) -> list[Quote]:
+        """取出全部待推送行情"""
+        now = time.monotonic()
+        with self.lock:
+            quotes = list(self.pending.values())
+            self.pending.clear()
+            received = self._received_since_flush
+            self._received_since_flush = 0
+            self.emitted_count += len(quotes)
+            self.flush_count += 1
+
+        elapsed = now - self._last_flush_time
+        self._last_flush_time = now
+        if self.adaptive:
+            self._current_interval_ms = self._adapt_interval(received, elapsed)
+        return quotes
+
+    def next_interval(self) -> float:
+        """距下一次推送的间隔（秒）"""
+        return self._current_interval_ms / 1000.0
+
+    def get_stats(self) -> dict:
+        """获取合并统计"""
+        with self.lock:
+            received = self.received_count
+            emitted = self.emitted_count
+            pending = len(self.pending)
+        return {
+            "received": received,
+            "emitted": emitted,
+            "conflated": received - emitted - pending,
+            "pending": pending,
+            "flushes": self.flush_count,
+            "interval_ms": round(self._current_interval_ms, 1),
+            "adaptive": self.adaptive,
+        }
+
+    def _adapt_interval(self, received: int, elapsed: float) -> float:
+        """按最近一个间隔的行情速率在最短与最长间隔之间线性插值"""
+        rate = received / elapsed if elapsed > 0 else 0.0
+        if rate <= self.ADAPTIVE_LOW_RATE:
+            return float(self.min_interval_ms)
+        if rate >= self.ADAPTIVE_HIGH_RATE:
+            return float(self.max_interval_ms)
+        ratio = (rate - self.ADAPTIVE_LOW_RATE) / (self.ADAPTIVE_HIGH_RATE - self.ADAPTIVE_LOW_RATE)
+        return self.min_interval_ms + (self.max_interval_ms - self.min_interval_ms) * ratio
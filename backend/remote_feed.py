@@ -0,0 +1,319 @@
+"""
+接入进程行情源
+拆分部署时Socket.IO工作进程通过本地Unix套接字从行情接入进程（ingest.py）接收行情，
+订阅、退订和扩展字段组转发给接入进程；接口与 MockCTPAPI 相同，行情回调运行在接收线程上。
+REST固定订阅由接入进程统一登记（pin/unpin），接入进程在订阅变化时把固定订阅和全部已订阅合约发给每个工作进程。
+与接入进程断开后自动重连，重连后重新发送全部订阅和固定订阅
+"""
+
+import threading
+import time
+from multiprocessing.connection import Connection
+from typing import Callable, Dict, Optional, Set
+
+from loguru import logger
+
+from ingest import connect_ingest, shutdown_connection, unpack_quote
+from log_sampler import LogSampler
+from metrics import metrics
+from quote import Quote, normalize_groups
+
+
+class RemoteFeedAPI:
+    """接入进程行情源类"""
+
+    def __init__(self, address: str, reconnect_seconds: float = 1.0):
+        """
+        初始化接入进程行情源
+
+        Args:
+            address: 接入进程的Unix套接字路径
+            reconnect_seconds: 断开后的重连间隔（秒）
+        """
+        self.address = address
+        self.reconnect_seconds = reconnect_seconds
+        self.is_connected = False
+        self.is_logged_in = False
+        self.subscribed_instruments: Set[str] = set()
+        self.quote_callbacks: list[Callable] = []
+        # 接入进程转发的上游连接状态变化回调 listener(event)
+        self.status_listeners: list[Callable] = []
+        # 集群范围的REST固定订阅和全部工作进程订阅的合约，变化时回调 listener(pinned)
+        self.pinned: Set[str] = set()
+        self.cluster_instruments: Set[str] = set()
+        self.pinned_listeners: list[Callable] = []
+        # 固定订阅请求号 -> 接入进程的回复（实际变化的合约）
+        self.replies: Dict[int, list] = {}
+        self.next_request_id = 1
+        # 行情回调出错时按类别限速输出日志
+        self.error_log = LogSampler()
+        self.parse_groups: tuple = ()
+
+        # 行情数据缓存和订阅回报
+        self.last_quotes: Dict[str, Quote] = {}
+        self.sub_status: Dict[str, dict] = {}
+        self.lock = threading.Lock()
+        # 接收线程和主循环都会发送，发送需要互斥
+        self.send_lock = threading.Lock()
+
+        self.conn: Optional[Connection] = None
+        self.reader_thread = None
+        self.stop_reader = False
+        # 接入进程报告的行情源状态
+        self.feed_info: dict = {}
+        self.received_count = 0
+        self.reconnect_count = 0
+
+    def add_quote_callback(self, callback: Callable):
+        """添加行情回调函数"""
+        self.quote_callbacks.append(callback)
+        logger.info(f"Added quote callback, total callbacks: {len(self.quote_callbacks)}")
+
+    def remove_quote_callback(self, callback: Callable):
+        """移除行情回调函数"""
+        if callback in self.quote_callbacks:
+            self.quote_callbacks.remove(callback)
+            logger.info(f"Removed quote callback, total callbacks: {len(self.quote_callbacks)}")
+
+    def add_status_listener(self, listener: Callable):
+        """添加上游连接状态变化回调（在接收线程上调用）"""
+        self.status_listeners.append(listener)
+
+    def add_pinned_listener(self, listener: Callable):
+        """添加集群固定订阅变化回调（在接收线程上调用）"""
+        self.pinned_listeners.append(listener)
+
+    def pin(self, instruments: list[str]) -> Optional[int]:
+        """请求接入进程固定订阅合约，返回请求号（用 get_reply 取回复），未连接时返回 None"""
+        return self._request('pin', instruments)
+
+    def unpin(self, instruments: list[str]) -> Optional[int]:
+        """请求接入进程释放固定订阅，返回请求号，未连接时返回 None"""
+        return self._request('unpin', instruments)
+
+    def get_reply(self, request_id: int) -> Optional[list]:
+        """取出固定订阅请求的回复（实际变化的合约），尚未收到时返回 None"""
+        with self.lock:
+            return self.replies.pop(request_id, None)
+
+    def get_pinned(self) -> Set[str]:
+        """获取集群范围的REST固定订阅"""
+        with self.lock:
+            return self.pinned.copy()
+
+    def get_cluster_instruments(self) -> Set[str]:
+        """获取全部工作进程和固定订阅引用的合约"""
+        with self.lock:
+            return self.cluster_instruments.copy()
+
+    def connect(self) -> bool:
+        """连接接入进程（最多等待10秒），启动接收线程"""
+        try:
+            logger.info(f"Connecting to ingest process: {self.address}")
+            self.conn = connect_ingest(self.address, timeout=10)
+            self.is_connected = True
+            self.stop_reader = False
+            self.reader_thread = threading.Thread(target=self._read_loop, name='remote-feed', daemon=True)
+            self.reader_thread.start()
+            logger.info("Connected to ingest process")
+            return True
+        except Exception as e:
+            logger.error(f"Failed to connect to ingest process: {e}")
+            return False
+
+    def login(self) -> bool:
+        """接入进程负责登录CTP，这里只确认连接"""
+        self.is_logged_in = self.is_connected
+        return self.is_logged_in
+
+    def subscribe_market_data(self, instruments: list[str]) -> bool:
+        """订阅行情数据（转发给接入进程，回报异步到达）"""
+        if not instruments:
+            return True
+        with self.lock:
+            self.subscribed_instruments.update(instruments)
+            for instrument in instruments:
+                self.sub_status[instrument] = {"status": 'pending'}
+        logger.info(f"Forwarding subscribe to ingest: {len(instruments)} instruments")
+        return self._send('subscribe', list(instruments))
+
+    def unsubscribe_market_data(self, instruments: list[str]) -> bool:
+        """取消订阅行情数据"""
+        if not instruments:
+            return True
+        with self.lock:
+            self.subscribed_instruments.difference_update(instruments)
+            for instrument in instruments:
+                self.sub_status.pop(instrument, None)
+                self.last_quotes.pop(instrument, None)
+        logger.info(f"Forwarding unsubscribe to ingest: {len(instruments)} instruments")
+        return self._send('unsubscribe', list(instruments))
+
+    def set_parse_groups(self, groups):
+        """设置需要解析的扩展字段组（由接入进程合并全部工作进程的需要）"""
+        self.parse_groups = normalize_groups(groups)
+        self._send('parse_groups', self.parse_groups)
+
+    def get_subscription_status(self, instruments: list[str]) -> Dict[str, dict]:
+        """获取合约的订阅状态（接入进程转发的回报）"""
+        with self.lock:
+            return {
+                instrument: self.sub_status.get(instrument, {"status": 'unsubscribed'})
+                for instrument in instruments
+            }
+
+    def get_subscribed_instruments(self) -> Set[str]:
+        """获取已订阅的合约列表"""
+        with self.lock:
+            return self.subscribed_instruments.copy()
+
+    def get_last_quote(self, instrument_id: str) -> Optional[Quote]:
+        """获取指定合约的最新行情"""
+        with self.lock:
+            return self.last_quotes.get(instrument_id)
+
+    def get_all_quotes(self) -> Dict[str, Quote]:
+        """获取所有合约的最新行情"""
+        with self.lock:
+            return self.last_quotes.copy()
+
+    def get_stats(self) -> dict:
+        """获取接收统计"""
+        return {
+            "address": self.address,
+            "received": self.received_count,
+            "reconnects": self.reconnect_count,
+            "feed": self.feed_info,
+        }
+
+    def disconnect(self):
+        """断开与接入进程的连接"""
+        self.stop_reader = True
+        conn = self.conn
+        if conn is not None:
+            # 先唤醒阻塞在 recv 的读线程，再关闭连接
+            shutdown_connection(conn)
+        if self.reader_thread and self.reader_thread.is_alive():
+            self.reader_thread.join(timeout=2)
+        self._close()
+        self.is_logged_in = False
+        logger.info("Disconnected from ingest process")
+
+    def _send(self, command: str, payload) -> bool:
+        """向接入进程发送命令，未连接时由重连后的重新订阅补发"""
+        conn = self.conn
+        if conn is None:
+            return False
+        try:
+            with self.send_lock:
+                conn.send((command, payload))
+            return True
+        except (OSError, ValueError) as e:
+            logger.warning(f"Failed to send {command} to ingest process: {e}")
+            return False
+
+    def _request(self, command: str, instruments: list[str]) -> Optional[int]:
+        with self.lock:
+            request_id = self.next_request_id
+            self.next_request_id += 1
+        return request_id if self._send(command, (request_id, list(instruments))) else None
+
+    def _close(self):
+        conn, self.conn = self.conn, None
+        self.is_connected = False
+        if conn is not None:
+            try:
+                conn.close()
+            except OSError:
+                pass
+
+    def _read_loop(self):
+        """接收行情和回报，断开后重连"""
+        while not self.stop_reader:
+            conn = self.conn
+            if conn is None:
+                self._reconnect()
+                continue
+            try:
+                message, payload = conn.recv()
+            except (EOFError, OSError, TypeError):
+                # TypeError：disconnect() 在接收过程中关闭了连接
+                if not self.stop_reader:
+                    logger.warning("Lost connection to ingest process, reconnecting")
+                    self._close()
+                continue
+            if message == 'quotes':
+                self._on_quotes(payload)
+            elif message == 'status':
+                with self.lock:
+                    for instrument, status in payload.items():
+                        if instrument in self.subscribed_instruments:
+                            self.sub_status[instrument] = status
+            elif message == 'feed':
+                self.feed_info = payload
+            elif message == 'subscriptions':
+                pinned = set(payload["pinned"])
+                with self.lock:
+                    self.pinned = pinned
+                    self.cluster_instruments = set(payload["instruments"])
+                for listener in self.pinned_listeners:
+                    try:
+                        listener(pinned)
+                    except Exception as e:
+                        logger.error(f"Error in pinned listener: {e}")
+            elif message == 'reply':
+                request_id, changed = payload
+                if request_id:
+                    with self.lock:
+                        self.replies[request_id] = changed
+            elif message == 'state':
+                for listener in self.status_listeners:
+                    try:
+                        listener(payload)
+                    except Exception as e:
+                        logger.error(f"Error in feed state listener: {e}")
+
+    def _reconnect(self):
+        """重连接入进程并重新发送全部订阅和扩展字段组"""
+        time.sleep(self.reconnect_seconds)
+        try:
+            conn = connect_ingest(self.address)
+        except Exception:
+            return
+        with self.lock:
+            instruments = sorted(self.subscribed_instruments)
+            for instrument in instruments:
+                self.sub_status[instrument] = {"status": 'pending'}
+            pinned = sorted(self.pinned)
+        self.conn = conn
+        self.is_connected = True
+        self.reconnect_count += 1
+        if self.parse_groups:
+            self._send('parse_groups', self.parse_groups)
+        if instruments:
+            self._send('subscribe', instruments)
+        if pinned:
+            # 接入进程重启后由工作进程恢复固定订阅（请求号0不需要回复）
+            self._send('pin', (0, pinned))
+        logger.info(f"Reconnected to ingest process, resubscribed {len(instruments)} instruments")
+
+    def _on_quotes(self, batch: list):
+        """一批行情：更新缓存并调用回调"""
+        with self.lock:
+            # 退订后仍在途的行情直接丢弃
+            quotes = [quote for quote in map(unpack_quote, batch)
+                      if quote.instrument_id in self.subscribed_instruments]
+            for quote in quotes:
+                self.last_quotes[quote.instrument_id] = quote
+        self.received_count += len(quotes)
+
+        for quote in quotes:
+            callback_ns = time.perf_counter_ns()
+            for callback in self.quote_callbacks:
+                try:
+                    callback(quote)
+                except Exception as e:
+                    metrics.count_error('callback')
+                    if self.error_log.allow('callback'):
+                        logger.error(f"Error in remote quote callback: {e}")
+            metrics.record('callback', time.perf_counter_ns() - callback_ns)
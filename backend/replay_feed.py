@@ -0,0 +1,220 @@
+"""
+行情回放数据源
+从逐笔行情日志读取录制的行情，按原始时间间隔以1倍、N倍或不限速回放，
+接口与 MockCTPAPI / CTPMarketDataAPI 相同，用于离线重现真实行情的突发流量
+"""
+
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Dict, Iterator, Optional, Set
+
+from loguru import logger
+
+from log_sampler import LogSampler
+from metrics import metrics
+from quote import Quote
+from tick_journal import iter_quotes, list_segments
+
+
+class ReplayCTPAPI:
+    """行情回放API类"""
+
+    # 录制中相邻两笔的间隔超过该值（午休、夜盘切换、跨日）时直接跳过空档
+    MAX_GAP_MS = 60_000
+
+    def __init__(self, path: str, speed: float = 1.0, loop: bool = False):
+        """
+        初始化行情回放
+
+        Args:
+            path: 日志文件，或包含多个日志文件的目录（按日期顺序回放）
+            speed: 回放倍速，1为原速，0为不限速
+            loop: 回放结束后是否从头开始
+        """
+        self.path = path
+        self.speed = speed
+        self.loop = loop
+
+        self.is_connected = False
+        self.is_logged_in = False
+        self.subscribed_instruments: Set[str] = set()
+        self.quote_callbacks: list[Callable] = []
+        # 行情回调出错时按类别限速输出日志
+        self.error_log = LogSampler()
+
+        # 行情数据缓存
+        self.last_quotes: Dict[str, Quote] = {}
+        self.lock = threading.Lock()
+
+        # 回放线程
+        self.replay_thread = None
+        self.stop_replay = False
+        self.replayed_count = 0
+        self.skipped_count = 0
+
+        logger.info(f"Replay CTP API initialized: {path}, speed: {speed or 'max'}")
+
+    def add_quote_callback(self, callback: Callable):
+        """添加行情回调函数"""
+        self.quote_callbacks.append(callback)
+        logger.info(f"Added quote callback, total callbacks: {len(self.quote_callbacks)}")
+
+    def remove_quote_callback(self, callback: Callable):
+        """移除行情回调函数"""
+        if callback in self.quote_callbacks:
+            self.quote_callbacks.remove(callback)
+            logger.info(f"Removed quote callback, total callbacks: {len(self.quote_callbacks)}")
+
+    def connect(self) -> bool:
+        """打开录制文件并开始回放"""
+        try:
+            segments = self._get_segments()
+            if not segments:
+                logger.error(f"No tick journal segments found: {self.path}")
+                return False
+            logger.info(f"Replaying {len(segments)} journal segments from {self.path}")
+            self.is_connected = True
+
+            self.stop_replay = False
+            self.replay_thread = threading.Thread(target=self._replay, args=(segments,), daemon=True)
+            self.replay_thread.start()
+            return True
+        except Exception as e:
+            logger.error(f"Failed to start replay: {e}")
+            return False
+
+    def login(self) -> bool:
+        """回放无需登录"""
+        self.is_logged_in = True
+        return True
+
+    def subscribe_market_data(self, instruments: list[str]) -> bool:
+        """订阅行情数据，只回放已订阅合约的行情"""
+        if not instruments:
+            return True
+        logger.info(f"Subscribing to replay market data: {instruments}")
+        with self.lock:
+            self.subscribed_instruments.update(instruments)
+        return True
+
+    def unsubscribe_market_data(self, instruments: list[str]) -> bool:
+        """取消订阅行情数据"""
+        if not instruments:
+            return True
+        logger.info(f"Unsubscribing from replay market data: {instruments}")
+        with self.lock:
+            for instrument in instruments:
+                self.subscribed_instruments.discard(instrument)
+                self.last_quotes.pop(instrument, None)
+        return True
+
+    def set_parse_groups(self, groups):
+        """录制的行情只有基础字段，扩展字段推送为 None"""
+        if groups:
+            logger.warning("Replayed ticks carry base fields only, extra field groups will be empty")
+
+    def get_subscription_status(self, instruments: list[str]) -> Dict[str, dict]:
+        """获取合约的订阅状态，回放数据源订阅立即生效"""
+        with self.lock:
+            return {
+                instrument: {"status": 'subscribed' if instrument in self.subscribed_instruments else 'unsubscribed'}
+                for instrument in instruments
+            }
+
+    def get_subscribed_instruments(self) -> Set[str]:
+        """获取已订阅的合约列表"""
+        with self.lock:
+            return self.subscribed_instruments.copy()
+
+    def get_last_quote(self, instrument_id: str) -> Optional[Quote]:
+        """获取指定合约的最新行情"""
+        with self.lock:
+            return self.last_quotes.get(instrument_id)
+
+    def get_all_quotes(self) -> Dict[str, Quote]:
+        """获取所有合约的最新行情"""
+        with self.lock:
+            return self.last_quotes.copy()
+
+    def get_stats(self) -> dict:
+        """获取回放统计"""
+        return {
+            "replayed": self.replayed_count,
+            "skipped": self.skipped_count,
+            "speed": self.speed,
+        }
+
+    def _get_segments(self) -> list[Path]:
+        path = Path(self.path)
+        if path.is_dir():
+            return list_segments(str(path))
+        return [path] if path.exists() else []
+
+    def _iter_recorded(self, segments: list[Path]) -> Iterator[Quote]:
+        while True:
+            for segment in segments:
+                yield from iter_quotes(segment)
+            if not self.loop:
+                return
+            logger.info("Replay reached the end, restarting")
+
+    def _replay(self, segments: list[Path]):
+        """按录制时间间隔回放行情"""
+        logger.info("Starting market data replay")
+        first_ts = None
+        prev_ts = None
+        wall_start = 0.0
+
+        for recorded in self._iter_recorded(segments):
+            if self.stop_replay:
+                break
+
+            # 回放开始、时间倒退（循环）或遇到长空档时重新对齐时钟
+            if prev_ts is None or recorded.ts < prev_ts or recorded.ts - prev_ts > self.MAX_GAP_MS:
+                first_ts = recorded.ts
+                wall_start = time.monotonic()
+            prev_ts = recorded.ts
+
+            if self.speed > 0:
+                due = wall_start + (recorded.ts - first_ts) / 1000.0 / self.speed
+                delay = due - time.monotonic()
+                if delay > 0.001:
+                    time.sleep(delay)
+
+            with self.lock:
+                subscribed = recorded.instrument_id in self.subscribed_instruments
+            if not subscribed:
+                self.skipped_count += 1
+                continue
+
+            # 以回放时刻作为行情时间戳，保留原始 updateTime
+            recorded.ts = int(time.time() * 1000)
+            recorded.recv_ns = time.perf_counter_ns()
+            with self.lock:
+                self.last_quotes[recorded.instrument_id] = recorded
+            self.replayed_count += 1
+
+            for callback in self.quote_callbacks:
+                try:
+                    callback(recorded)
+                except Exception as e:
+                    metrics.count_error('callback')
+                    if self.error_log.allow('callback'):
+                        logger.error(f"Error in replay quote callback: {e}")
+            metrics.record('callback', time.perf_counter_ns() - recorded.recv_ns)
+
+        self.is_connected = False
+        logger.info(f"Market data replay stopped, replayed {self.replayed_count} ticks")
+
+    def disconnect(self):
+        """停止回放"""
+        try:
+            logger.info("Stopping market data replay")
+            self.stop_replay = True
+            if self.replay_thread and self.replay_thread.is_alive():
+                self.replay_thread.join(timeout=2)
+            self.is_connected = False
+            self.is_logged_in = False
+        except Exception as e:
+            logger.error(f"Error stopping market data replay: {e}")
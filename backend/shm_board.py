@@ -0,0 +1,395 @@
+"""
+共享内存行情表
+行情源把每个合约的最新一笔行情写入 multiprocessing.shared_memory 共享内存段，同一主机上的其他进程
+（风控、策略、REST工作进程）按名称挂载后直接读取，不经过Socket.IO，也不需要服务进程配合。
+
+共享内存段格式：64字节段头 + capacity 个定长记录
+    段头：见 HEADER_DTYPE，count 为已分配的记录数（合约按首次出现顺序占用记录，不回收）
+    记录：见 RECORD_DTYPE，扩展字段未解析时价格为 NaN、数量为 0
+
+每个记录有一个序号（seqlock）：写入前加一为奇数，写完再加一为偶数。读者在复制记录前后读取序号，
+两次相同且为偶数才说明读到的是完整的一笔，否则重试。只有一个写入者（行情回调线程），读者从不加锁。
+写入顺序依赖 x86 的存储顺序（TSO），Python 无法插入内存屏障，ARM 等弱内存序平台上不保证一致。
+
+写入端用预编译的 struct 把一笔行情整段写入共享内存（不创建结构化标量），序号按8字节字直接读写；
+读取端单合约读取只复制一条记录的字节，整表快照为一次内存复制加向量化的序号比较。
+"""
+
+import os
+import struct
+import sys
+import threading
+import time
+from multiprocessing import shared_memory
+from typing import Dict, Optional
+
+import numpy as np
+from loguru import logger
+
+from quote import Quote
+
+MAGIC = b'CTPSHMB1'
+VERSION = 1
+HEADER_SIZE = 64
+
+HEADER_DTYPE = np.dtype([
+    ('magic', 'S8'),
+    ('version', '<u4'),
+    ('record_size', '<u4'),
+    ('capacity', '<u4'),
+    # 1 为写入者运行中，0 为已关闭（读者应重新挂载）
+    ('state', '<u4'),
+    ('count', '<u8'),
+    ('writer_pid', '<i8'),
+    ('created_ns', '<i8'),
+    ('pad', 'V16'),
+])
+assert HEADER_DTYPE.itemsize == HEADER_SIZE
+
+# 字段顺序保证8字节字段对齐；recv_ns 为行情源收到该笔的系统单调时钟（perf_counter_ns），同一主机上的进程间可比较
+RECORD_DTYPE = np.dtype([
+    ('seq', '<u8'),
+    ('ts', '<i8'),
+    ('recv_ns', '<i8'),
+    ('last_price', '<f8'),
+    ('change', '<f8'),
+    ('change_percent', '<f8'),
+    ('volume', '<i8'),
+    ('bid_price1', '<f8'),
+    ('bid_volume1', '<i8'),
+    ('ask_price1', '<f8'),
+    ('ask_volume1', '<i8'),
+    ('update_millisec', '<i4'),
+    ('update_time', 'S8'),
+    ('instrument_id', 'S32'),
+    ('pad', 'V12'),
+])
+RECORD_SIZE = RECORD_DTYPE.itemsize
+assert RECORD_SIZE == 144
+
+# 与 RECORD_DTYPE 相同布局的 struct：完整记录（读取端还原行情），以及 seq 之后到 update_time 的逐笔字段
+# （写入端每笔写入；合约代码在分配记录时写入）
+RECORD_STRUCT = struct.Struct('<Qqqdddqdqdqi8s32s12x')
+TICK_STRUCT = struct.Struct('<qqdddqdqdqi8s')
+assert RECORD_STRUCT.size == RECORD_SIZE
+assert TICK_STRUCT.size == RECORD_DTYPE.fields['instrument_id'][1] - 8
+# 段头和记录按8字节字计的长度（序号为每条记录的第一个字）
+HEADER_WORDS = HEADER_SIZE // 8
+RECORD_WORDS = RECORD_SIZE // 8
+
+STATE_CLOSED = 0
+STATE_LIVE = 1
+
+# 读者挂载时临时替换 resource_tracker.register，需要互斥
+_attach_lock = threading.Lock()
+# 读到写入中的记录时让出CPU：写入端在写入中途被调度出去时（单核或超额订阅），空转等不到它写完
+_yield = getattr(os, 'sched_yield', None) or (lambda: time.sleep(0))
+
+
+def segment_size(capacity: int) -> int:
+    """容量对应的共享内存段字节数"""
+    return HEADER_SIZE + capacity * RECORD_SIZE
+
+
+def record_to_quote(record: np.void) -> Quote:
+    """把一条记录还原为行情（一档盘口放入 extra）"""
+    return _fields_to_quote(record.item()[:-1])
+
+
+def _fields_to_quote(fields: tuple) -> Quote:
+    """按 RECORD_STRUCT 的字段顺序还原行情"""
+    (_, ts, recv_ns, last_price, change, change_percent, volume, bid_price, bid_volume,
+     ask_price, ask_volume, update_millisec, update_time, instrument_id) = fields
+    extra = None
+    if bid_price == bid_price:
+        extra = {'bidPrice1': bid_price, 'bidVolume1': bid_volume, 'askPrice1': ask_price, 'askVolume1': ask_volume}
+    return Quote(instrument_id.rstrip(b'\0').decode(), last_price, change, change_percent, volume,
+                 update_time.rstrip(b'\0').decode(), update_millisec, ts, extra=extra, recv_ns=recv_ns)
+
+
+def _map_segment(shm: shared_memory.SharedMemory, capacity: int) -> tuple[np.ndarray, np.ndarray]:
+    """共享内存段上的段头和记录数组视图（不复制）"""
+    header = np.ndarray((), dtype=HEADER_DTYPE, buffer=shm.buf)
+    records = np.ndarray((capacity,), dtype=RECORD_DTYPE, buffer=shm.buf, offset=HEADER_SIZE)
+    return header, records
+
+
+def _attach(name: str) -> shared_memory.SharedMemory:
+    """
+    挂载已有的共享内存段，不登记到 resource_tracker
+
+    3.13 之前挂载也会登记，读者进程退出时 resource_tracker 会删除写入端的共享内存段；
+    事后注销又会和同一进程树中写入端的登记冲突，所以挂载期间临时跳过登记
+    """
+    if sys.version_info >= (3, 13):
+        return shared_memory.SharedMemory(name=name, track=False)
+    with _attach_lock:
+        register = shared_memory.resource_tracker.register
+        shared_memory.resource_tracker.register = lambda *args: None
+        try:
+            return shared_memory.SharedMemory(name=name)
+        finally:
+            shared_memory.resource_tracker.register = register
+
+
+
+class SharedQuoteBoard:
+    """共享内存行情表（写入端）"""
+
+    def __init__(self, name: str, capacity: int = 4096):
+        """
+        初始化共享内存行情表
+
+        Args:
+            name: 共享内存段名称（Linux下为 /dev/shm/<name>）
+            capacity: 合约容量，写满后新合约不再写入
+        """
+        self.name = name
+        self.capacity = capacity
+        self.shm: Optional[shared_memory.SharedMemory] = None
+        self.header: Optional[np.ndarray] = None
+        self.records: Optional[np.ndarray] = None
+        # 共享内存段按8字节字的视图（读写序号）
+        self.words: Optional[memoryview] = None
+        # 合约 -> 记录序号
+        self.slots: Dict[str, int] = {}
+        # 行情回调线程写入，重启行情源时可能换线程，写入需要互斥以保持单写者
+        self.lock = threading.Lock()
+        self.written_count = 0
+        self.dropped_count = 0
+
+    def start(self):
+        """创建共享内存段；上次未正常关闭留下的同名段先删除"""
+        size = segment_size(self.capacity)
+        try:
+            self.shm = shared_memory.SharedMemory(name=self.name, create=True, size=size)
+        except FileExistsError:
+            stale = shared_memory.SharedMemory(name=self.name)
+            stale.close()
+            stale.unlink()
+            logger.warning(f"Removed stale shared quote board: {self.name}")
+            self.shm = shared_memory.SharedMemory(name=self.name, create=True, size=size)
+
+        self.header, self.records = _map_segment(self.shm, self.capacity)
+        self.words = self.shm.buf.cast('Q')
+        self.records[:] = np.zeros((), dtype=RECORD_DTYPE)
+        header = self.header
+        header['magic'] = MAGIC
+        header['version'] = VERSION
+        header['record_size'] = RECORD_SIZE
+        header['capacity'] = self.capacity
+        header['count'] = 0
+        header['writer_pid'] = os.getpid()
+        header['created_ns'] = time.time_ns()
+        header['state'] = STATE_LIVE
+        logger.info(f"Shared quote board started: {self.name}, {self.capacity} instruments, {size} bytes")
+
+    def update(self, quote: Quote):
+        """写入一笔行情（行情回调）"""
+        if self.records is None:
+            return
+        with self.lock:
+            slot = self.slots.get(quote.instrument_id)
+            if slot is None:
+                slot = self._allocate(quote.instrument_id)
+                if slot is None:
+                    return
+
+            extra = quote.extra
+            if extra is not None and 'bidPrice1' in extra:
+                bid_price, bid_volume = extra['bidPrice1'], extra['bidVolume1']
+                ask_price, ask_volume = extra['askPrice1'], extra['askVolume1']
+            else:
+                bid_price, bid_volume, ask_price, ask_volume = np.nan, 0, np.nan, 0
+
+            words = self.words
+            word = HEADER_WORDS + slot * RECORD_WORDS
+            seq = words[word] + 1
+            # 序号为奇数期间读者会重试
+            words[word] = seq
+            TICK_STRUCT.pack_into(
+                self.shm.buf, HEADER_SIZE + slot * RECORD_SIZE + 8,
+                quote.ts, quote.recv_ns, quote.last_price, quote.change, quote.change_percent,
+                quote.volume, bid_price, bid_volume, ask_price, ask_volume, quote.update_millisec,
+                quote.update_time.encode()
+            )
+            words[word] = seq + 1
+            self.written_count += 1
+
+    def get_stats(self) -> dict:
+        """获取写入统计"""
+        return {
+            "name": self.name,
+            "capacity": self.capacity,
+            "instruments": len(self.slots),
+            "written": self.written_count,
+            "dropped": self.dropped_count,
+        }
+
+    def close(self):
+        """标记为已关闭并删除共享内存段（已挂载的读者仍可读取最后的数据）"""
+        if self.shm is None:
+            return
+        with self.lock:
+            self.header['state'] = STATE_CLOSED
+            self.header = self.records = None
+            self.words.release()
+            self.words = None
+            self.shm.close()
+            self.shm.unlink()
+            self.shm = None
+        logger.info(f"Shared quote board closed: {self.name}")
+
+    def _allocate(self, instrument_id: str) -> Optional[int]:
+        """为新合约分配记录：先写合约代码，再增加段头的记录数（调用方持有锁）"""
+        slot = len(self.slots)
+        if slot >= self.capacity:
+            if self.dropped_count == 0:
+                logger.warning(f"Shared quote board full ({self.capacity}), dropping new instruments")
+            self.dropped_count += 1
+            return None
+        self.records['instrument_id'][slot] = instrument_id.encode()
+        self.slots[instrument_id] = slot
+        self.header['count'] = slot + 1
+        return slot
+
+
+class SharedQuoteBoardReader:
+    """共享内存行情表（读取端），可在任何本机进程中使用"""
+
+    def __init__(self, name: str, retries: int = 1000):
+        """
+        挂载共享内存行情表
+
+        Args:
+            name: 共享内存段名称（与写入端的 SHM_BOARD_NAME 相同）
+            retries: 一条记录正在写入时的最大重试次数
+        """
+        self.name = name
+        self.retries = retries
+        self.shm = _attach(name)
+
+        header = np.ndarray((), dtype=HEADER_DTYPE, buffer=self.shm.buf)
+        if header['magic'] != MAGIC or header['version'] != VERSION or header['record_size'] != RECORD_SIZE:
+            del header
+            self.shm.close()
+            raise ValueError(f"Not a shared quote board or incompatible version: {name}")
+        self.capacity = int(header['capacity'])
+        del header
+        self.header, self._records = _map_segment(self.shm, self.capacity)
+        self._seqs = self._records['seq']
+        self._words = self.shm.buf.cast('Q')
+        # 按字节复制记录（结构化类型逐字段复制慢一个数量级）
+        self._raw = np.ndarray((self.capacity, RECORD_SIZE), dtype=np.uint8, buffer=self.shm.buf, offset=HEADER_SIZE)
+        # 合约 -> 记录序号（按段头记录数增量更新）
+        self.slots: Dict[str, int] = {}
+        self.retry_count = 0
+
+    @property
+    def count(self) -> int:
+        """已分配的记录数"""
+        return int(self.header['count'])
+
+    @property
+    def alive(self) -> bool:
+        """写入端是否仍在运行（写入端重启后需要重新挂载）"""
+        return int(self.header['state']) == STATE_LIVE
+
+    @property
+    def records(self) -> np.ndarray:
+        """全部已分配记录的只读视图（不复制、不校验序号，适合对一致性要求不高的整表扫描）"""
+        view = self._records[:self.count]
+        view.flags.writeable = False
+        return view
+
+    def get_slot(self, instrument_id: str) -> Optional[int]:
+        """合约的记录序号，尚未出现过的合约为 None"""
+        slot = self.slots.get(instrument_id)
+        if slot is None:
+            self._refresh_slots()
+            slot = self.slots.get(instrument_id)
+        return slot
+
+    def read(self, instrument_id: str) -> Optional[np.void]:
+        """一致地读取合约的最新一笔（复制一条记录），没有行情时为 None"""
+        slot = self.get_slot(instrument_id)
+        if slot is None:
+            return None
+        row = self._read_row(slot)
+        if row is None:
+            return None
+        record = np.frombuffer(row, dtype=RECORD_DTYPE)[0]
+        return record if record['ts'] else None
+
+    def get_quote(self, instrument_id: str) -> Optional[Quote]:
+        """一致地读取合约的最新一笔并转换为行情（直接从字节还原，不经过NumPy）"""
+        slot = self.get_slot(instrument_id)
+        if slot is None:
+            return None
+        row = self._read_row(slot)
+        if row is None:
+            return None
+        fields = RECORD_STRUCT.unpack(row)
+        return _fields_to_quote(fields) if fields[1] else None
+
+    def snapshot(self) -> np.ndarray:
+        """
+        全部合约最新行情的一致快照（复制整表）
+
+        整表复制前后各读一次序号，只对复制期间被写入的记录单独重试；每条记录内部一致，记录之间不是同一时刻
+        """
+        count = self.count
+        seqs = self._seqs[:count]
+        before = seqs.copy()
+        rows = self._raw[:count].copy()
+        # ts 为记录的第二个字，没有行情的记录为 0
+        valid = rows.view('<i8')[:, 1] > 0
+        # 复制前序号为奇数（正在写入）或复制期间序号变化的记录单独重试
+        torn = np.flatnonzero((before ^ seqs) | (before & 1))
+        if torn.size:
+            for slot in torn.tolist():
+                row = self._read_row(slot)
+                if row is None:
+                    valid[slot] = False
+                else:
+                    rows[slot] = np.frombuffer(row, dtype=np.uint8)
+                    valid[slot] = RECORD_STRUCT.unpack_from(row)[1] > 0
+        if not valid.all():
+            # 按字节筛选，结构化数组的布尔索引逐字段复制
+            rows = rows[valid]
+        return rows.view(RECORD_DTYPE)[:, 0]
+
+    def close(self):
+        """卸载共享内存段（不删除）"""
+        if self.shm is None:
+            return
+        self.header = self._records = self._seqs = self._raw = None
+        self._words.release()
+        self._words = None
+        self.shm.close()
+        self.shm = None
+
+    def _read_row(self, slot: int) -> Optional[bytes]:
+        """按序号协议复制一条记录的字节，写入端长时间停在写入中（已退出）时为 None"""
+        words = self._words
+        word = HEADER_WORDS + slot * RECORD_WORDS
+        offset = HEADER_SIZE + slot * RECORD_SIZE
+        for _ in range(self.retries):
+            before = words[word]
+            if not before & 1:
+                row = self.shm.buf[offset:offset + RECORD_SIZE].tobytes()
+                if words[word] == before:
+                    return row
+            else:
+                _yield()
+            self.retry_count += 1
+        return None
+
+    def _refresh_slots(self):
+        """读取新分配记录的合约代码"""
+        known = len(self.slots)
+        count = self.count
+        if count > known:
+            ids = self._records['instrument_id'][known:count].tolist()
+            for offset, instrument_id in enumerate(ids):
+                self.slots[instrument_id.decode()] = known + offset
@@ -0,0 +1,121 @@
+"""
+订阅引用计数
+按持有者（Socket.IO会话、REST固定订阅）统计每个合约的引用数，
+最后一个持有者释放后经过宽限期才向行情源取消订阅，宽限期内重新订阅不会产生上游请求
+"""
+
+import threading
+import time
+from typing import Dict, Optional
+
+# REST接口的订阅视为一个常驻持有者，直到显式取消订阅
+PINNED_HOLDER = 'rest'
+
+
+class SubscriptionManager:
+    """订阅引用计数类"""
+
+    def __init__(self, grace_seconds: float = 30.0):
+        """
+        初始化订阅引用计数
+
+        Args:
+            grace_seconds: 合约失去全部持有者后保留上游订阅的时间（秒）
+        """
+        self.grace_seconds = grace_seconds
+
+        # 持有者 -> 合约 -> 引用次数（同一会话可同时通过行情和K线持有一个合约）
+        self.holds: Dict[str, Dict[str, int]] = {}
+        # 合约 -> 持有者数量
+        self.ref_counts: Dict[str, int] = {}
+        # 等待取消订阅的合约 -> 到期时间（monotonic）
+        self.expiring: Dict[str, float] = {}
+        self.lock = threading.Lock()
+
+        # 统计计数
+        self.released_count = 0
+        self.revived_count = 0
+
+    def acquire(self, holder: str, instrument_ids: list[str]):
+        """持有者引用合约，宽限期内的合约取消到期"""
+        with self.lock:
+            holds = self.holds.setdefault(holder, {})
+            for instrument_id in instrument_ids:
+                count = holds.get(instrument_id, 0)
+                holds[instrument_id] = count + 1
+                if count == 0:
+                    self.ref_counts[instrument_id] = self.ref_counts.get(instrument_id, 0) + 1
+                    if self.expiring.pop(instrument_id, None) is not None:
+                        self.revived_count += 1
+
+    def release(self, holder: str, instrument_ids: list[str]) -> list[str]:
+        """持有者释放合约，返回失去全部持有者、进入宽限期的合约"""
+        with self.lock:
+            holds = self.holds.get(holder)
+            if not holds:
+                return []
+            expiring = []
+            for instrument_id in instrument_ids:
+                count = holds.get(instrument_id, 0)
+                if count > 1:
+                    holds[instrument_id] = count - 1
+                elif count == 1:
+                    del holds[instrument_id]
+                    if self._unref(instrument_id):
+                        expiring.append(instrument_id)
+            if not holds:
+                del self.holds[holder]
+            return expiring
+
+    def release_all(self, holder: str) -> list[str]:
+        """释放持有者的全部合约（会话断开），返回进入宽限期的合约"""
+        with self.lock:
+            holds = self.holds.pop(holder, {})
+            return [instrument_id for instrument_id in holds if self._unref(instrument_id)]
+
+    def is_held(self, holder: str, instrument_id: str) -> bool:
+        """持有者是否引用了合约"""
+        with self.lock:
+            return instrument_id in self.holds.get(holder, {})
+
+    def get_held(self, holder: str) -> list[str]:
+        """获取持有者引用的合约"""
+        with self.lock:
+            return list(self.holds.get(holder, {}))
+
+    def get_ref_count(self, instrument_id: str) -> int:
+        """获取合约的持有者数量"""
+        with self.lock:
+            return self.ref_counts.get(instrument_id, 0)
+
+    def reap(self, now: Optional[float] = None) -> list[str]:
+        """取出宽限期已到、应向行情源取消订阅的合约"""
+        now = time.monotonic() if now is None else now
+        with self.lock:
+            expired = [i for i, deadline in self.expiring.items() if deadline <= now]
+            for instrument_id in expired:
+                del self.expiring[instrument_id]
+            self.released_count += len(expired)
+            return expired
+
+    def get_stats(self) -> dict:
+        """获取引用计数统计"""
+        with self.lock:
+            return {
+                "held": len(self.ref_counts),
+                "holders": len(self.holds),
+                "expiring": len(self.expiring),
+                "released": self.released_count,
+                "revived": self.revived_count,
+                "grace_seconds": self.grace_seconds,
+            }
+
+    def _unref(self, instrument_id: str) -> bool:
+        """减少合约的持有者数量，归零时进入宽限期并返回 True（调用方持有锁）"""
+        count = self.ref_counts.get(instrument_id, 0) - 1
+        if count > 0:
+            self.ref_counts[instrument_id] = count
+            return False
+        self.ref_counts.pop(instrument_id, None)
+        self.expiring[instrument_id] = time.monotonic() + self.grace_seconds
+        return True
@@ -69,7 +69,7 @@ def test_ctp_connection():
             if quotes:
                 logger.success(f"✅ Received {len(quotes)} quotes")
                 for instrument, quote in quotes.items():
-                    logger.info(f"  {instrument}: {quote['lastPrice']} ({quote['change']:+.2f})")
+                    logger.info(f"  {instrument}: {quote.last_price} ({quote.change:+.2f})")
             else:
                 logger.warning("⚠️ No quotes received")
         else:
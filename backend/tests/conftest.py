@@ -0,0 +1,6 @@
+"""测试公共配置：模块都在 backend 目录下，按脚本方式导入"""
+
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
@@ -0,0 +1,114 @@
+"""
+模拟CTP前置会话
+接口与 CTPMarketDataAPI 相同，可设定连接登录耗时和订阅后首笔行情耗时，可主动断开（drop）、
+停止推送（frozen）或在 down 集合中时连接不上，用于驱动 FrontManager 的测试和 benchmarks/bench_failover.py
+"""
+
+import threading
+import time
+from typing import Optional
+
+from quote import Quote
+
+
+class FakeFrontSession:
+    """模拟前置会话"""
+
+    def __init__(self, front_address: str, connect_delay: float, first_tick_delay: float,
+                 down: Optional[set] = None, tick_seconds: float = 0.02):
+        """
+        初始化模拟前置会话
+
+        Args:
+            front_address: 前置地址
+            connect_delay: 连接登录耗时（秒），连接和登录各占一半
+            first_tick_delay: 第一次订阅后首笔行情的耗时（秒）
+            down: 不可用的前置地址集合（共享，地址在集合中时一直连接不上）
+            tick_seconds: 推送间隔（秒），每次推送全部已订阅合约各一笔
+        """
+        self.front_address = front_address
+        self.connect_delay = connect_delay
+        self.first_tick_delay = first_tick_delay
+        self.down = down if down is not None else set()
+        self.tick_seconds = tick_seconds
+        self.is_connected = False
+        self.is_logged_in = False
+        self.subscribed_instruments: set[str] = set()
+        self.quote_callbacks = []
+        self.status_callbacks = []
+        # 停止推送（模拟行情停滞）
+        self.frozen = False
+        self.released = False
+        self.first_tick_at = 0.0
+        self.sequence = 0
+
+    def add_quote_callback(self, callback):
+        self.quote_callbacks.append(callback)
+
+    def add_status_callback(self, callback):
+        self.status_callbacks.append(callback)
+
+    def set_parse_groups(self, groups):
+        pass
+
+    def connect(self) -> bool:
+        threading.Thread(target=self._run, daemon=True).start()
+        return True
+
+    def subscribe_market_data(self, instruments: list[str]) -> bool:
+        if not self.subscribed_instruments:
+            self.first_tick_at = time.monotonic() + self.first_tick_delay
+        self.subscribed_instruments.update(instruments)
+        return True
+
+    def unsubscribe_market_data(self, instruments: list[str]) -> bool:
+        self.subscribed_instruments.difference_update(instruments)
+        return True
+
+    def get_subscription_status(self, instruments: list[str]) -> dict:
+        return {i: {"status": 'subscribed' if i in self.subscribed_instruments else 'unsubscribed'}
+                for i in instruments}
+
+    def drop(self):
+        """模拟 OnFrontDisconnected"""
+        self.is_connected = self.is_logged_in = False
+        self._notify('disconnected', 0x1001)
+
+    def disconnect(self):
+        self.released = True
+        self.is_connected = self.is_logged_in = False
+
+    def _notify(self, event: str, detail=None):
+        for callback in self.status_callbacks:
+            callback(event, detail)
+
+    def _run(self):
+        while self.front_address in self.down and not self.released:
+            time.sleep(0.01)
+        time.sleep(self.connect_delay / 2)
+        self.is_connected = True
+        self._notify('connected')
+        time.sleep(self.connect_delay / 2)
+        self.is_logged_in = True
+        self._notify('logged_in')
+        while not self.released:
+            time.sleep(self.tick_seconds)
+            if (not self.is_logged_in or self.frozen or not self.subscribed_instruments
+                    or time.monotonic() < self.first_tick_at):
+                continue
+            self.sequence += 1
+            for instrument_id in sorted(self.subscribed_instruments):
+                quote = Quote(instrument_id, 3500.0 + self.sequence % 10, 0.0, 0.0, self.sequence,
+                              ts=int(time.time() * 1000), recv_ns=time.perf_counter_ns())
+                for callback in self.quote_callbacks:
+                    callback(quote)
+
+
+def wait_for(condition, timeout: float) -> bool:
+    """等待条件成立，超时返回 False"""
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() >= deadline:
+            return False
+        time.sleep(0.01)
+    return True
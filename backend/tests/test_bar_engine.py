@@ -0,0 +1,107 @@
+"""K线聚合：OHLCV更新、周期切换、乱序行情和成交量增量"""
+
+import pytest
+
+from bar_engine import BarEngine
+from quote import Quote
+
+MINUTE = 60 * 1000
+# 整分时刻
+T0 = 1_760_000_000_000 - 1_760_000_000_000 % MINUTE
+
+
+def tick(engine: BarEngine, ts: int, price: float, volume: int, instrument_id: str = 'rb2601'):
+    engine.update(Quote(instrument_id, price, 0.0, 0.0, volume, ts=ts))
+
+
+def test_ticks_in_one_period_update_ohlcv():
+    engine = BarEngine(intervals={'1m': MINUTE})
+    tick(engine, T0 + 1000, 3500.0, 100)
+    tick(engine, T0 + 2000, 3510.0, 110)
+    tick(engine, T0 + 3000, 3490.0, 125)
+    tick(engine, T0 + 4000, 3495.0, 130)
+
+    [bar] = engine.get_bars('rb2601', '1m')
+
+    assert bar['start'] == T0
+    assert (bar['open'], bar['high'], bar['low'], bar['close']) == (3500.0, 3510.0, 3490.0, 3495.0)
+    # 第一笔只作为累计成交量的基准
+    assert bar['volume'] == 30
+    assert bar['ticks'] == 4
+    assert not bar['closed']
+
+
+def test_new_period_closes_previous_bar():
+    engine = BarEngine(intervals={'1m': MINUTE})
+    tick(engine, T0 + 1000, 3500.0, 100)
+    tick(engine, T0 + 59_999, 3505.0, 105)
+    tick(engine, T0 + MINUTE, 3506.0, 112)
+
+    closed, updated = engine.drain()
+
+    assert [(b.start, b.close, b.volume) for b in closed] == [(T0, 3505.0, 5)]
+    assert [(b.start, b.open, b.volume) for b in updated] == [(T0 + MINUTE, 3506.0, 7)]
+    bars = engine.get_bars('rb2601', '1m')
+    assert [(b['start'], b['closed']) for b in bars] == [(T0, True), (T0 + MINUTE, False)]
+    assert engine.drain() == ([], [])
+
+
+def test_each_interval_rolls_over_independently():
+    engine = BarEngine(intervals={'1s': 1000, '1m': MINUTE})
+    tick(engine, T0 + 100, 3500.0, 100)
+    tick(engine, T0 + 1100, 3501.0, 101)
+    tick(engine, T0 + 2100, 3502.0, 102)
+
+    assert len(engine.get_bars('rb2601', '1s')) == 3
+    [minute] = engine.get_bars('rb2601', '1m')
+    assert (minute['open'], minute['close'], minute['ticks']) == (3500.0, 3502.0, 3)
+
+
+def test_late_tick_does_not_modify_started_bar():
+    engine = BarEngine(intervals={'1m': MINUTE})
+    tick(engine, T0 + 1000, 3500.0, 100)
+    tick(engine, T0 + MINUTE + 1000, 3510.0, 110)
+    tick(engine, T0 + 2000, 3400.0, 120)
+
+    bars = engine.get_bars('rb2601', '1m')
+    assert bars[-1]['low'] == 3510.0
+    assert bars[-1]['ticks'] == 1
+    assert bars[0]['low'] == 3500.0
+
+
+def test_volume_reset_counts_as_new_day_volume():
+    engine = BarEngine(intervals={'1m': MINUTE})
+    tick(engine, T0 + 1000, 3500.0, 5000)
+    tick(engine, T0 + 2000, 3500.0, 20)
+
+    assert engine.get_bars('rb2601', '1m')[0]['volume'] == 20
+
+
+def test_close_expired_closes_bars_without_new_ticks():
+    engine = BarEngine(intervals={'1m': MINUTE})
+    tick(engine, T0 + 1000, 3500.0, 100)
+
+    engine.close_expired(T0 + MINUTE - 1)
+    assert engine.drain()[0] == []
+    engine.close_expired(T0 + MINUTE)
+
+    closed, updated = engine.drain()
+    assert [b.start for b in closed] == [T0]
+    assert updated == []
+    assert engine.get_bars('rb2601', '1m')[-1]['closed']
+
+
+def test_history_limit_and_query_options():
+    engine = BarEngine(intervals={'1m': MINUTE}, history=2)
+    for minute in range(5):
+        tick(engine, T0 + minute * MINUTE, 3500.0 + minute, 100 + minute)
+
+    bars = engine.get_bars('rb2601', '1m')
+    assert [b['start'] for b in bars] == [T0 + 2 * MINUTE, T0 + 3 * MINUTE, T0 + 4 * MINUTE]
+    assert len(engine.get_bars('rb2601', '1m', limit=1)) == 1
+    assert engine.get_bars('rb2601', '1m', limit=0) == []
+    with pytest.raises(ValueError):
+        engine.get_bars('rb2601', '5m')
+
+    engine.clear('rb2601')
+    assert engine.get_bars('rb2601', '1m') == []
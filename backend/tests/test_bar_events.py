@@ -0,0 +1,26 @@
+"""K线订阅事件：合约代码为空或只有空白时拒绝"""
+
+import pytest
+
+import app
+
+
+@pytest.fixture
+def client():
+    client = app.socketio.test_client(app.app)
+    yield client
+    client.disconnect()
+
+
+@pytest.mark.parametrize('event', ['subscribe_bars', 'unsubscribe_bars'])
+@pytest.mark.parametrize('instrument_id', ['', '   '])
+def test_bar_events_require_instrument_id(client, event, instrument_id):
+    result = client.emit(event, {'instrumentId': instrument_id}, callback=True)
+
+    assert result == {"ok": False, "error": "instrumentId is required"}
+
+
+def test_unsubscribe_bars_strips_instrument_id(client):
+    result = client.emit('unsubscribe_bars', {'instrumentId': ' rb2601 ', 'interval': '5m'}, callback=True)
+
+    assert result == {"ok": True, "instrumentId": 'rb2601', "interval": '5m'}
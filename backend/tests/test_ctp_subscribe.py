@@ -0,0 +1,116 @@
+"""CTP批量订阅：按 subscribe_chunk 分批请求，按合约跟踪订阅回报并汇总订阅结果"""
+
+import threading
+
+import pytest
+
+import app
+from ctp_mdapi import CTPMarketDataAPI
+
+INSTRUMENTS = ['rb2601', 'rb2605', 'hc2601', 'i2601', 'j2601', 'jm2601', 'ag2602']
+
+
+class StubMdApi(CTPMarketDataAPI):
+    """不连接CTP，记录每次订阅/退订请求的合约列表"""
+
+    def __init__(self, subscribe_chunk: int = 3):
+        super().__init__('tcp://stub:10131', '9999', 'tester', 'secret', subscribe_chunk=subscribe_chunk)
+        self.requests: list[tuple[str, list[str]]] = []
+
+    def SubscribeMarketData(self, instruments):
+        self.requests.append(('sub', list(instruments)))
+
+    def UnSubscribeMarketData(self, instruments):
+        self.requests.append(('unsub', list(instruments)))
+
+    def respond(self, instrument_id: str, error_msg: str = ''):
+        """模拟一条 OnRspSubMarketData 回报"""
+        error = {'ErrorID': 16, 'ErrorMsg': error_msg} if error_msg else {'ErrorID': 0, 'ErrorMsg': ''}
+        self.OnRspSubMarketData({'InstrumentID': instrument_id}, error, 1, True)
+
+
+@pytest.fixture
+def api(monkeypatch):
+    api = StubMdApi()
+    monkeypatch.setattr(app, '_get_feed_api', lambda: api)
+    monkeypatch.setattr(app.socketio, 'sleep', lambda seconds: threading.Event().wait(seconds))
+    monkeypatch.setattr(app.Config, 'CTP_SUBSCRIBE_TIMEOUT_MS', 300)
+    return api
+
+
+def test_requests_are_split_into_chunks(api):
+    api.subscribe_market_data(INSTRUMENTS)
+    api.unsubscribe_market_data(INSTRUMENTS[:4])
+
+    assert api.requests == [
+        ('sub', ['rb2601', 'rb2605', 'hc2601']),
+        ('sub', ['i2601', 'j2601', 'jm2601']),
+        ('sub', ['ag2602']),
+        ('unsub', ['rb2601', 'rb2605', 'hc2601']),
+        ('unsub', ['i2601']),
+    ]
+    assert api.get_subscribed_instruments() == set(INSTRUMENTS[4:])
+
+
+def test_chunk_size_is_at_least_one():
+    api = StubMdApi(subscribe_chunk=0)
+
+    api.subscribe_market_data(['rb2601', 'hc2601'])
+
+    assert api.requests == [('sub', ['rb2601']), ('sub', ['hc2601'])]
+
+
+def test_status_follows_responses_per_instrument(api):
+    api.subscribe_market_data(['rb2601', 'hc2601', 'i2601'])
+    api.respond('rb2601')
+    api.respond('hc2601', 'CTP:无此合约')
+
+    assert api.get_subscription_status(['rb2601', 'hc2601', 'i2601', 'ag2602']) == {
+        'rb2601': {'status': 'subscribed'},
+        'hc2601': {'status': 'failed', 'error': 'CTP:无此合约'},
+        'i2601': {'status': 'pending'},
+        'ag2602': {'status': 'unsubscribed'},
+    }
+
+    # 重新订阅清除上次的失败原因，退订后不再跟踪
+    api.subscribe_market_data(['hc2601'])
+    api.unsubscribe_market_data(['rb2601'])
+    assert api.get_subscription_status(['rb2601', 'hc2601']) == {
+        'rb2601': {'status': 'unsubscribed'},
+        'hc2601': {'status': 'pending'},
+    }
+
+
+def test_late_response_after_unsubscribe_is_ignored(api):
+    api.subscribe_market_data(['rb2601'])
+    api.unsubscribe_market_data(['rb2601'])
+
+    api.respond('rb2601')
+
+    assert api.get_subscription_status(['rb2601']) == {'rb2601': {'status': 'unsubscribed'}}
+
+
+def test_subscription_results_wait_for_responses(api):
+    api.subscribe_market_data(['rb2601', 'hc2601'])
+    threading.Timer(0.05, api.respond, ('rb2601',)).start()
+    threading.Timer(0.08, api.respond, ('hc2601', 'CTP:无此合约')).start()
+
+    results = app._get_subscription_results(['rb2601', 'hc2601'], added=['hc2601'], unknown=['xx9999'])
+
+    assert results == {
+        'rb2601': {'status': 'subscribed', 'added': False},
+        'hc2601': {'status': 'failed', 'error': 'CTP:无此合约', 'added': True},
+        'xx9999': {'status': 'unknown', 'added': False},
+    }
+    assert not app._is_subscribe_ok(results)
+    assert app._is_subscribe_ok({'rb2601': results['rb2601']})
+
+
+def test_subscription_results_stay_pending_after_timeout(api):
+    api.subscribe_market_data(['rb2601', 'hc2601'])
+    api.respond('rb2601')
+
+    results = app._get_subscription_results(['rb2601', 'hc2601'], added=['rb2601', 'hc2601'])
+
+    assert results['hc2601'] == {'status': 'pending', 'added': True}
+    assert app._is_subscribe_ok(results)
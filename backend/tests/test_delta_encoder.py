@@ -0,0 +1,61 @@
+"""字段级增量编码：首次全量、之后只发送变化的字段"""
+
+from delta_encoder import DeltaEncoder
+
+
+def payload(price: float, volume: int = 100, update_time: str = '10:00:00') -> dict:
+    return {'instrumentId': 'rb2601', 'lastPrice': price, 'volume': volume, 'updateTime': update_time}
+
+
+def test_first_quote_is_full_record_with_key():
+    encoder = DeltaEncoder()
+
+    entry = encoder.encode(3, payload(3500.0))
+
+    assert entry == {'k': 3, **payload(3500.0)}
+
+
+def test_later_quotes_send_only_changed_fields():
+    encoder = DeltaEncoder()
+    encoder.encode(3, payload(3500.0))
+
+    assert encoder.encode(3, payload(3501.0, volume=120)) == {'k': 3, 'lastPrice': 3501.0, 'volume': 120}
+    # 与上一次发送的值比较，而不是与第一次
+    assert encoder.encode(3, payload(3501.0, volume=120, update_time='10:00:01')) == {'k': 3, 'updateTime': '10:00:01'}
+
+
+def test_unchanged_quote_is_skipped():
+    encoder = DeltaEncoder()
+    encoder.encode(3, payload(3500.0))
+
+    assert encoder.encode(3, payload(3500.0)) is None
+
+
+def test_new_fields_are_sent():
+    encoder = DeltaEncoder()
+    encoder.encode(3, payload(3500.0))
+
+    entry = encoder.encode(3, {**payload(3500.0), 'bidPrice1': 3499.0})
+
+    assert entry == {'k': 3, 'bidPrice1': 3499.0}
+
+
+def test_instruments_are_tracked_separately():
+    encoder = DeltaEncoder()
+    encoder.encode(1, payload(3500.0))
+
+    other = {**payload(3500.0), 'instrumentId': 'hc2601'}
+    assert encoder.encode(2, other) == {'k': 2, **other}
+
+
+def test_forget_and_reset_resend_full_records():
+    encoder = DeltaEncoder()
+    encoder.encode(1, payload(3500.0))
+    encoder.encode(2, {**payload(3600.0), 'instrumentId': 'hc2601'})
+
+    encoder.forget('rb2601')
+    assert encoder.encode(1, payload(3500.0)) == {'k': 1, **payload(3500.0)}
+    assert encoder.encode(2, {**payload(3600.0), 'instrumentId': 'hc2601'}) is None
+
+    encoder.reset()
+    assert encoder.encode(2, {**payload(3600.0), 'instrumentId': 'hc2601'})['instrumentId'] == 'hc2601'
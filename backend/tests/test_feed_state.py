@@ -0,0 +1,92 @@
+"""行情源连接状态机：退避序列、状态变化事件和恢复时间"""
+
+import threading
+
+import pytest
+
+import feed_state
+from feed_state import FeedState
+
+
+@pytest.fixture
+def no_jitter(monkeypatch):
+    monkeypatch.setattr(feed_state.random, 'uniform', lambda low, high: 1.0)
+
+
+def test_backoff_doubles_up_to_max(no_jitter):
+    state = FeedState(backoff_initial=1.0, backoff_max=10.0)
+
+    delays = [state.schedule_retry('down') for _ in range(6)]
+
+    assert delays == [1.0, 2.0, 4.0, 8.0, 10.0, 10.0]
+    assert state.attempt == 6
+
+
+def test_backoff_jitter_stays_within_twenty_percent():
+    state = FeedState(backoff_initial=1.0, backoff_max=60.0)
+    for attempt in range(5):
+        delay = state.schedule_retry('down')
+        assert 0.8 * 2 ** attempt <= delay <= 1.2 * 2 ** attempt
+
+
+def test_emits_transitions_and_resets_backoff_after_first_tick(no_jitter):
+    state = FeedState(backoff_initial=0.5, backoff_max=60.0)
+    events = []
+    state.add_listener(events.append)
+
+    state.transition('connecting')
+    state.on_disconnected('disconnected (4097)', front='tcp://a')
+    state.schedule_retry('no front available')
+    state.schedule_retry('no front available')
+    state.transition('subscribing', front='tcp://b', instruments=3)
+    state.on_tick()
+    state.on_tick()
+
+    assert [(e['previous'], e['state']) for e in events] == [
+        ('stopped', 'connecting'),
+        ('connecting', 'disconnected'),
+        ('disconnected', 'reconnecting'),
+        ('reconnecting', 'reconnecting'),
+        ('reconnecting', 'subscribing'),
+        ('subscribing', 'streaming'),
+    ]
+    assert events[1]['front'] == 'tcp://a'
+    assert [e['retry_in_ms'] for e in events[2:4]] == [500, 1000]
+    assert events[-1]['recovery_ms'] >= 0
+    assert state.attempt == 0
+    assert state.disconnect_count == 1
+    assert state.get_stats()['last_recovery_ms'] == events[-1]['recovery_ms']
+
+
+def test_same_state_without_detail_is_not_an_event():
+    state = FeedState()
+    events = []
+    state.add_listener(events.append)
+
+    state.transition('connecting')
+    state.transition('connecting')
+    state.transition('connecting', reason='login failed')
+
+    assert len(events) == 2
+
+
+def test_concurrent_first_ticks_switch_to_streaming_once():
+    state = FeedState()
+    events = []
+    state.add_listener(events.append)
+    state.on_disconnected('stale')
+    barrier = threading.Barrier(8)
+
+    def tick():
+        barrier.wait()
+        state.on_tick()
+
+    threads = [threading.Thread(target=tick) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    streaming = [e for e in events if e['state'] == 'streaming']
+    assert len(streaming) == 1
+    assert 'recovery_ms' in streaming[0]
@@ -0,0 +1,148 @@
+"""多前置管理：用模拟前置检查选择、切换、停滞检测和全部前置不可用时的退避重连"""
+
+import pytest
+
+import front_manager
+from fake_front import FakeFrontSession, wait_for
+from front_manager import FrontManager
+
+# 前置地址 -> (连接登录耗时, 订阅后首笔行情耗时)（秒）：b 登录最快但首笔行情最慢，a 首笔行情最快
+FRONTS = {
+    'tcp://fake-a:10131': (0.10, 0.02),
+    'tcp://fake-b:10131': (0.02, 0.40),
+    'tcp://fake-c:10131': (0.05, 0.15),
+}
+A, B, C = FRONTS
+INSTRUMENTS = ['rb2601', 'hc2601', 'i2601']
+
+
+@pytest.fixture(autouse=True)
+def fast_watch(monkeypatch):
+    monkeypatch.setattr(front_manager, 'WATCH_SECONDS', 0.02)
+
+
+@pytest.fixture
+def fronts():
+    """模拟前置工厂：记录每个前置创建的会话；down 中的前置连接不上，quiet 为 True 时新会话不推送"""
+    class Fronts:
+        def __init__(self):
+            self.sessions: dict[str, list[FakeFrontSession]] = {address: [] for address in FRONTS}
+            self.down: set[str] = set()
+            self.quiet = False
+
+        def __call__(self, address: str) -> FakeFrontSession:
+            session = FakeFrontSession(address, *FRONTS[address], down=self.down)
+            session.frozen = self.quiet
+            self.sessions[address].append(session)
+            return session
+
+        def freeze_all(self, frozen: bool = True):
+            self.quiet = frozen
+            for sessions in self.sessions.values():
+                for session in sessions:
+                    session.frozen = frozen
+
+    return Fronts()
+
+
+@pytest.fixture
+def start_manager(fronts):
+    """创建并连接 FrontManager，等待选出工作前置和热备；测试结束后断开"""
+    managers = []
+
+    def start(**options) -> FrontManager:
+        options = {'probe_instruments': ['probe'], 'probe_seconds': 2.0, 'stale_seconds': 0.3, **options}
+        manager = FrontManager(list(FRONTS), fronts, **options)
+        managers.append(manager)
+        manager.subscribe_market_data(INSTRUMENTS)
+        manager.connect()
+        assert wait_for(lambda: manager.active is not None and manager.standby is not None, 5)
+        assert wait_for(lambda: len(manager.get_all_quotes()) == len(INSTRUMENTS), 2)
+        return manager
+
+    yield start
+    for manager in managers:
+        manager.disconnect()
+
+
+def test_selects_fastest_first_tick_as_active_and_next_as_standby(start_manager, fronts):
+    manager = start_manager()
+
+    stats = manager.get_stats()
+    assert stats['ranking'] == [A, C, B]
+    assert stats['active'] == A
+    assert stats['standby'] == C
+    assert stats['connection']['state'] == 'streaming'
+    # 排名第三的前置释放，热备退订探测合约，工作会话只保留业务合约
+    assert wait_for(lambda: fronts.sessions[B][0].released, 1)
+    assert fronts.sessions[C][0].subscribed_instruments == set()
+    assert fronts.sessions[A][0].subscribed_instruments == set(INSTRUMENTS)
+
+
+def test_fails_over_to_standby_on_disconnect(start_manager, fronts):
+    manager = start_manager()
+    old = manager.active
+
+    old.api.drop()
+
+    assert wait_for(lambda: manager.failover_count == 1 and manager.last_failover['stall_ms'] is not None, 3)
+    failover = manager.last_failover
+    assert (failover['from'], failover['to']) == (A, C)
+    assert failover['reason'].startswith('disconnected')
+    assert manager.front_address == C
+    assert fronts.sessions[C][0].subscribed_instruments == set(INSTRUMENTS)
+    assert wait_for(lambda: old.api.released, 1)
+    # 切换期间最新行情缓存保持
+    assert set(manager.get_all_quotes()) == set(INSTRUMENTS)
+
+
+def test_fails_over_when_active_front_goes_stale(start_manager):
+    manager = start_manager()
+
+    manager.active.api.frozen = True
+
+    assert wait_for(lambda: manager.failover_count == 1, 3)
+    assert manager.last_failover['reason'].startswith('stale')
+    assert manager.last_failover['to'] == C
+    assert wait_for(lambda: manager.feed_state.state == 'streaming', 2)
+
+
+def test_does_not_flap_when_all_fronts_are_quiet(start_manager, fronts):
+    manager = start_manager()
+    stale_seconds = manager.stale_seconds
+
+    # 收盘：全部前置同时停止推送，只切换一次，之后不再检测停滞
+    fronts.freeze_all()
+    assert wait_for(lambda: manager.failover_count == 1, 3)
+    assert not wait_for(lambda: manager.failover_count > 1, stale_seconds * 5)
+
+    # 恢复推送后重新检测停滞
+    fronts.freeze_all(False)
+    assert wait_for(lambda: manager.stale_armed, 2)
+    assert manager.failover_count == 1
+
+
+def test_backs_off_while_all_fronts_are_down_and_recovers(start_manager, fronts, monkeypatch):
+    monkeypatch.setattr('feed_state.random.uniform', lambda low, high: 1.0)
+    manager = start_manager(reconnect_initial=0.05, reconnect_max=0.2)
+    manager.probe_seconds = 0.05
+    events = []
+    manager.add_status_listener(events.append)
+
+    fronts.down.update(FRONTS)
+    manager.standby.api.drop()
+    manager.active.api.drop()
+    assert wait_for(lambda: sum(e['state'] == 'reconnecting' for e in events) >= 4, 10)
+    fronts.down.clear()
+    # 回调在状态切换后于锁外调用，等待 streaming 事件本身
+    assert wait_for(lambda: events[-1]['state'] == 'streaming', 5)
+
+    states = [e['state'] for e in events]
+    assert states[0] == 'disconnected'
+    retries = [e['retry_in_ms'] for e in events if e['state'] == 'reconnecting']
+    assert retries[:4] == [50, 100, 200, 200]
+    # 恢复：重新订阅后第一笔行情切换为 streaming，并带断线到恢复的时间
+    assert states[-2:] == ['subscribing', 'streaming']
+    assert events[-1]['recovery_ms'] > 0
+    assert manager.feed_state.attempt == 0
+    assert set(manager.active.api.subscribed_instruments) == set(INSTRUMENTS)
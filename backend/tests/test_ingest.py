@@ -0,0 +1,201 @@
+"""拆分部署：接入进程按工作进程合并订阅引用、集群固定订阅、工作进程断开释放订阅和重连后恢复"""
+
+import threading
+
+import pytest
+
+from fake_front import wait_for
+from ingest import IngestServer, get_authkey
+from quote import Quote
+from remote_feed import RemoteFeedAPI
+
+
+class StubFeed:
+    """记录上游订阅/退订的行情源，行情由测试调用 push 产生"""
+
+    def __init__(self):
+        self.is_connected = True
+        self.is_logged_in = True
+        self.subscribed: set[str] = set()
+        self.calls: list[tuple[str, list[str]]] = []
+        self.parse_groups: tuple = ()
+        self.quote_callbacks = []
+        self.lock = threading.Lock()
+
+    def add_quote_callback(self, callback):
+        self.quote_callbacks.append(callback)
+
+    def subscribe_market_data(self, instruments):
+        with self.lock:
+            self.calls.append(('subscribe', sorted(instruments)))
+            self.subscribed.update(instruments)
+        return True
+
+    def unsubscribe_market_data(self, instruments):
+        with self.lock:
+            self.calls.append(('unsubscribe', sorted(instruments)))
+            self.subscribed.difference_update(instruments)
+        return True
+
+    def set_parse_groups(self, groups):
+        self.parse_groups = tuple(groups)
+
+    def get_subscription_status(self, instruments):
+        with self.lock:
+            return {i: {"status": 'subscribed' if i in self.subscribed else 'unsubscribed'} for i in instruments}
+
+    def get_subscribed_instruments(self):
+        with self.lock:
+            return set(self.subscribed)
+
+    def get_last_quote(self, instrument_id):
+        return None
+
+    def push(self, instrument_id: str, price: float):
+        for callback in self.quote_callbacks:
+            callback(Quote(instrument_id, price, 0.0, 0.0, ts=1760000000000))
+
+
+@pytest.fixture
+def address(tmp_path):
+    return str(tmp_path / 'ingest.sock')
+
+
+@pytest.fixture
+def feed():
+    return StubFeed()
+
+
+@pytest.fixture
+def server(feed, address):
+    server = IngestServer(feed, address, get_authkey())
+    server.start()
+    yield server
+    server.close()
+
+
+@pytest.fixture
+def connect_worker(server, address):
+    """连接一个工作进程（RemoteFeedAPI），测试结束后断开"""
+    workers = []
+
+    def connect() -> RemoteFeedAPI:
+        worker = RemoteFeedAPI(address, reconnect_seconds=0.05)
+        assert worker.connect()
+        workers.append(worker)
+        count = len(workers)
+        assert wait_for(lambda: server.get_stats()['workers'] == count, 2)
+        return worker
+
+    yield connect
+    for worker in workers:
+        worker.disconnect()
+
+
+def received(worker: RemoteFeedAPI) -> dict[str, float]:
+    return {i: q.last_price for i, q in worker.get_all_quotes().items()}
+
+
+def test_upstream_subscription_follows_worker_reference_counts(server, feed, connect_worker):
+    a, b = connect_worker(), connect_worker()
+
+    a.subscribe_market_data(['rb2601', 'hc2601'])
+    assert wait_for(lambda: feed.subscribed == {'rb2601', 'hc2601'}, 2)
+    b.subscribe_market_data(['rb2601', 'i2601'])
+    assert wait_for(lambda: feed.subscribed == {'rb2601', 'hc2601', 'i2601'}, 2)
+    # 已被订阅的合约不再向上游订阅
+    assert feed.calls == [('subscribe', ['hc2601', 'rb2601']), ('subscribe', ['i2601'])]
+    assert wait_for(lambda: b.get_subscription_status(['i2601'])['i2601']['status'] == 'subscribed', 2)
+
+    # 每个工作进程只收到自己订阅的合约
+    feed.push('rb2601', 1.0)
+    feed.push('hc2601', 2.0)
+    feed.push('i2601', 3.0)
+    assert wait_for(lambda: received(a) == {'rb2601': 1.0, 'hc2601': 2.0}, 2)
+    assert wait_for(lambda: received(b) == {'rb2601': 1.0, 'i2601': 3.0}, 2)
+
+    a.unsubscribe_market_data(['rb2601', 'hc2601'])
+    assert wait_for(lambda: feed.subscribed == {'rb2601', 'i2601'}, 2)
+    b.unsubscribe_market_data(['rb2601'])
+    assert wait_for(lambda: feed.subscribed == {'i2601'}, 2)
+    assert server.ref_counts == {'i2601': 1}
+
+
+def test_dropped_worker_releases_its_instruments(server, feed, connect_worker):
+    a, b = connect_worker(), connect_worker()
+    a.subscribe_market_data(['rb2601', 'hc2601'])
+    b.subscribe_market_data(['rb2601'])
+    assert wait_for(lambda: b.get_cluster_instruments() == {'rb2601', 'hc2601'}, 2)
+
+    a.disconnect()
+
+    assert wait_for(lambda: server.get_stats()['workers'] == 1, 2)
+    assert wait_for(lambda: feed.subscribed == {'rb2601'}, 2)
+    assert feed.calls[-1] == ('unsubscribe', ['hc2601'])
+    assert wait_for(lambda: b.get_cluster_instruments() == {'rb2601'}, 2)
+
+
+def test_pins_are_cluster_wide_with_replies_per_request(server, feed, connect_worker):
+    a, b = connect_worker(), connect_worker()
+    b.subscribe_market_data(['rb2601'])
+    assert wait_for(lambda: 'rb2601' in feed.subscribed, 2)
+
+    first = a.pin(['rb2601', 'hc2601', 'rb2601'])
+    assert wait_for(lambda: first in a.replies, 2)
+    assert a.get_reply(first) == ['rb2601', 'hc2601']
+    assert a.get_reply(first) is None
+    # 其他工作进程固定同样的合约没有变化，固定订阅推送给全部工作进程
+    second = b.pin(['hc2601'])
+    assert wait_for(lambda: b.get_reply(second) == [], 2)
+    assert wait_for(lambda: b.get_pinned() == {'rb2601', 'hc2601'}, 2)
+    assert feed.subscribed == {'rb2601', 'hc2601'}
+
+    # 发起固定订阅的工作进程断开不影响固定订阅
+    a.disconnect()
+    assert wait_for(lambda: server.get_stats()['workers'] == 1, 2)
+    assert server.pinned == {'rb2601', 'hc2601'}
+
+    # 释放固定订阅：rb2601 仍被工作进程订阅，hc2601 取消上游订阅
+    third = b.unpin(['rb2601', 'hc2601', 'i2601'])
+    assert wait_for(lambda: third in b.replies, 2)
+    assert b.get_reply(third) == ['rb2601', 'hc2601']
+    assert wait_for(lambda: feed.subscribed == {'rb2601'}, 2)
+    assert wait_for(lambda: b.get_pinned() == set(), 2)
+    assert server.get_stats()['pinned'] == 0
+
+
+def test_parse_groups_are_merged_across_workers(server, feed, connect_worker):
+    a, b = connect_worker(), connect_worker()
+
+    a.set_parse_groups(['top'])
+    b.set_parse_groups(['stats', 'top'])
+    assert wait_for(lambda: set(feed.parse_groups) == {'top', 'stats'}, 2)
+
+    b.disconnect()
+    assert wait_for(lambda: feed.parse_groups == ('top',), 2)
+
+
+def test_worker_restores_subscriptions_after_ingest_restart(server, feed, address, connect_worker):
+    worker = connect_worker()
+    worker.set_parse_groups(['top'])
+    worker.subscribe_market_data(['rb2601', 'hc2601'])
+    request_id = worker.pin(['i2601'])
+    assert wait_for(lambda: worker.get_reply(request_id) == ['i2601'], 2)
+    assert wait_for(lambda: worker.get_pinned() == {'i2601'}, 2)
+
+    # 接入进程重启：新的行情源没有任何订阅
+    server.close()
+    restarted_feed = StubFeed()
+    restarted = IngestServer(restarted_feed, address, get_authkey())
+    restarted.start()
+    try:
+        assert wait_for(lambda: worker.reconnect_count == 1, 3)
+        assert wait_for(lambda: restarted_feed.subscribed == {'rb2601', 'hc2601', 'i2601'}, 2)
+        assert restarted_feed.parse_groups == ('top',)
+        assert restarted.pinned == {'i2601'}
+        # 请求号0的固定订阅不产生回复
+        assert worker.replies == {}
+        assert wait_for(lambda: worker.get_subscription_status(['rb2601'])['rb2601']['status'] == 'subscribed', 2)
+    finally:
+        worker.disconnect()
+        restarted.close()
@@ -0,0 +1,99 @@
+"""合约索引：前缀二分查找、品种和交易所过滤、到期判断"""
+
+from instrument_index import Instrument, InstrumentIndex
+
+
+def make_index(expire_date: str = '20260115') -> InstrumentIndex:
+    instruments = [
+        Instrument('rb2601', 'SHFE', 'rb', expire_date=expire_date),
+        Instrument('rb2605', 'SHFE', 'rb', expire_date=expire_date),
+        Instrument('ru2601', 'SHFE', 'ru', expire_date=expire_date),
+        Instrument('hc2601', 'SHFE', 'hc', expire_date=expire_date),
+        Instrument('i2601', 'DCE', 'i', expire_date=expire_date),
+        Instrument('IF2601', 'CFFEX', 'IF', expire_date=expire_date),
+        Instrument('SR601', 'CZCE', 'SR', expire_date=expire_date),
+    ]
+    return InstrumentIndex(instruments)
+
+
+def ids(instruments: list[Instrument]) -> list[str]:
+    return [instrument.instrument_id for instrument in instruments]
+
+
+def test_prefix_search_returns_contiguous_sorted_range():
+    index = make_index()
+
+    assert ids(index.search('rb')) == ['rb2601', 'rb2605']
+    assert ids(index.search('r')) == ['rb2601', 'rb2605', 'ru2601']
+    assert ids(index.search('rb2605')) == ['rb2605']
+    # 不区分大小写，前缀落在首尾之外时为空
+    assert ids(index.search('if')) == ['IF2601']
+    assert ids(index.search('a')) == []
+    assert ids(index.search('z')) == []
+    assert ids(index.search('rb2606')) == []
+
+
+def test_search_without_conditions_lists_all_up_to_limit():
+    index = make_index()
+
+    assert ids(index.search()) == ['hc2601', 'i2601', 'IF2601', 'rb2601', 'rb2605', 'ru2601', 'SR601']
+    assert ids(index.search('r', limit=2)) == ['rb2601', 'rb2605']
+
+
+def test_product_and_exchange_filters_combine_with_prefix():
+    index = make_index()
+
+    assert ids(index.search(product='RB')) == ['rb2601', 'rb2605']
+    assert ids(index.search('rb2605', product='rb')) == ['rb2605']
+    assert ids(index.search('hc', product='rb')) == []
+    assert ids(index.search(exchange='shfe')) == ['hc2601', 'rb2601', 'rb2605', 'ru2601']
+    assert ids(index.search('r', exchange='SHFE')) == ['rb2601', 'rb2605', 'ru2601']
+    assert ids(index.search(product='rb', exchange='DCE')) == []
+    assert ids(index.search(product='ag')) == []
+
+
+def test_expired_when_last_expire_date_is_before_today():
+    index = make_index('20260115')
+
+    assert index.last_expire_date == '20260115'
+    assert not index.is_expired('20260114')
+    assert not index.is_expired('20260115')
+    assert index.is_expired('20260116')
+
+
+def test_missing_expire_date_is_never_expired():
+    index = InstrumentIndex([
+        Instrument('rb2601', 'SHFE', 'rb', expire_date='20200101'),
+        Instrument('rb2605', 'SHFE', 'rb'),
+    ])
+
+    assert index.last_expire_date == ''
+    assert not index.is_expired('20990101')
+
+
+def test_validates_only_loaded_and_current_files(monkeypatch):
+    monkeypatch.setattr('instrument_index.time.strftime', lambda fmt: '20260201')
+
+    assert not InstrumentIndex().validates()
+    assert not make_index('20260115').validates()
+    assert make_index('20260315').validates()
+    assert 'rb2601' in make_index() and 'rb2602' not in make_index()
+
+
+def test_load_csv_with_ctp_field_names(tmp_path):
+    path = tmp_path / 'instruments.csv'
+    path.write_text(
+        'InstrumentID,ExchangeID,ProductID,InstrumentName,PriceTick,VolumeMultiple,ExpireDate\n'
+        'rb2601,SHFE,rb,螺纹钢2601,1,10,20260115\n'
+        ',SHFE,rb,,1,10,20260115\n',
+        encoding='utf-8',
+    )
+
+    index = InstrumentIndex.load(str(path))
+
+    assert len(index) == 1
+    assert index.get('rb2601').to_dict() == {
+        'instrumentId': 'rb2601', 'exchangeId': 'SHFE', 'productId': 'rb', 'name': '螺纹钢2601',
+        'priceTick': 1.0, 'multiplier': 10, 'expireDate': '20260115',
+    }
+    assert len(InstrumentIndex.load(str(tmp_path / 'missing.csv'))) == 0
@@ -0,0 +1,29 @@
+"""Prometheus 指标：累计计数为 counter（_total 结尾），瞬时值为 gauge"""
+
+import app
+from metrics import Metrics
+
+
+def metric_types(text: str) -> dict[str, str]:
+    return {line.split()[2]: line.split()[3] for line in text.splitlines() if line.startswith('# TYPE')}
+
+
+def test_render_types_extra_counters_and_gauges():
+    text = Metrics().render({'ctp_ws_clients': (3, 'Clients')}, {'ctp_dropped_total': (5, 'Dropped')})
+
+    types = metric_types(text)
+    assert (types['ctp_ws_clients'], types['ctp_dropped_total']) == ('gauge', 'counter')
+    assert 'ctp_ws_clients 3' in text.splitlines()
+    assert 'ctp_dropped_total 5' in text.splitlines()
+
+
+def test_metrics_endpoint_exports_bridge_and_conflation_counters():
+    response = app.app.test_client().get('/metrics')
+
+    types = metric_types(response.get_data(as_text=True))
+    assert types['ctp_bridge_overflow_dropped_total'] == 'counter'
+    assert types['ctp_conflated_quotes_total'] == 'counter'
+    for name in ('ctp_bridge_depth', 'ctp_connected', 'ctp_ws_clients', 'ctp_subscribed_instruments'):
+        assert types[name] == 'gauge'
+    assert not any(name.startswith(('ctp_bridge_overflow_dropped', 'ctp_conflated_quotes'))
+                   and not name.endswith('_total') for name in types)
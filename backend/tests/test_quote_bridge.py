@@ -0,0 +1,65 @@
+"""行情线程桥：溢出时同合约合并、否则丢弃最旧"""
+
+from quote import Quote
+from quote_bridge import QuoteBridge
+
+
+def make_quote(instrument_id: str, price: float) -> Quote:
+    return Quote(instrument_id, price, 0.0, 0.0)
+
+
+def drained(bridge: QuoteBridge) -> list[tuple[str, float]]:
+    return [(q.instrument_id, q.last_price) for q in bridge.drain()]
+
+
+def test_drains_in_arrival_order_below_capacity():
+    bridge = QuoteBridge(capacity=4)
+
+    assert bridge.put(make_quote('rb2601', 1.0))
+    assert bridge.put(make_quote('hc2601', 2.0))
+    assert bridge.put(make_quote('rb2601', 3.0))
+
+    assert drained(bridge) == [('rb2601', 1.0), ('hc2601', 2.0), ('rb2601', 3.0)]
+    assert bridge.get_depth() == 0
+
+
+def test_overflow_replaces_latest_pending_quote_of_same_instrument():
+    bridge = QuoteBridge(capacity=3)
+    for instrument_id, price in [('rb2601', 1.0), ('hc2601', 2.0), ('rb2601', 3.0)]:
+        bridge.put(make_quote(instrument_id, price))
+
+    assert not bridge.put(make_quote('rb2601', 4.0))
+    assert not bridge.put(make_quote('rb2601', 5.0))
+
+    # 只覆盖该合约最新的一笔，位置不变
+    assert drained(bridge) == [('rb2601', 1.0), ('hc2601', 2.0), ('rb2601', 5.0)]
+    stats = bridge.get_stats()
+    assert stats['overflow_coalesced'] == 2
+    assert stats['overflow_dropped'] == 0
+    assert stats['high_watermark'] == 3
+
+
+def test_overflow_of_new_instrument_drops_oldest():
+    bridge = QuoteBridge(capacity=2)
+    bridge.put(make_quote('rb2601', 1.0))
+    bridge.put(make_quote('hc2601', 2.0))
+
+    assert not bridge.put(make_quote('i2601', 3.0))
+    # 被丢弃的 rb2601 不再可合并，新的一笔重新入队并挤掉 hc2601
+    assert not bridge.put(make_quote('rb2601', 4.0))
+
+    assert drained(bridge) == [('i2601', 3.0), ('rb2601', 4.0)]
+    assert bridge.get_stats()['overflow_dropped'] == 2
+
+
+def test_drain_resets_coalescing_index():
+    bridge = QuoteBridge(capacity=1)
+    bridge.put(make_quote('rb2601', 1.0))
+    assert drained(bridge) == [('rb2601', 1.0)]
+
+    assert bridge.put(make_quote('rb2601', 2.0))
+    assert not bridge.put(make_quote('rb2601', 3.0))
+
+    assert drained(bridge) == [('rb2601', 3.0)]
+    stats = bridge.get_stats()
+    assert (stats['put'], stats['drained']) == (3, 2)
@@ -0,0 +1,78 @@
+"""行情合并缓冲：最新值覆盖、合并计数和自适应推送间隔"""
+
+import pytest
+
+from quote import Quote
+from quote_conflator import QuoteConflator
+
+
+def make_quote(instrument_id: str, price: float) -> Quote:
+    return Quote(instrument_id, price, 0.0, 0.0)
+
+
+def test_keeps_only_latest_quote_per_instrument():
+    conflator = QuoteConflator()
+    for instrument_id, price in [('rb2601', 1.0), ('hc2601', 2.0), ('rb2601', 3.0), ('rb2601', 4.0)]:
+        conflator.offer(make_quote(instrument_id, price))
+
+    quotes = {q.instrument_id: q.last_price for q in conflator.drain()}
+
+    assert quotes == {'rb2601': 4.0, 'hc2601': 2.0}
+    assert conflator.drain() == []
+
+
+def test_conflated_counts_replaced_quotes_only():
+    conflator = QuoteConflator()
+    for price in range(5):
+        conflator.offer(make_quote('rb2601', float(price)))
+    conflator.offer(make_quote('hc2601', 1.0))
+
+    # 未推送的待发行情不计入合并数
+    stats = conflator.get_stats()
+    assert (stats['received'], stats['emitted'], stats['pending'], stats['conflated']) == (6, 0, 2, 4)
+
+    conflator.drain()
+    conflator.offer(make_quote('rb2601', 9.0))
+    stats = conflator.get_stats()
+    assert (stats['received'], stats['emitted'], stats['pending'], stats['conflated']) == (7, 2, 1, 4)
+    assert stats['flushes'] == 1
+
+
+def test_fixed_interval_ignores_rate():
+    conflator = QuoteConflator(interval_ms=100)
+    for _ in range(10000):
+        conflator.offer(make_quote('rb2601', 1.0))
+    conflator.drain()
+
+    assert conflator.next_interval() == pytest.approx(0.1)
+
+
+@pytest.mark.parametrize('received, elapsed, expected', [
+    (0, 0.0, 50.0),
+    (10, 0.1, 50.0),       # 100 笔/秒，低于下限
+    (20, 0.1, 50.0),       # 恰为下限
+    (260, 0.1, 150.0),     # 2600 笔/秒，区间中点
+    (500, 0.1, 250.0),     # 恰为上限
+    (5000, 0.1, 250.0),    # 高于上限
+])
+def test_adaptive_interval_clamps_and_interpolates(received, elapsed, expected):
+    conflator = QuoteConflator(adaptive=True, min_interval_ms=50, max_interval_ms=250)
+
+    assert conflator._adapt_interval(received, elapsed) == pytest.approx(expected)
+
+
+def test_adaptive_drain_updates_next_interval(monkeypatch):
+    clock = [100.0]
+    monkeypatch.setattr('quote_conflator.time.monotonic', lambda: clock[0])
+    conflator = QuoteConflator(interval_ms=100, adaptive=True, min_interval_ms=50, max_interval_ms=250)
+
+    for _ in range(1000):
+        conflator.offer(make_quote('rb2601', 1.0))
+    clock[0] += 0.1
+    conflator.drain()
+    assert conflator.next_interval() == pytest.approx(0.25)
+
+    clock[0] += 1.0
+    conflator.drain()
+    assert conflator.next_interval() == pytest.approx(0.05)
+    assert conflator.get_stats()['interval_ms'] == 50.0
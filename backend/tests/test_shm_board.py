@@ -0,0 +1,131 @@
+"""共享内存行情表：写入读取、序号协议的重试、段头校验和容量上限"""
+
+import os
+from multiprocessing import shared_memory
+
+import numpy as np
+import pytest
+
+from quote import Quote
+from shm_board import SharedQuoteBoard, SharedQuoteBoardReader
+
+
+@pytest.fixture
+def board_name(request):
+    return f'ctp_test_{os.getpid()}_{request.node.name[:40]}'
+
+
+@pytest.fixture
+def board(board_name):
+    board = SharedQuoteBoard(board_name, capacity=4)
+    board.start()
+    yield board
+    board.close()
+
+
+@pytest.fixture
+def reader(board):
+    reader = SharedQuoteBoardReader(board.name, retries=5)
+    yield reader
+    reader.close()
+
+
+def make_quote(instrument_id: str, price: float, ts: int = 1760000000000, extra: dict = None) -> Quote:
+    return Quote(instrument_id, price, 1.5, 0.04, 120, '10:00:01', 500, ts, extra=extra, recv_ns=42)
+
+
+def test_get_quote_round_trip(board, reader):
+    top = {'bidPrice1': 3499.0, 'bidVolume1': 5, 'askPrice1': 3501.0, 'askVolume1': 7}
+    board.update(make_quote('rb2601', 3500.0, extra=top))
+    board.update(make_quote('hc2601', 3300.0))
+
+    quote = reader.get_quote('rb2601')
+    assert quote.to_dict() == make_quote('rb2601', 3500.0).to_dict()
+    assert quote.extra == top
+    assert quote.recv_ns == 42
+    # 没有一档盘口的合约 extra 为 None
+    assert reader.get_quote('hc2601').extra is None
+    assert reader.get_quote('i2601') is None
+
+
+def test_latest_write_wins(board, reader):
+    board.update(make_quote('rb2601', 3500.0))
+    assert reader.get_quote('rb2601').last_price == 3500.0
+
+    board.update(make_quote('rb2601', 3502.0, ts=1760000000500))
+
+    quote = reader.get_quote('rb2601')
+    assert (quote.last_price, quote.ts) == (3502.0, 1760000000500)
+    assert board.get_stats()['written'] == 2
+    assert reader.read('rb2601')['last_price'] == 3502.0
+
+
+def test_snapshot_returns_every_written_record(board, reader):
+    board.update(make_quote('rb2601', 3500.0))
+    board.update(make_quote('hc2601', 3300.0))
+
+    snapshot = reader.snapshot()
+
+    assert snapshot['instrument_id'].tolist() == [b'rb2601', b'hc2601']
+    assert snapshot['last_price'].tolist() == [3500.0, 3300.0]
+    assert np.isnan(snapshot['bid_price1']).all()
+    assert reader.count == 2 and reader.alive
+
+
+def test_row_being_written_is_retried_then_none(board, reader):
+    board.update(make_quote('rb2601', 3500.0))
+    board.update(make_quote('hc2601', 3300.0))
+
+    # 模拟写入端停在写入中：序号为奇数
+    board.records['seq'][0] += 1
+
+    assert reader.get_quote('rb2601') is None
+    assert reader.retry_count == 5
+    snapshot = reader.snapshot()
+    assert snapshot['instrument_id'].tolist() == [b'hc2601']
+    assert reader.retry_count == 10
+
+    # 写完后序号恢复为偶数，同一条记录可以读到
+    board.records['seq'][0] += 1
+    assert reader.get_quote('rb2601').last_price == 3500.0
+    assert len(reader.snapshot()) == 2
+
+
+@pytest.mark.parametrize('field, value', [('magic', b'NOTABORD'), ('version', 99), ('record_size', 8)])
+def test_attach_rejects_incompatible_header(board, field, value):
+    board.header[field] = value
+
+    with pytest.raises(ValueError):
+        SharedQuoteBoardReader(board.name)
+
+
+def test_attach_missing_board_fails(board_name):
+    with pytest.raises(FileNotFoundError):
+        SharedQuoteBoardReader(board_name)
+
+
+def test_new_instruments_beyond_capacity_are_dropped(board, reader):
+    for i in range(6):
+        board.update(make_quote(f'rb26{i:02d}', 3500.0 + i))
+    board.update(make_quote('rb2600', 3600.0))
+
+    stats = board.get_stats()
+    assert (stats['instruments'], stats['written'], stats['dropped']) == (4, 5, 2)
+    assert reader.count == 4
+    assert reader.get_quote('rb2604') is None
+    assert reader.get_quote('rb2600').last_price == 3600.0
+
+
+def test_reader_keeps_last_data_after_writer_closes(board_name):
+    board = SharedQuoteBoard(board_name, capacity=2)
+    board.start()
+    board.update(make_quote('rb2601', 3500.0))
+    reader = SharedQuoteBoardReader(board_name)
+
+    board.close()
+
+    assert not reader.alive
+    assert reader.get_quote('rb2601').last_price == 3500.0
+    reader.close()
+    with pytest.raises(FileNotFoundError):
+        shared_memory.SharedMemory(name=board_name)
@@ -0,0 +1,68 @@
+"""订阅引用计数：持有者计数、宽限期和到期取消"""
+
+import time
+
+from subscription_manager import PINNED_HOLDER, SubscriptionManager
+
+
+def test_last_holder_release_starts_grace_period():
+    manager = SubscriptionManager(grace_seconds=30)
+    manager.acquire('sid-1', ['rb2601', 'hc2601'])
+    manager.acquire('sid-2', ['rb2601'])
+
+    assert manager.release('sid-1', ['rb2601', 'hc2601']) == ['hc2601']
+    assert manager.get_ref_count('rb2601') == 1
+    assert manager.release('sid-2', ['rb2601']) == ['rb2601']
+    assert manager.get_ref_count('rb2601') == 0
+    assert manager.get_stats()['expiring'] == 2
+
+
+def test_same_holder_counts_each_acquire():
+    manager = SubscriptionManager(grace_seconds=30)
+    # 同一会话通过行情和K线各持有一次
+    manager.acquire('sid-1', ['rb2601'])
+    manager.acquire('sid-1', ['rb2601'])
+
+    assert manager.get_ref_count('rb2601') == 1
+    assert manager.release('sid-1', ['rb2601']) == []
+    assert manager.is_held('sid-1', 'rb2601')
+    assert manager.release('sid-1', ['rb2601']) == ['rb2601']
+    assert not manager.is_held('sid-1', 'rb2601')
+
+
+def test_reap_returns_only_expired_instruments():
+    manager = SubscriptionManager(grace_seconds=30)
+    manager.acquire('sid-1', ['rb2601'])
+    manager.release('sid-1', ['rb2601'])
+    now = time.monotonic()
+
+    assert manager.reap(now) == []
+    assert manager.reap(now + 31) == ['rb2601']
+    # 只取出一次
+    assert manager.reap(now + 62) == []
+    assert manager.get_stats()['released'] == 1
+
+
+def test_reacquire_within_grace_revives_subscription():
+    manager = SubscriptionManager(grace_seconds=30)
+    manager.acquire('sid-1', ['rb2601'])
+    manager.release_all('sid-1')
+
+    manager.acquire('sid-2', ['rb2601'])
+
+    assert manager.reap(time.monotonic() + 31) == []
+    stats = manager.get_stats()
+    assert (stats['revived'], stats['expiring'], stats['held']) == (1, 0, 1)
+
+
+def test_release_all_and_unknown_holders():
+    manager = SubscriptionManager(grace_seconds=0)
+    manager.acquire('sid-1', ['rb2601', 'hc2601'])
+    manager.acquire(PINNED_HOLDER, ['rb2601'])
+
+    assert manager.release('sid-2', ['rb2601']) == []
+    assert manager.release_all('sid-1') == ['hc2601']
+    assert manager.get_held(PINNED_HOLDER) == ['rb2601']
+    assert manager.get_stats()['holders'] == 1
+    # 宽限期为0时立即到期
+    assert manager.reap() == ['hc2601']
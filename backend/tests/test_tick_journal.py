@@ -0,0 +1,68 @@
+"""逐笔行情日志：按合约和时间范围查询（稀疏索引、未索引的尾部、跨日、重新打开）"""
+
+import time
+
+from quote import Quote
+from tick_journal import BLOCK_RECORDS, TickJournal, list_segments, query_ticks, read_count
+
+# 本地时间某天中午，避免跨日
+NOON = int(time.mktime((2026, 3, 2, 12, 0, 0, 0, 0, -1)) * 1000)
+INSTRUMENTS = ('rb2601', 'hc2601', 'i2601')
+
+
+def write_ticks(directory, count: int, start_ts: int = NOON) -> list[Quote]:
+    """每毫秒一笔，合约轮流"""
+    quotes = [
+        Quote(INSTRUMENTS[n % 3], 3500.0 + n % 7, 1.0, 0.03, n, '12:00:00', n % 1000, ts=start_ts + n)
+        for n in range(count)
+    ]
+    journal = TickJournal(str(directory), segment_bytes=4096)
+    for quote in quotes:
+        journal.append(quote)
+    journal.close()
+    return quotes
+
+
+def as_tuples(quotes) -> list[tuple]:
+    return [(q.instrument_id, q.ts, q.last_price, q.volume, q.update_time, q.update_millisec) for q in quotes]
+
+
+def test_query_matches_instrument_and_inclusive_range(tmp_path):
+    # 三个完整的索引块加上未写满索引的尾部
+    quotes = write_ticks(tmp_path, BLOCK_RECORDS * 3 + 100)
+    from_ts, to_ts = NOON + 500, NOON + BLOCK_RECORDS * 3 + 50
+
+    result = list(query_ticks(str(tmp_path), 'hc2601', from_ts, to_ts))
+
+    expected = [q for q in quotes if q.instrument_id == 'hc2601' and from_ts <= q.ts <= to_ts]
+    assert as_tuples(result) == as_tuples(expected)
+    assert result[0].ts >= from_ts and result[-1].ts <= to_ts
+
+
+def test_query_outside_range_or_unknown_instrument_is_empty(tmp_path):
+    write_ticks(tmp_path, BLOCK_RECORDS * 2)
+
+    assert list(query_ticks(str(tmp_path), 'rb2601', NOON - 10_000, NOON - 1)) == []
+    assert list(query_ticks(str(tmp_path), 'au2612', NOON, NOON + BLOCK_RECORDS * 2)) == []
+    assert list(query_ticks(str(tmp_path / 'missing'), 'rb2601', NOON, NOON + 10)) == []
+
+
+def test_reopened_segment_appends_and_stays_queryable(tmp_path):
+    first = write_ticks(tmp_path, BLOCK_RECORDS + 10)
+    second = write_ticks(tmp_path, BLOCK_RECORDS + 10, start_ts=NOON + 10_000)
+
+    [segment] = list_segments(str(tmp_path))
+    assert read_count(segment) == len(first) + len(second)
+    result = list(query_ticks(str(tmp_path), 'i2601', NOON, NOON + 20_000))
+    assert as_tuples(result) == as_tuples(q for q in first + second if q.instrument_id == 'i2601')
+
+
+def test_query_spans_daily_segments(tmp_path):
+    day = 24 * 3600 * 1000
+    write_ticks(tmp_path, 30)
+    write_ticks(tmp_path, 30, start_ts=NOON + day)
+
+    assert len(list_segments(str(tmp_path))) == 2
+    result = list(query_ticks(str(tmp_path), 'rb2601', NOON, NOON + day + 29))
+    assert len(result) == 20
+    assert [q.ts for q in result] == sorted(q.ts for q in result)
@@ -0,0 +1,470 @@
+"""
+逐笔行情日志
+把收到的每笔行情以定长二进制记录追加到按日切分的内存映射文件中。
+行情线程只做打包和入队，由后台线程批量写入映射区并刷盘，行情路径不会等待磁盘。
+
+文件格式：64字节文件头 + 连续的定长记录
+    文件头：magic(8) 版本(uint32) 记录长度(uint32) 记录数(uint64) 保留
+    记录：见 RECORD
+
+每个日志文件旁有一个稀疏索引文件（.idx），每写满 BLOCK_RECORDS 条记录追加一行JSON：
+    {"b": 块序号, "t0": 块内最小ts, "t1": 块内最大ts, "i": [块内出现的合约]}
+按时间和合约查询时只读取相关的块。
+"""
+
+import bisect
+import json
+import mmap
+import os
+import struct
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Iterator, Optional
+
+import numpy as np
+from loguru import logger
+
+from quote import Quote
+
+MAGIC = b'CTPTICK1'
+VERSION = 1
+HEADER = struct.Struct('<8sIIQ')
+HEADER_SIZE = 64
+COUNT_OFFSET = 16
+
+# ts(ms) instrumentId lastPrice change changePercent volume updateTime updateMillisec
+RECORD = struct.Struct('<q32sdddq8si4x')
+RECORD_SIZE = RECORD.size
+
+# 与 RECORD 相同布局的NumPy结构化类型，用于向量化筛选
+RECORD_DTYPE = np.dtype([
+    ('ts', '<i8'),
+    ('instrument_id', 'S32'),
+    ('last_price', '<f8'),
+    ('change', '<f8'),
+    ('change_percent', '<f8'),
+    ('volume', '<i8'),
+    ('update_time', 'S8'),
+    ('update_millisec', '<i4'),
+    ('pad', 'V4'),
+])
+assert RECORD_DTYPE.itemsize == RECORD_SIZE
+
+SEGMENT_PREFIX = 'ticks-'
+SEGMENT_SUFFIX = '.bin'
+INDEX_SUFFIX = '.idx'
+BLOCK_RECORDS = 1024
+
+
+def pack_quote(quote: Quote) -> bytes:
+    """把行情打包为定长记录"""
+    return RECORD.pack(
+        quote.ts,
+        quote.instrument_id.encode(),
+        quote.last_price,
+        quote.change,
+        quote.change_percent,
+        quote.volume,
+        quote.update_time.encode(),
+        quote.update_millisec
+    )
+
+
+def unpack_quote(record: tuple) -> Quote:
+    """把解包后的记录还原为行情"""
+    ts, instrument_id, last_price, change, change_percent, volume, update_time, update_millisec = record
+    return Quote(
+        instrument_id.rstrip(b'\0').decode(),
+        last_price,
+        change,
+        change_percent,
+        volume,
+        update_time.rstrip(b'\0').decode(),
+        update_millisec,
+        ts
+    )
+
+
+def segment_day(ts: int) -> str:
+    """行情时间戳所属的日期（本地时间）"""
+    return time.strftime('%Y%m%d', time.localtime(ts / 1000))
+
+
+def segment_path(directory: str, day: str) -> Path:
+    """日期对应的日志文件路径"""
+    return Path(directory) / f"{SEGMENT_PREFIX}{day}{SEGMENT_SUFFIX}"
+
+
+def index_path(path: Path) -> Path:
+    """日志文件对应的索引文件路径"""
+    return path.with_suffix(INDEX_SUFFIX)
+
+
+def list_segments(directory: str) -> list[Path]:
+    """按日期顺序列出日志文件"""
+    path = Path(directory)
+    if not path.is_dir():
+        return []
+    return sorted(path.glob(f"{SEGMENT_PREFIX}*{SEGMENT_SUFFIX}"))
+
+
+class _Segment:
+    """一个按日切分的日志文件及其内存映射"""
+
+    def __init__(self, path: Path, initial_bytes: int):
+        self.path = path
+        exists = path.exists() and path.stat().st_size >= HEADER_SIZE
+        self.file = open(path, 'r+b' if exists else 'w+b')
+        if not exists:
+            # 稀疏文件，按需占用磁盘
+            self.file.truncate(max(initial_bytes, HEADER_SIZE + RECORD_SIZE))
+        self.size = os.fstat(self.file.fileno()).st_size
+        self.map = mmap.mmap(self.file.fileno(), self.size)
+
+        if exists:
+            magic, version, record_size, count = HEADER.unpack_from(self.map, 0)
+            if magic != MAGIC or record_size != RECORD_SIZE:
+                raise ValueError(f"Incompatible tick journal segment: {path}")
+            self.count = count
+        else:
+            HEADER.pack_into(self.map, 0, MAGIC, VERSION, RECORD_SIZE, 0)
+            self.count = 0
+
+        # 当前未写满的块的索引状态
+        self.block_t0 = 0
+        self.block_t1 = 0
+        self.block_instruments: set[str] = set()
+        if exists:
+            self._recover_index()
+        else:
+            self.index_file = open(index_path(path), 'w')
+
+    def write(self, records: list[tuple[int, str, bytes]]):
+        """在末尾写入若干条记录，更新文件头中的记录数和稀疏索引"""
+        data = b''.join(record for _, _, record in records)
+        offset = HEADER_SIZE + self.count * RECORD_SIZE
+        end = offset + len(data)
+        if end > self.size:
+            self._grow(end)
+        self.map[offset:end] = data
+
+        number = self.count
+        self.count += len(records)
+        struct.pack_into('<Q', self.map, COUNT_OFFSET, self.count)
+        for ts, instrument_id, _ in records:
+            self._index(number, ts, instrument_id)
+            number += 1
+
+    def flush(self):
+        self.map.flush()
+        self.index_file.flush()
+
+    def close(self):
+        self.map.flush()
+        self.map.close()
+        self.file.close()
+        self.index_file.close()
+
+    def _index(self, number: int, ts: int, instrument_id: str):
+        """把一条记录计入所在块，块写满时追加索引行"""
+        if number % BLOCK_RECORDS == 0:
+            self.block_t0 = self.block_t1 = ts
+            self.block_instruments = set()
+        elif ts < self.block_t0:
+            self.block_t0 = ts
+        elif ts > self.block_t1:
+            self.block_t1 = ts
+        self.block_instruments.add(instrument_id)
+        if number % BLOCK_RECORDS == BLOCK_RECORDS - 1:
+            entry = {
+                "b": number // BLOCK_RECORDS,
+                "t0": self.block_t0,
+                "t1": self.block_t1,
+                "i": sorted(self.block_instruments),
+            }
+            self.index_file.write(json.dumps(entry, separators=(',', ':')) + '\n')
+
+    def _recover_index(self):
+        """重新打开已有文件时，去掉不完整的索引行，补齐缺失的索引行并恢复未写满块的状态"""
+        index = SegmentIndex(self.path)
+        self.index_file = open(index_path(self.path), 'a')
+        self.index_file.truncate(index.offset)
+        start = len(index.t0s) * BLOCK_RECORDS
+        for number, record in enumerate(iter_records(self.path, start, self.count), start):
+            self._index(number, record[0], record[1].rstrip(b'\0').decode())
+        self.index_file.flush()
+
+    def _grow(self, required: int):
+        """按倍数扩大文件并重新映射"""
+        size = self.size
+        while size < required:
+            size *= 2
+        self.map.flush()
+        self.map.close()
+        self.file.truncate(size)
+        self.size = size
+        self.map = mmap.mmap(self.file.fileno(), self.size)
+
+
+class TickJournal:
+    """逐笔行情日志写入类"""
+
+    def __init__(self, directory: str = 'journal', segment_bytes: int = 64 * 1024 * 1024,
+                 flush_interval_ms: int = 200):
+        """
+        初始化行情日志
+
+        Args:
+            directory: 日志目录
+            segment_bytes: 新建日志文件的初始大小（字节），写满后按倍数扩大
+            flush_interval_ms: 后台线程批量写入的间隔（毫秒）
+        """
+        self.directory = directory
+        self.segment_bytes = segment_bytes
+        self.flush_interval = flush_interval_ms / 1000.0
+
+        # 待写入的记录（行情线程写入，后台线程取走）
+        self.pending: list[tuple[int, str, bytes]] = []
+        self.lock = threading.Lock()
+
+        self.segment: Optional[_Segment] = None
+        self.segment_day: Optional[str] = None
+        self.writer_thread: Optional[threading.Thread] = None
+        self.stop_event = threading.Event()
+
+        # 统计计数
+        self.appended_count = 0
+        self.written_count = 0
+        self.batch_count = 0
+        self.error_count = 0
+
+    def start(self):
+        """启动后台写入线程"""
+        os.makedirs(self.directory, exist_ok=True)
+        if self.writer_thread and self.writer_thread.is_alive():
+            return
+        self.stop_event.clear()
+        self.writer_thread = threading.Thread(target=self._writer_loop, name='tick-journal', daemon=True)
+        self.writer_thread.start()
+        logger.info(f"Tick journal started: {self.directory}")
+
+    def append(self, quote: Quote):
+        """追加一笔行情（可在行情线程调用，不阻塞）"""
+        record = pack_quote(quote)
+        with self.lock:
+            self.pending.append((quote.ts, quote.instrument_id, record))
+            self.appended_count += 1
+
+    def close(self):
+        """写入剩余记录并关闭文件"""
+        self.stop_event.set()
+        if self.writer_thread and self.writer_thread.is_alive():
+            self.writer_thread.join(timeout=5)
+        self._write_pending()
+        if self.segment:
+            self.segment.close()
+            self.segment = None
+        logger.info("Tick journal closed")
+
+    def get_stats(self) -> dict:
+        """获取日志统计"""
+        with self.lock:
+            pending = len(self.pending)
+        return {
+            "appended": self.appended_count,
+            "written": self.written_count,
+            "pending": pending,
+            "batches": self.batch_count,
+            "errors": self.error_count,
+            "segment": str(self.segment.path) if self.segment else None,
+        }
+
+    def _writer_loop(self):
+        while not self.stop_event.wait(self.flush_interval):
+            self._write_pending()
+
+    def _write_pending(self):
+        """批量写入待写记录，跨日时切换日志文件"""
+        with self.lock:
+            if not self.pending:
+                return
+            pending = self.pending
+            self.pending = []
+
+        try:
+            start = 0
+            while start < len(pending):
+                day = segment_day(pending[start][0])
+                end = start + 1
+                # 同一天的连续记录一次写入
+                if segment_day(pending[-1][0]) == day:
+                    end = len(pending)
+                else:
+                    while end < len(pending) and segment_day(pending[end][0]) == day:
+                        end += 1
+                segment = self._get_segment(day)
+                segment.write(pending[start:end])
+                self.written_count += end - start
+                start = end
+            self.segment.flush()
+            self.batch_count += 1
+        except Exception as e:
+            self.error_count += 1
+            logger.error(f"Error writing tick journal: {e}")
+
+    def _get_segment(self, day: str) -> _Segment:
+        """获取某天的日志文件，日期变化时关闭旧文件"""
+        if self.segment is not None and self.segment_day == day:
+            return self.segment
+        if self.segment is not None:
+            self.segment.close()
+        self.segment = _Segment(segment_path(self.directory, day), self.segment_bytes)
+        self.segment_day = day
+        logger.info(f"Tick journal segment opened: {self.segment.path} ({self.segment.count} records)")
+        return self.segment
+
+
+def read_count(path: Path) -> int:
+    """读取日志文件中的记录数"""
+    with open(path, 'rb') as f:
+        magic, version, record_size, count = HEADER.unpack(f.read(HEADER.size))
+    if magic != MAGIC or record_size != RECORD_SIZE:
+        raise ValueError(f"Incompatible tick journal segment: {path}")
+    return count
+
+
+def iter_records(path: Path, start: int = 0, stop: Optional[int] = None) -> Iterator[tuple]:
+    """
+    逐条读取日志文件中的原始记录
+
+    Args:
+        path: 日志文件
+        start: 起始记录序号
+        stop: 结束记录序号（不含），默认到文件头记录数为止
+
+    Yields:
+        RECORD 解包后的元组，字符串字段为补零的bytes
+    """
+    count = read_count(path)
+    stop = count if stop is None else min(stop, count)
+    if start >= stop:
+        return
+    with open(path, 'rb') as f:
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as view:
+            begin = HEADER_SIZE + start * RECORD_SIZE
+            end = HEADER_SIZE + stop * RECORD_SIZE
+            buffer = memoryview(view)[begin:end]
+            try:
+                yield from RECORD.iter_unpack(buffer)
+            finally:
+                buffer.release()
+
+
+def iter_quotes(path: Path, start: int = 0, stop: Optional[int] = None) -> Iterator[Quote]:
+    """逐笔读取日志文件中的行情"""
+    for record in iter_records(path, start, stop):
+        yield unpack_quote(record)
+
+
+class SegmentIndex:
+    """日志文件的稀疏索引（只读），支持增量读取新追加的索引行"""
+
+    def __init__(self, path: Path):
+        self.path = index_path(path)
+        self.t0s: list[int] = []
+        # t1 的前缀最大值，保证时间戳轻微回退时二分查找仍然有效
+        self.t1_maxes: list[int] = []
+        self.instruments: list[frozenset] = []
+        self.offset = 0
+        self.refresh()
+
+    def refresh(self):
+        """读取上次之后新追加的完整索引行"""
+        if not self.path.exists():
+            return
+        with open(self.path, 'rb') as f:
+            f.seek(self.offset)
+            data = f.read()
+        for line in data.splitlines(keepends=True):
+            if not line.endswith(b'\n'):
+                break
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                break
+            if entry['b'] != len(self.t0s):
+                break
+            self.t0s.append(entry['t0'])
+            self.t1_maxes.append(max(entry['t1'], self.t1_maxes[-1]) if self.t1_maxes else entry['t1'])
+            self.instruments.append(frozenset(entry['i']))
+            self.offset += len(line)
+
+    def find_blocks(self, instrument_id: str, from_ts: int, to_ts: int) -> list[int]:
+        """时间范围内含有该合约的块序号"""
+        first = bisect.bisect_left(self.t1_maxes, from_ts)
+        last = bisect.bisect_right(self.t0s, to_ts)
+        return [block for block in range(first, last) if instrument_id in self.instruments[block]]
+
+
+_index_cache: Dict[Path, SegmentIndex] = {}
+
+
+def _get_index(path: Path) -> SegmentIndex:
+    index = _index_cache.get(path)
+    if index is None:
+        index = _index_cache[path] = SegmentIndex(path)
+    else:
+        index.refresh()
+    return index
+
+
+def query_segment(path: Path, instrument_id: str, from_ts: int, to_ts: int,
+                  max_run_blocks: int = 64) -> Iterator[Quote]:
+    """
+    按合约和时间范围查询一个日志文件
+
+    已索引的部分只读取相关的块，未写满索引的尾部直接扫描；
+    块内用NumPy向量化筛选，结果按块逐段产出，不一次性载入内存
+    """
+    count = read_count(path)
+    index = _get_index(path)
+    indexed = min(len(index.t0s) * BLOCK_RECORDS, count)
+
+    # 相关块合并为连续区间，区间长度有上限
+    ranges: list[tuple[int, int]] = []
+    for block in index.find_blocks(instrument_id, from_ts, to_ts):
+        start = block * BLOCK_RECORDS
+        if ranges and ranges[-1][1] == start and start - ranges[-1][0] < max_run_blocks * BLOCK_RECORDS:
+            ranges[-1] = (ranges[-1][0], start + BLOCK_RECORDS)
+        else:
+            ranges.append((start, start + BLOCK_RECORDS))
+    tail_start = indexed
+    while tail_start < count:
+        tail_end = min(tail_start + max_run_blocks * BLOCK_RECORDS, count)
+        ranges.append((tail_start, tail_end))
+        tail_start = tail_end
+    if not ranges:
+        return
+
+    key = instrument_id.encode()
+    with open(path, 'rb') as f:
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as view:
+            for start, stop in ranges:
+                records = np.frombuffer(view, dtype=RECORD_DTYPE, count=stop - start,
+                                        offset=HEADER_SIZE + start * RECORD_SIZE)
+                ts = records['ts']
+                matched = records[(records['instrument_id'] == key) & (ts >= from_ts) & (ts <= to_ts)].tolist()
+                del records, ts
+                for record in matched:
+                    yield unpack_quote(record[:8])
+
+
+def query_ticks(directory: str, instrument_id: str, from_ts: int, to_ts: int) -> Iterator[Quote]:
+    """按合约和时间范围（毫秒，含两端）查询逐笔行情，跨日时依次查询各日文件"""
+    first_day = segment_day(from_ts)
+    last_day = segment_day(to_ts)
+    for path in list_segments(directory):
+        day = path.name[len(SEGMENT_PREFIX):-len(SEGMENT_SUFFIX)]
+        if first_day <= day <= last_day:
+            yield from query_segment(path, instrument_id, from_ts, to_ts)
@@ -0,0 +1,61 @@
+"""
+行情推送编码
+默认使用JSON（由Socket.IO序列化字典）；客户端可协商使用MessagePack二进制编码，
+此时单笔行情按 Quote.FIELDS 的固定顺序编码为数组，省去字段名；
+客户端配置了扩展字段组时，扩展字段以对象形式作为数组的最后一个元素
+"""
+
+from typing import Any, Iterable
+
+from loguru import logger
+
+from quote import Quote
+
+try:
+    import msgpack
+except ImportError:  # MessagePack 为可选依赖
+    msgpack = None
+
+ENCODING_JSON = 'json'
+ENCODING_MSGPACK = 'msgpack'
+
+
+def is_msgpack_available() -> bool:
+    """是否安装了 msgpack"""
+    return msgpack is not None
+
+
+def negotiate_encoding(requested: Any) -> str:
+    """根据客户端请求确定推送编码，不支持时回退到JSON"""
+    if requested == ENCODING_MSGPACK:
+        if is_msgpack_available():
+            return ENCODING_MSGPACK
+        logger.warning("MessagePack encoding requested but msgpack is not installed, using JSON")
+    return ENCODING_JSON
+
+
+def _to_row(quote: Quote, groups: tuple) -> tuple:
+    if groups:
+        return (*quote.to_row(), quote.get_extra(groups))
+    return quote.to_row()
+
+
+def encode_quote(quote: Quote, encoding: str, payload: dict = None, groups: tuple = ()) -> Any:
+    """编码单笔行情，JSON编码时可传入已转换的字典复用；groups 为需要的扩展字段组"""
+    if encoding == ENCODING_MSGPACK:
+        return msgpack.packb(_to_row(quote, groups))
+    return payload if payload is not None else quote.to_dict(groups)
+
+
+def encode_quotes(quotes: Iterable[Quote], encoding: str, groups: tuple = ()) -> Any:
+    """编码一批行情"""
+    if encoding == ENCODING_MSGPACK:
+        return msgpack.packb([_to_row(quote, groups) for quote in quotes])
+    return [quote.to_dict(groups) for quote in quotes]
+
+
+def encode_entries(entries: list[dict], encoding: str) -> Any:
+    """编码一批字典记录（如增量记录）"""
+    if encoding == ENCODING_MSGPACK:
+        return msgpack.packb(entries)
+    return entries
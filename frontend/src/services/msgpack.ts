@@ -0,0 +1,86 @@
+// src/services/msgpack.ts
+/* Minimal MessagePack decoder for binary quote payloads (nil/bool/int/float/str/bin/array/map) */
+
+const textDecoder = new TextDecoder();
+
+export function decodeMsgpack(data: ArrayBuffer | Uint8Array): any {
+  const bytes = data instanceof Uint8Array ? data : new Uint8Array(data);
+  const view = new DataView(bytes.buffer, bytes.byteOffset, bytes.byteLength);
+  let offset = 0;
+
+  const u8 = () => view.getUint8(offset++);
+  const u16 = () => {
+    const value = view.getUint16(offset);
+    offset += 2;
+    return value;
+  };
+  const u32 = () => {
+    const value = view.getUint32(offset);
+    offset += 4;
+    return value;
+  };
+  const fixed = (value: number, size: number) => {
+    offset += size;
+    return value;
+  };
+  const str = (length: number) => {
+    const value = textDecoder.decode(bytes.subarray(offset, offset + length));
+    offset += length;
+    return value;
+  };
+  const bin = (length: number) => {
+    const value = bytes.slice(offset, offset + length);
+    offset += length;
+    return value;
+  };
+  const array = (length: number) => {
+    const value = new Array(length);
+    for (let i = 0; i < length; i++) value[i] = read();
+    return value;
+  };
+  const map = (length: number) => {
+    const value: Record<string, any> = {};
+    for (let i = 0; i < length; i++) {
+      const key = read();
+      value[String(key)] = read();
+    }
+    return value;
+  };
+
+  function read(): any {
+    const type = u8();
+    if (type <= 0x7f) return type;
+    if (type >= 0xe0) return type - 0x100;
+    if ((type & 0xf0) === 0x80) return map(type & 0x0f);
+    if ((type & 0xf0) === 0x90) return array(type & 0x0f);
+    if ((type & 0xe0) === 0xa0) return str(type & 0x1f);
+    switch (type) {
+      case 0xc0: return null;
+      case 0xc2: return false;
+      case 0xc3: return true;
+      case 0xc4: return bin(u8());
+      case 0xc5: return bin(u16());
+      case 0xc6: return bin(u32());
+      case 0xca: return fixed(view.getFloat32(offset), 4);
+      case 0xcb: return fixed(view.getFloat64(offset), 8);
+      case 0xcc: return u8();
+      case 0xcd: return u16();
+      case 0xce: return u32();
+      case 0xcf: return fixed(Number(view.getBigUint64(offset)), 8);
+      case 0xd0: return fixed(view.getInt8(offset), 1);
+      case 0xd1: return fixed(view.getInt16(offset), 2);
+      case 0xd2: return fixed(view.getInt32(offset), 4);
+      case 0xd3: return fixed(Number(view.getBigInt64(offset)), 8);
+      case 0xd9: return str(u8());
+      case 0xda: return str(u16());
+      case 0xdb: return str(u32());
+      case 0xdc: return array(u16());
+      case 0xdd: return array(u32());
+      case 0xde: return map(u16());
+      case 0xdf: return map(u32());
+    }
+    throw new Error(`Unsupported MessagePack type 0x${type.toString(16)}`);
+  }
+
+  return read();
+}
@@ -1,188 +1,198 @@
 // src/services/websocket.ts
-/* Simple WebSocket client with heartbeat, auto-reconnect and event emitter */
+/* Socket.IO client for the quote server with auto-reconnect, opt-in push modes and event emitter */
+import { io, type Socket } from "socket.io-client";
+import { decodeMsgpack } from "./msgpack";
+
 export type WsEventHandler = (...args: any[]) => void;
 
+export interface SimpleWSOptions {
+  /** 批量接收行情：服务端每个推送间隔合并为一条 quotes 消息 */
+  batchQuotes?: boolean;
+  /** 增量接收行情：服务端只发送变化的字段，本地合并出完整行情 */
+  deltaQuotes?: boolean;
+  /** MessagePack 二进制推送（服务端未安装 msgpack 时回退到 JSON） */
+  msgpack?: boolean;
+  /** 需要的扩展字段组：top（一档盘口）、depth（五档盘口）、stats（当日统计）、limits（涨跌停价） */
+  fields?: Array<"top" | "depth" | "stats" | "limits">;
+}
+
+/** 由 SimpleWS 转成逐笔 quote 事件的行情事件，其余服务端事件原样转发 */
+const QUOTE_EVENTS = new Set(["quote", "quotes", "snapshot", "quote_delta"]);
+
+/** MessagePack 行情数组的字段顺序（与服务端 Quote.FIELDS 相同），扩展字段为最后一个元素 */
+const QUOTE_FIELDS = [
+  "instrumentId",
+  "lastPrice",
+  "change",
+  "changePercent",
+  "volume",
+  "updateTime",
+  "updateMillisec",
+  "ts"
+];
+
+const decode = (payload: any) =>
+  payload instanceof ArrayBuffer || ArrayBuffer.isView(payload)
+    ? decodeMsgpack(payload instanceof ArrayBuffer ? payload : new Uint8Array(payload.buffer, payload.byteOffset, payload.byteLength))
+    : payload;
+
+/** 行情负载转为字典：JSON 推送已是字典，MessagePack 推送为按 QUOTE_FIELDS 排列的数组 */
+const toQuote = (row: any): Record<string, any> => {
+  if (!Array.isArray(row)) return row;
+  const quote: Record<string, any> = {};
+  QUOTE_FIELDS.forEach((field, i) => (quote[field] = row[i]));
+  if (row.length > QUOTE_FIELDS.length && row[QUOTE_FIELDS.length]) Object.assign(quote, row[QUOTE_FIELDS.length]);
+  return quote;
+};
+
 export class SimpleWS {
-  private ws: WebSocket | null = null;
+  private socket: Socket | null = null;
   private url: string;
-  private reconnectDelay = 5000; // 增加重连延迟到5秒
-  private reconnectTimer: number | null = null;
-  private heartbeatInterval = 30000; // 增加心跳间隔到30秒
-  private heartbeatTimer: number | null = null;
-  private pingTimeoutTimer: number | null = null;
   private eventMap = new Map<string, WsEventHandler[]>();
-  private reconnectAttempts = 0;
-  private maxReconnectAttempts = 5; // 最大重连次数
+  private options: SimpleWSOptions;
+  private deltaQuotes = new Map<number, Record<string, any>>(); // 合约序号 k -> 完整行情
+  private resyncPending = false;
   public status = {
     connected: false,
     connecting: false,
-    readyState: WebSocket.CLOSED,
     url: ""
   };
 
-  constructor(url: string) {
+  constructor(url: string, options: SimpleWSOptions = {}) {
     this.url = url;
     this.status.url = url;
+    this.options = options;
   }
 
   connect() {
-    // 防止重复连接
-    if (this.status.connecting || this.status.connected) {
-      console.log("WebSocket already connecting or connected");
+    if (this.socket) {
+      if (!this.socket.connected) this.socket.connect();
       return;
     }
 
-    this.clearReconnectTimer();
     this.status.connecting = true;
-    this.reconnectAttempts++;
-
-    try {
-      this.ws = new WebSocket(this.url);
-      this.status.readyState = WebSocket.CONNECTING;
+    this.emit("status", { ...this.status });
+    // 多进程部署的工作进程只接受 websocket 传输
+    const socket = io(this.url, {
+      transports: ["websocket"],
+      auth: this.options.msgpack ? { encoding: "msgpack" } : {},
+      reconnectionDelay: 1000,
+      reconnectionDelayMax: 5000
+    });
+    this.socket = socket;
+
+    socket.on("connect", () => this.handleOpen());
+    socket.on("disconnect", (reason) => this.handleClose(reason));
+    socket.on("connect_error", (err) => this.emit("error", err));
+    socket.io.on("reconnect_attempt", (attempt) => {
+      this.status.connecting = true;
+      this.emit("reconnect", attempt);
       this.emit("status", { ...this.status });
-      this.ws.onopen = () => this.handleOpen();
-      this.ws.onmessage = (ev) => this.handleMessage(ev);
-      this.ws.onclose = (ev) => this.handleClose(ev);
-      this.ws.onerror = (ev) => this.handleError(ev);
-    } catch (err) {
-      this.status.connecting = false;
-      this.scheduleReconnect();
-      console.error("WebSocket connect error", err);
-    }
+    });
+
+    socket.on("quote", (payload) => this.emit("quote", toQuote(decode(payload))));
+    // 批量行情和连接快照拆成逐笔 quote 事件，已有的监听无需改动
+    socket.on("quotes", (payload) => this.handleQuotes("quotes", payload));
+    socket.on("snapshot", (payload) => this.handleQuotes("snapshot", payload));
+    socket.on("quote_delta", (payload) => this.handleDelta(payload));
+    socket.onAny((event, ...args) => {
+      if (!QUOTE_EVENTS.has(event)) this.emit(event, ...args);
+    });
   }
 
   private handleOpen() {
-    this.status = { connected: true, connecting: false, readyState: WebSocket.OPEN, url: this.url };
-    this.reconnectAttempts = 0; // 重置重连次数
+    this.status = { connected: true, connecting: false, url: this.url };
+    // 新连接从全量开始
+    this.deltaQuotes.clear();
+    this.resyncPending = false;
+    const config: Record<string, any> = {};
+    if (this.options.deltaQuotes) config.mode = "delta";
+    else if (this.options.batchQuotes) config.mode = "batch";
+    if (this.options.fields?.length) config.fields = this.options.fields;
+    if (Object.keys(config).length) {
+      this.socket?.emit("configure", config, (result: any) => this.emit("configured", result));
+    }
     this.emit("open");
     this.emit("status", { ...this.status });
-    this.startHeartbeat();
-    console.log("WebSocket connected successfully");
-  }
-
-  private handleMessage(ev: MessageEvent) {
-    // Try parse JSON, else pass raw
-    let parsed: any = null;
-    try {
-      parsed = JSON.parse(ev.data);
-    } catch {
-      // raw
-    }
-
-    if (parsed && parsed.type === "pong") {
-      // pong response
-      this.clearPingTimeout();
-      console.log("Received pong");
-      return;
-    }
-
-    // emit generic message and type-based
-    this.emit("message", parsed ?? ev.data);
-    if (parsed && parsed.type) {
-      this.emit(parsed.type, parsed.data ?? parsed);
-    }
   }
 
-  private handleClose(ev: CloseEvent) {
-    this.status = { connected: false, connecting: false, readyState: WebSocket.CLOSED, url: this.url };
-    this.emit("close", ev);
+  private handleClose(reason: string) {
+    this.status = { connected: false, connecting: this.socket?.active ?? false, url: this.url };
+    this.emit("close", reason);
     this.emit("status", { ...this.status });
-    this.stopHeartbeat();
-
-    // 只有在达到最大重连次数时才停止重连
-    if (this.reconnectAttempts < this.maxReconnectAttempts) {
-      this.scheduleReconnect();
-    } else {
-      console.warn("Max reconnect attempts reached, stopping reconnection");
-    }
   }
 
-  private handleError(ev: Event) {
-    this.emit("error", ev);
-    // let onclose handle the reconnect path
+  private handleQuotes(event: string, payload: any) {
+    const quotes = (decode(payload) as any[]).map(toQuote);
+    this.emit(event, quotes);
+    for (const quote of quotes) this.emit("quote", quote);
   }
 
-  send(obj: any) {
-    if (this.ws && this.ws.readyState === WebSocket.OPEN) {
-      const payload = typeof obj === "string" ? obj : JSON.stringify(obj);
-      this.ws.send(payload);
-      return true;
-    } else {
-      this.emit("warn", "ws-not-open");
-      return false;
+  // 增量行情按合约序号合并为完整行情；全量记录带 instrumentId
+  private handleDelta(payload: any) {
+    for (const entry of decode(payload) as Record<string, any>[]) {
+      const { k, ...fields } = entry;
+      const known = this.deltaQuotes.get(k);
+      if (!fields.instrumentId && !known) {
+        // 未知序号说明状态已不一致，请求全量（回复前不重复请求）
+        this.resync();
+        continue;
+      }
+      const quote = fields.instrumentId ? fields : Object.assign(known!, fields);
+      this.deltaQuotes.set(k, quote);
+      this.emit("quote", { ...quote });
     }
   }
 
-  close() {
-    this.clearReconnectTimer();
-    this.stopHeartbeat();
-    if (this.ws) {
-      try { this.ws.close(); } catch { }
-      this.ws = null;
-    }
-    this.status = { connected: false, connecting: false, readyState: WebSocket.CLOSED, url: this.url };
-    this.emit("status", { ...this.status });
-    console.log("WebSocket closed");
+  /** 请求服务端重新发送全部关注合约的全量行情 */
+  resync() {
+    if (this.resyncPending || !this.socket?.connected) return;
+    this.resyncPending = true;
+    this.socket.emit("resync", (result: any) => {
+      this.resyncPending = false;
+      this.emit("resynced", result);
+    });
   }
 
-  // Heartbeat: send ping and expect pong
-  private startHeartbeat() {
-    this.stopHeartbeat();
-    console.log(`Starting heartbeat with ${this.heartbeatInterval}ms interval`);
-
-    this.heartbeatTimer = window.setInterval(() => {
-      if (!this.ws || this.ws.readyState !== WebSocket.OPEN) return;
-
-      try {
-        this.send({ type: "ping" });
-        console.log("Sent ping");
-
-        // set a ping timeout - if not cleared by pong in time, force close to trigger reconnect
-        this.clearPingTimeout();
-        this.pingTimeoutTimer = window.setTimeout(() => {
-          console.warn("Ping timeout - closing socket to trigger reconnect");
-          this.ws?.close();
-        }, this.heartbeatInterval); // use same interval for simplicity
-      } catch (err) {
-        console.error("Heartbeat send error", err);
-      }
-    }, this.heartbeatInterval);
+  /** 订阅合约行情（服务端按合约房间推送），返回各合约的订阅结果 */
+  subscribe(instrumentIds: string[]) {
+    return this.request("subscribe", { instrumentIds });
   }
 
-  private stopHeartbeat() {
-    if (this.heartbeatTimer) {
-      clearInterval(this.heartbeatTimer);
-      this.heartbeatTimer = null;
-      console.log("Heartbeat stopped");
-    }
-    this.clearPingTimeout();
+  unsubscribe(instrumentIds: string[]) {
+    return this.request("unsubscribe", { instrumentIds });
   }
 
-  private clearPingTimeout() {
-    if (this.pingTimeoutTimer) {
-      clearTimeout(this.pingTimeoutTimer);
-      this.pingTimeoutTimer = null;
+  /** 发送事件并等待服务端回复，未连接时返回 null */
+  async request(event: string, data?: any): Promise<any> {
+    if (!this.socket?.connected) {
+      this.emit("warn", "ws-not-open");
+      return null;
     }
+    return data === undefined ? this.socket.emitWithAck(event) : this.socket.emitWithAck(event, data);
   }
 
-  // Reconnect
-  private scheduleReconnect() {
-    if (this.reconnectTimer != null) return;
-
-    console.log(`Scheduling reconnect in ${this.reconnectDelay}ms (attempt ${this.reconnectAttempts}/${this.maxReconnectAttempts})`);
-
-    this.reconnectTimer = window.setTimeout(() => {
-      this.reconnectTimer = null;
-      this.connect();
-      this.emit("reconnect");
-    }, this.reconnectDelay);
+  send(event: string, data?: any) {
+    if (this.socket?.connected) {
+      if (data === undefined) this.socket.emit(event);
+      else this.socket.emit(event, data);
+      return true;
+    } else {
+      this.emit("warn", "ws-not-open");
+      return false;
+    }
   }
 
-  private clearReconnectTimer() {
-    if (this.reconnectTimer != null) {
-      clearTimeout(this.reconnectTimer);
-      this.reconnectTimer = null;
+  close() {
+    if (this.socket) {
+      this.socket.removeAllListeners();
+      this.socket.io.removeAllListeners();
+      this.socket.disconnect();
+      this.socket = null;
     }
+    this.status = { connected: false, connecting: false, url: this.url };
+    this.emit("status", { ...this.status });
+    console.log("Socket.IO connection closed");
   }
 
   // event emitter
@@ -210,4 +220,5 @@ export class SimpleWS {
 }
 
 /* Export a singleton factory helper (you can change URL via param) */
-export const createSimpleWS = (url?: string) => new SimpleWS(url ?? (localStorage.getItem("backendUrl") || "ws://127.0.0.1:5004/ws"));
+export const createSimpleWS = (url?: string, options?: SimpleWSOptions) =>
+  new SimpleWS(url ?? (localStorage.getItem("backendUrl") || "http://127.0.0.1:5004"), options);
@@ -6,13 +6,16 @@ import { computed, ref } from "vue";
 
 export const useWsStore = defineStore("ws", () => {
   // 单例 SimpleWS
-  const url = localStorage.getItem("backendUrl") || "ws://127.0.0.1:5004/ws";
-  const client: SimpleWS = createSimpleWS(url);
+  const url = localStorage.getItem("backendUrl") || "http://127.0.0.1:5004";
+  const client: SimpleWS = createSimpleWS(url, {
+    batchQuotes: localStorage.getItem("batchQuotes") === "true",
+    deltaQuotes: localStorage.getItem("deltaQuotes") === "true",
+    msgpack: localStorage.getItem("msgpackQuotes") === "true"
+  });
 
   // state
   const connected = ref<boolean>(false);
   const connecting = ref<boolean>(false);
-  const readyState = ref<number>(WebSocket.CLOSED);
   const subscribedInstruments = ref<string[]>([]);
   const lastQuote = ref<any | null>(null);
 
@@ -20,7 +23,6 @@ export const useWsStore = defineStore("ws", () => {
   const status = computed(() => ({
     connected: connected.value,
     connecting: connecting.value,
-    readyState: readyState.value,
     url
   }));
 
@@ -28,24 +30,20 @@ export const useWsStore = defineStore("ws", () => {
   client.on("open", () => {
     connected.value = true;
     connecting.value = false;
-    readyState.value = WebSocket.OPEN;
     client.emit("status", status.value);
+    // 重连后一次性重新加入全部合约房间
+    if (subscribedInstruments.value.length) {
+      client.subscribe([...subscribedInstruments.value]);
+    }
   });
   client.on("close", () => {
     connected.value = false;
-    connecting.value = false;
-    readyState.value = WebSocket.CLOSED;
+    connecting.value = client.status.connecting;
     client.emit("status", status.value);
   });
   client.on("reconnect", () => {
     connecting.value = true;
   });
-  client.on("message", (msg: any) => {
-    // generic messages
-    // if msg has type 'quote' it will be emitted separately below
-    // For safety, update lastQuote if it's quote-like
-    if (msg && msg.instrumentId) lastQuote.value = msg;
-  });
   client.on("quote", (data: any) => {
     lastQuote.value = data;
   });
@@ -60,8 +58,8 @@ export const useWsStore = defineStore("ws", () => {
     client.close();
   }
 
-  function send(msg: any) {
-    client.send(msg);
+  function send(event: string, data?: any) {
+    return client.send(event, data);
   }
 
   function on(ev: string, handler: WsEventHandler) {
@@ -73,24 +71,35 @@ export const useWsStore = defineStore("ws", () => {
   }
 
   // subscribe/unsubscribe (local and remote calling ctpAPI is still kept in your page code)
+  // 服务端按合约房间推送行情，本地订阅同时加入/离开对应房间
   function addLocalSubscription(instrumentId: string) {
     if (!subscribedInstruments.value.includes(instrumentId)) {
       subscribedInstruments.value.push(instrumentId);
+      if (connected.value) client.subscribe([instrumentId]);
     }
   }
   function removeLocalSubscription(instrumentId: string) {
     const idx = subscribedInstruments.value.indexOf(instrumentId);
-    if (idx >= 0) subscribedInstruments.value.splice(idx, 1);
+    if (idx >= 0) {
+      subscribedInstruments.value.splice(idx, 1);
+      if (connected.value) client.unsubscribe([instrumentId]);
+    }
   }
   function setLocalSubscriptions(list: string[]) {
-    subscribedInstruments.value = Array.isArray(list) ? [...list] : [];
+    const next = Array.isArray(list) ? [...new Set(list)] : [];
+    const removed = subscribedInstruments.value.filter((id) => !next.includes(id));
+    const added = next.filter((id) => !subscribedInstruments.value.includes(id));
+    subscribedInstruments.value = next;
+    if (connected.value) {
+      if (removed.length) client.unsubscribe(removed);
+      if (added.length) client.subscribe(added);
+    }
   }
 
   return {
     // state
     connected,
     connecting,
-    readyState,
     subscribedInstruments,
     lastQuote,
     status,